@@ -7,6 +7,7 @@ from dotenv import load_dotenv
 from livekit.agents import (
     AutoSubscribe,
     JobContext,
+    JobProcess,
     WorkerOptions,
     cli,
     AgentSession,
@@ -20,6 +21,8 @@ from livekit.plugins import elevenlabs, groq, silero
 # Import music service and unified audio player
 from src.services.music_service import MusicService
 from src.services.unified_audio_player import UnifiedAudioPlayer
+from src.services.semantic_search import aclose_shared_client
+from src.utils import start_preloading
 
 # Load environment variables first
 load_dotenv(".env")
@@ -363,6 +366,19 @@ async def entrypoint(ctx: JobContext):
 
         logger.info("Cleanup complete")
 
+    async def close_job_resources():
+        """Close HTTP sessions and clients opened for this job"""
+        try:
+            await unified_audio_player.aclose()
+        except Exception as e:
+            logger.warning(f"Audio player close error: {e}")
+        try:
+            await aclose_shared_client()
+        except Exception as e:
+            logger.warning(f"Qdrant client close error: {e}")
+
+    ctx.add_shutdown_callback(close_job_resources)
+
     @ctx.room.on("participant_disconnected")
     def on_participant_disconnected(participant: rtc.RemoteParticipant):
         nonlocal participant_count
@@ -534,9 +550,15 @@ async def entrypoint(ctx: JobContext):
     logger.info("[PTT] Push-to-talk RPC methods registered")
 
 
+def prewarm(proc: JobProcess):
+    """Start loading the embedding model before jobs arrive"""
+    start_preloading()
+
+
 if __name__ == "__main__":
     cli.run_app(
         WorkerOptions(
             entrypoint_fnc=entrypoint,
+            prewarm_fnc=prewarm,
         )
     )
@@ -16,7 +16,7 @@ from livekit.agents import (
     function_tool,
 )
 from .filtered_agent import FilteredAgent
-from src.utils.database_helper import DatabaseHelper
+from src.utils.database_helper import get_shared_database_helper
 from src.services.google_search_service import GoogleSearchService
 logger = logging.getLogger("agent")
 
@@ -788,8 +788,8 @@ class Assistant(FilteredAgent):
             if not manager_api_url or not manager_api_secret:
                 return "Manager API is not configured"
 
-            # 3. Fetch agent_id using DatabaseHelper
-            db_helper = DatabaseHelper(manager_api_url, manager_api_secret)
+            # 3. Fetch agent_id using the shared DatabaseHelper (pooled, kept warm)
+            db_helper = get_shared_database_helper(manager_api_url, manager_api_secret)
             agent_id = await db_helper.get_agent_id(self.device_mac)
 
             if not agent_id:
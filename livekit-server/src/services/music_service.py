@@ -17,17 +17,17 @@ logger = logging.getLogger(__name__)
 class MusicService:
     """Service for handling music playback and search"""
 
-    def __init__(self, preloaded_model=None, preloaded_client=None):
+    def __init__(self, preloaded_model=None):
         self.cloudfront_domain = os.getenv("CLOUDFRONT_DOMAIN", "")
         self.s3_base_url = os.getenv("S3_BASE_URL", "")
         self.use_cdn = os.getenv("USE_CDN", "true").lower() == "true"
         self.is_initialized = False
-        self.semantic_search = QdrantSemanticSearch(preloaded_model, preloaded_client)
+        self.semantic_search = QdrantSemanticSearch(preloaded_model)
 
     async def initialize(self) -> bool:
         """Initialize music service using Qdrant cloud API"""
         try:
-            initialized = await self.semantic_search.initialize()
+            initialized = await self.semantic_search.initialize(self.semantic_search.config.music_collection)
             if initialized:
                 logger.info("[MUSIC] Music service initialized with Qdrant cloud API")
                 self.is_initialized = True
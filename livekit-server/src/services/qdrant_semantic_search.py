@@ -5,15 +5,21 @@ Enhanced semantic search using vector database
 
 import logging
 import asyncio
+import heapq
 import os
-from typing import Dict, List, Optional
+import re
+import time
+from itertools import chain
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
 # Qdrant and ML dependencies
 try:
+    import numpy as np
     from qdrant_client import QdrantClient
     from qdrant_client import models
-    from qdrant_client.models import PointStruct
+    from qdrant_client.http.exceptions import UnexpectedResponse
     from sentence_transformers import SentenceTransformer
     QDRANT_AVAILABLE = True
 except ImportError:
@@ -21,6 +27,62 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+
+def _build_score_table(priorities: List[float]) -> List[float]:
+    """Map every match bitmask to the score of its highest-priority set bit"""
+    table = []
+    for mask in range(1 << len(priorities)):
+        score = 0.0
+        for bit, priority_score in enumerate(priorities):
+            if mask >> bit & 1:
+                score = priority_score
+                break
+        table.append(score)
+    return table
+
+
+# Bit order: exact title, in title, exact romanized, in romanized,
+# in alternatives, in searchable text, word in title, word in romanized
+_MUSIC_SCORE_TABLE = _build_score_table([1.0, 0.8, 0.9, 0.7, 0.6, 0.5, 0.4, 0.3])
+# Bit order: exact title, in title, exact romanized, in romanized,
+# in alternatives, word in title, word in romanized
+_STORY_SCORE_TABLE = _build_score_table([1.0, 0.8, 0.9, 0.7, 0.6, 0.5, 0.4])
+
+# Don't bother spreading text scoring over threads below this many points per shard
+_MIN_SHARD_SIZE = 250
+
+# How long a collection snapshot is searched before it is reloaded in the background
+_SNAPSHOT_TTL = 3600
+
+
+def _compile_query_words(query_lower: str) -> Optional["re.Pattern"]:
+    """Compile query words into a single alternation pattern"""
+    words = query_lower.split()
+    if not words:
+        return None
+    return re.compile("|".join(map(re.escape, words)))
+
+
+def _normalize_rows(vectors: "np.ndarray") -> "np.ndarray":
+    """L2-normalize each row of a 2D float32 matrix, leaving zero rows as-is"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _is_not_found(error: BaseException) -> bool:
+    """True only when Qdrant answered 404, not for timeouts or other failures"""
+    return isinstance(error, UnexpectedResponse) and error.status_code == 404
+
+
+def _lowered(payload: Dict, key: str) -> str:
+    """Return the precomputed lowercase field, falling back for older points"""
+    value = payload.get(f"{key}_lc")
+    if value is None:
+        value = payload.get(key, '').lower()
+    return value
+
 @dataclass
 class QdrantSearchResult:
     """Enhanced search result with vector scoring"""
@@ -32,6 +94,14 @@ class QdrantSearchResult:
     alternatives: List[str]
     romanized: str
 
+@dataclass
+class _CollectionSnapshot:
+    """In-memory copy of a collection: payloads, filter keys and unit vectors"""
+    payloads: List[Dict]
+    filter_values: "np.ndarray"
+    vectors: Optional["np.ndarray"]
+    loaded_at: float
+
 class QdrantSemanticSearch:
     """
     Advanced semantic search using Qdrant vector database
@@ -42,6 +112,8 @@ class QdrantSemanticSearch:
         self.client: Optional[QdrantClient] = None
         self.model: Optional[SentenceTransformer] = None
         self.is_initialized = False
+        self._snapshots: Dict[str, _CollectionSnapshot] = {}
+        self._snapshot_refresh_tasks: Dict[str, asyncio.Task] = {}
 
         # Qdrant configuration
         self.config = {
@@ -51,7 +123,9 @@ class QdrantSemanticSearch:
             "stories_collection": "xiaozhi_stories",
             "embedding_model": "all-MiniLM-L6-v2",
             "search_limit": 10,
-            "min_score_threshold": 0.5
+            "min_score_threshold": 0.5,
+            # Also convert existing collections to int8 scalar quantization at startup
+            "quantize_existing_collections": os.getenv("QDRANT_SCALAR_QUANTIZATION", "false").lower() == "true"
         }
 
         if not QDRANT_AVAILABLE:
@@ -70,18 +144,22 @@ class QdrantSemanticSearch:
                 api_key=self.config["qdrant_api_key"]
             )
 
-            # Test connection
-            collections = self.client.get_collections()
-            logger.info("Connected to Qdrant successfully")
-
-            # Initialize embedding model from cache
+            # Test connection while the embedding model loads from cache
             logger.info(f"Loading embedding model from cache: {self.config['embedding_model']}")
             from ..utils.model_cache import model_cache
-            self.model = model_cache.get_embedding_model(self.config["embedding_model"])
+            _, self.model = await asyncio.gather(
+                asyncio.to_thread(self.client.get_collections),
+                asyncio.to_thread(model_cache.get_embedding_model, self.config["embedding_model"])
+            )
+            logger.info("Connected to Qdrant successfully")
             logger.info(f"✅ Loaded embedding model from cache: {self.config['embedding_model']}")
+            self._prepare_model_for_inference()
 
-            # Check if collections exist and have data
-            await self._ensure_collections_exist()
+            # Prepare collections while the model warms up
+            await asyncio.gather(
+                self._prepare_collections(),
+                asyncio.to_thread(self._warm_up_model)
+            )
 
             self.is_initialized = True
             return True
@@ -90,31 +168,289 @@ class QdrantSemanticSearch:
             logger.error(f"Failed to initialize Qdrant semantic search: {e}")
             return False
 
+    def _prepare_model_for_inference(self):
+        """Put the embedding model in eval mode and size the CPU thread pool"""
+        if not self.model:
+            return
+
+        try:
+            import torch
+
+            num_threads = int(os.getenv("EMBEDDING_NUM_THREADS", "0")) or max(1, (os.cpu_count() or 2) // 2)
+            torch.set_num_threads(num_threads)
+            self.model.eval()
+            logger.info(f"Embedding model ready for inference with {num_threads} CPU threads")
+        except Exception as e:
+            logger.warning(f"Could not tune embedding model for inference: {e}")
+
+    def _warm_up_model(self):
+        """Run one encode so the first real query doesn't pay lazy init costs"""
+        if not self.model:
+            return
+        try:
+            self.model.encode("warmup")
+        except Exception as e:
+            logger.warning(f"Embedding model warm-up failed: {e}")
+
+    async def _prepare_collections(self):
+        """Make sure collections exist before indexing and caching them"""
+        await self._ensure_collections_exist()
+        await asyncio.gather(
+            asyncio.to_thread(self._ensure_payload_indexes),
+            asyncio.to_thread(self._warm_cache)
+        )
+
     async def _ensure_collections_exist(self):
         """Check that required collections exist in Qdrant cloud"""
         try:
-            # Check music collection exists
-            try:
-                music_info = self.client.get_collection(self.config["music_collection"])
+            music_info, stories_info = await asyncio.gather(
+                asyncio.to_thread(self.client.get_collection, self.config["music_collection"]),
+                asyncio.to_thread(self.client.get_collection, self.config["stories_collection"]),
+                return_exceptions=True
+            )
+
+            # Check music collection exists, creating it so it can be indexed
+            if _is_not_found(music_info):
+                logger.warning(f"Music collection '{self.config['music_collection']}' not found in cloud, creating it")
+                await asyncio.to_thread(self._create_music_collection)
+            elif isinstance(music_info, Exception):
+                logger.error(f"Could not check music collection '{self.config['music_collection']}': {music_info}")
+            else:
                 logger.info(f"Music collection '{self.config['music_collection']}' found with {music_info.points_count} points")
-            except Exception:
-                logger.warning(f"Music collection '{self.config['music_collection']}' not found in cloud")
+                await asyncio.to_thread(self._ensure_quantized, self.config["music_collection"], music_info)
 
             # Check stories collection exists
-            try:
-                stories_info = self.client.get_collection(self.config["stories_collection"])
-                logger.info(f"Stories collection '{self.config['stories_collection']}' found with {stories_info.points_count} points")
-            except Exception:
+            if _is_not_found(stories_info):
                 logger.warning(f"Stories collection '{self.config['stories_collection']}' not found in cloud")
+            elif isinstance(stories_info, Exception):
+                logger.error(f"Could not check stories collection '{self.config['stories_collection']}': {stories_info}")
+            else:
+                logger.info(f"Stories collection '{self.config['stories_collection']}' found with {stories_info.points_count} points")
+                await asyncio.to_thread(self._ensure_quantized, self.config["stories_collection"], stories_info)
 
         except Exception as e:
             logger.error(f"Error checking collections: {e}")
 
-    def _get_embedding(self, text: str) -> List[float]:
-        """Generate embedding for text"""
-        if not text or not self.model:
+    @staticmethod
+    def _scalar_quantization():
+        """int8 scalar quantization kept in RAM, with float32 originals for rescoring"""
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=True
+            )
+        )
+
+    def _create_music_collection(self):
+        """Create the music collection with cosine vectors and int8 quantization"""
+        if not self.model:
+            return
+        try:
+            self.client.create_collection(
+                collection_name=self.config["music_collection"],
+                vectors_config=models.VectorParams(
+                    size=self.model.get_sentence_embedding_dimension(),
+                    distance=models.Distance.COSINE
+                ),
+                quantization_config=self._scalar_quantization()
+            )
+            logger.info(f"Created music collection '{self.config['music_collection']}'")
+        except Exception as e:
+            logger.error(f"Failed to create music collection: {e}")
+
+    def _ensure_quantized(self, collection_name: str, collection_info):
+        """Enable int8 quantization on an existing collection when configured to"""
+        if not self.config["quantize_existing_collections"]:
+            return
+        if collection_info.config.quantization_config is not None:
+            return
+        try:
+            self.client.update_collection(
+                collection_name=collection_name,
+                quantization_config=self._scalar_quantization()
+            )
+            logger.info(f"Enabled int8 scalar quantization on '{collection_name}'")
+        except Exception as e:
+            logger.warning(f"Could not enable quantization on '{collection_name}': {e}")
+
+    def _ensure_payload_indexes(self):
+        """Create keyword indexes on the fields used for facets and filters"""
+        for collection_name, field_name in (
+            (self.config["music_collection"], "language"),
+            (self.config["stories_collection"], "category"),
+        ):
+            try:
+                self.client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name=field_name,
+                    field_schema=models.PayloadSchemaType.KEYWORD
+                )
+            except Exception as e:
+                # Index may already exist or the key may lack write access
+                logger.debug(f"Payload index '{field_name}' on '{collection_name}' not created: {e}")
+
+    def _scroll_all(self, collection_name: str, with_vectors: bool = False) -> List:
+        """Scroll every point of a collection page by page"""
+        points = []
+        offset = None
+        while True:
+            batch, offset = self.client.scroll(
+                collection_name=collection_name,
+                limit=256,
+                offset=offset,
+                with_payload=True,
+                with_vectors=with_vectors
+            )
+            points.extend(batch)
+            if offset is None:
+                return points
+
+    def _warm_cache(self):
+        """Snapshot both collections once so searches don't re-scroll Qdrant"""
+        for collection_name, filter_field in (
+            (self.config["music_collection"], "language"),
+            (self.config["stories_collection"], "category"),
+        ):
+            try:
+                self._snapshot_collection(collection_name, filter_field)
+            except Exception as e:
+                logger.warning(f"Could not cache collection '{collection_name}': {e}")
+
+    def _snapshot_collection(self, collection_name: str, filter_field: str):
+        """Load one collection into contiguous arrays"""
+        points = self._scroll_all(collection_name, with_vectors=True)
+        payloads = [point.payload for point in points]
+        filter_values = np.array([payload.get(filter_field) for payload in payloads], dtype=object)
+
+        # Only unnamed dense vectors can be stacked into a matrix
+        vectors = None
+        if points and all(isinstance(point.vector, list) for point in points):
+            vectors = _normalize_rows([point.vector for point in points])
+
+        self._snapshots[collection_name] = _CollectionSnapshot(payloads, filter_values, vectors, time.monotonic())
+        logger.info(f"Cached {len(payloads)} points from '{collection_name}'")
+
+    def _refresh_stale_snapshot(self, collection_name: str, filter_field: str):
+        """Reload a snapshot in the background once it is older than _SNAPSHOT_TTL"""
+        snapshot = self._snapshots.get(collection_name)
+        if (snapshot is None or time.monotonic() - snapshot.loaded_at <= _SNAPSHOT_TTL
+                or collection_name in self._snapshot_refresh_tasks):
+            return
+
+        async def _refresh():
+            try:
+                await asyncio.to_thread(self._snapshot_collection, collection_name, filter_field)
+            except Exception as e:
+                logger.warning(f"Refreshing cache for '{collection_name}' failed: {e}")
+            finally:
+                self._snapshot_refresh_tasks.pop(collection_name, None)
+
+        self._snapshot_refresh_tasks[collection_name] = asyncio.create_task(_refresh())
+
+    def _get_payloads(self, collection_name: str) -> List[Dict]:
+        """Get payloads from the snapshot, or scroll when nothing is cached"""
+        snapshot = self._snapshots.get(collection_name)
+        if snapshot is not None:
+            return snapshot.payloads
+
+        scroll_result = self.client.scroll(
+            collection_name=collection_name,
+            limit=1000,  # Get more points to search through
+            with_payload=True
+        )
+        return [point.payload for point in scroll_result[0]]
+
+    @staticmethod
+    def _field_filter(field: str, value: Optional[str]):
+        """Build a keyword match filter, or None when no value is given"""
+        if not value:
+            return None
+        return models.Filter(must=[
+            models.FieldCondition(key=field, match=models.MatchValue(value=value))
+        ])
+
+    def _vector_search(self, collection_name: str, query_embedding: "np.ndarray", filter_field: str,
+                       filter_value: Optional[str], limit: int) -> List[Tuple[float, Dict]]:
+        """Rank points by similarity, locally when cached, otherwise inside Qdrant"""
+        snapshot = self._snapshots.get(collection_name)
+        if snapshot is not None and snapshot.vectors is not None:
+            return self._vector_search_cached(snapshot, query_embedding, filter_value, limit)
+
+        # Let Qdrant apply the filter and threshold during the HNSW traversal
+        hits = self.client.query_points(
+            collection_name=collection_name,
+            query=query_embedding,
+            query_filter=self._field_filter(filter_field, filter_value),
+            score_threshold=self.config["min_score_threshold"],
+            # Coarse pass on int8 vectors, then rescore the top hits with float32
+            search_params=models.SearchParams(
+                quantization=models.QuantizationSearchParams(rescore=True)
+            ),
+            limit=limit,
+            with_payload=True
+        ).points
+        return [(hit.score, hit.payload) for hit in hits]
+
+    def _vector_search_cached(self, snapshot: _CollectionSnapshot, query_embedding: "np.ndarray",
+                              filter_value: Optional[str], limit: int) -> List[Tuple[float, Dict]]:
+        """Rank cached points by cosine similarity, returning (score, payload) pairs"""
+        if limit <= 0 or snapshot.vectors.shape[0] == 0:
             return []
-        return self.model.encode(text).tolist()
+
+        scores = snapshot.vectors @ query_embedding.astype(np.float32, copy=False)
+        if filter_value:
+            scores = np.where(snapshot.filter_values == filter_value, scores, -np.inf)
+
+        k = min(limit, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        threshold = self.config["min_score_threshold"]
+        return [(float(scores[i]), snapshot.payloads[i]) for i in top if scores[i] >= threshold]
+
+    def _facet_values(self, collection_name: str, key: str) -> List[str]:
+        """Get distinct values of a payload field, sorted"""
+        try:
+            hits = self.client.facet(
+                collection_name=collection_name,
+                key=key,
+                limit=100
+            ).hits
+            return sorted(str(hit.value) for hit in hits)
+        except Exception as e:
+            # Facets need a recent server and a keyword index, fall back to scroll
+            logger.debug(f"Facet on '{key}' unavailable, falling back to scroll: {e}")
+
+        scroll_result = self.client.scroll(
+            collection_name=collection_name,
+            limit=1000,  # Get a large sample
+            with_payload=[key]
+        )
+
+        values = set()
+        for point in scroll_result[0]:
+            if key in point.payload:
+                values.add(point.payload[key])
+
+        return sorted(values)
+
+    def _get_embedding(self, text: str) -> Optional["np.ndarray"]:
+        """Generate a normalized embedding for text as a numpy array"""
+        if not text or not self.model:
+            return None
+        return self.model.encode(text, convert_to_numpy=True, normalize_embeddings=True)
+
+    def _encode_unique(self, texts: List[str]) -> "np.ndarray":
+        """Encode texts with a single forward pass per distinct text"""
+        unique_ids: Dict[str, int] = {}
+        inverse = [unique_ids.setdefault(text, len(unique_ids)) for text in texts]
+
+        # encode() already length-sorts internally, so batches carry little padding
+        encoded = self.model.encode(list(unique_ids), batch_size=64, convert_to_numpy=True)
+        if len(unique_ids) < len(texts):
+            logger.info(f"Encoding {len(unique_ids)} unique texts for {len(texts)} songs")
+        return encoded[inverse]
 
     async def index_music_metadata(self, music_metadata: Dict) -> bool:
         """Index music metadata into Qdrant"""
@@ -123,8 +459,8 @@ class QdrantSemanticSearch:
             return False
 
         try:
-            points = []
-            point_id = 0
+            texts = []
+            payloads = []
 
             for language, language_metadata in music_metadata.items():
                 for song_title, song_info in language_metadata.items():
@@ -153,11 +489,6 @@ class QdrantSemanticSearch:
                     if not combined_text:
                         continue
 
-                    # Generate embedding
-                    embedding = self._get_embedding(combined_text)
-                    if not embedding:
-                        continue
-
                     # Prepare payload
                     payload = {
                         'title': song_title,
@@ -168,30 +499,39 @@ class QdrantSemanticSearch:
                         'filename': song_info.get('filename', f"{song_title}.mp3"),
                         'file_path': f"{language}/{song_info.get('filename', f'{song_title}.mp3')}",
                         'searchable_text': combined_text,
-                        'metadata': song_info
+                        'metadata': song_info,
+                        # Lowercased copies so search does not re-lowercase per point
+                        'title_lc': song_title.lower(),
+                        'romanized_lc': song_info.get('romanized', song_title).lower(),
+                        'alternatives_lc': [alt.lower() for alt in alternatives] if isinstance(alternatives, list) else [],
+                        'searchable_text_lc': combined_text.lower()
                     }
 
-                    points.append(
-                        PointStruct(
-                            id=point_id,
-                            vector=embedding,
-                            payload=payload
-                        )
-                    )
-                    point_id += 1
-
-            # Upsert points to Qdrant
-            if points:
-                self.client.upsert(
-                    collection_name=self.config["music_collection"],
-                    points=points
-                )
-                logger.info(f"Indexed {len(points)} music tracks into Qdrant")
-                return True
-            else:
+                    texts.append(combined_text)
+                    payloads.append(payload)
+
+            if not texts or not self.model:
                 logger.warning("No music metadata to index")
                 return False
 
+            # Encode each distinct text once in one batch, then L2-normalize the whole matrix
+            vectors = _normalize_rows(self._encode_unique(texts))
+
+            # upload_collection takes the ndarray directly and batches the upserts
+            self.client.upload_collection(
+                collection_name=self.config["music_collection"],
+                vectors=vectors,
+                payload=payloads,
+                ids=range(len(payloads)),
+                wait=True
+            )
+            logger.info(f"Indexed {len(payloads)} music tracks into Qdrant")
+            try:
+                self._snapshot_collection(self.config["music_collection"], "language")
+            except Exception as e:
+                logger.warning(f"Could not refresh music cache after indexing: {e}")
+            return True
+
         except Exception as e:
             logger.error(f"Failed to index music metadata: {e}")
             return False
@@ -201,6 +541,90 @@ class QdrantSemanticSearch:
         logger.info("Skipping stories indexing - using existing cloud collections")
         return True
 
+    async def _score_in_shards(self, score_shard, payloads: List[Dict], *args) -> List[Tuple[float, Dict]]:
+        """Split payloads into contiguous shards, score them in threads and merge in order"""
+        if not payloads:
+            return []
+        shard_count = max(1, min(os.cpu_count() or 1, len(payloads) // _MIN_SHARD_SIZE))
+        shard_size = -(-len(payloads) // shard_count)
+        shard_results = await asyncio.gather(*(
+            asyncio.to_thread(score_shard, payloads[start:start + shard_size], *args)
+            for start in range(0, len(payloads), shard_size)
+        ))
+        return list(chain.from_iterable(shard_results))
+
+    @staticmethod
+    def _score_music_shard(payloads: List[Dict], query_lower: str, words_pattern,
+                           language_filter: Optional[str]) -> List[Tuple[float, Dict]]:
+        """Text-match score for a shard of music payloads"""
+        candidates = []
+        for payload in payloads:
+            # Apply language filter if specified
+            if language_filter and payload.get('language') != language_filter:
+                continue
+
+            # Calculate text similarity score since we can't use vector search easily
+            title = _lowered(payload, 'title')
+            romanized = _lowered(payload, 'romanized')
+            alternatives = payload.get('alternatives_lc')
+            if alternatives is None:
+                alternatives = [alt.lower() for alt in payload.get('alternatives', [])]
+            searchable_text = _lowered(payload, 'searchable_text')
+
+            # Collect all matches into a bitmask and look the score up
+            mask = (
+                (query_lower == title)
+                | (query_lower in title) << 1
+                | (query_lower == romanized) << 2
+                | (query_lower in romanized) << 3
+                | any(query_lower in alt for alt in alternatives) << 4
+                | (query_lower in searchable_text) << 5
+            )
+            if words_pattern is not None:
+                mask |= (words_pattern.search(title) is not None) << 6
+                mask |= (words_pattern.search(romanized) is not None) << 7
+            score = _MUSIC_SCORE_TABLE[mask]
+
+            if score > 0:
+                candidates.append((score, payload))
+
+        return candidates
+
+    @staticmethod
+    def _score_story_shard(payloads: List[Dict], query_lower: str, words_pattern,
+                           category_filter: Optional[str]) -> List[Tuple[float, Dict]]:
+        """Text-match score for a shard of story payloads"""
+        candidates = []
+        for payload in payloads:
+            # Apply category filter manually if specified
+            if category_filter and payload.get('category') != category_filter:
+                continue
+
+            # Check title, romanized, alternatives for text matches
+            title = _lowered(payload, 'title')
+            romanized = _lowered(payload, 'romanized')
+            alternatives = payload.get('alternatives_lc')
+            if alternatives is None:
+                alternatives = [alt.lower() for alt in payload.get('alternatives', [])]
+
+            # Collect all matches into a bitmask and look the score up
+            mask = (
+                (query_lower == title)
+                | (query_lower in title) << 1
+                | (query_lower == romanized) << 2
+                | (query_lower in romanized) << 3
+                | any(query_lower in alt for alt in alternatives) << 4
+            )
+            if words_pattern is not None:
+                mask |= (words_pattern.search(title) is not None) << 5
+                mask |= (words_pattern.search(romanized) is not None) << 6
+            score = _STORY_SCORE_TABLE[mask]
+
+            if score > 0:
+                candidates.append((score, payload))
+
+        return candidates
+
     async def search_music(self, query: str, language_filter: Optional[str] = None, limit: int = 5) -> List[QdrantSearchResult]:
         """Search for music using vector similarity in Qdrant"""
         if not self.is_initialized:
@@ -209,63 +633,39 @@ class QdrantSemanticSearch:
         try:
             # Generate query embedding
             query_embedding = self._get_embedding(query)
-            if not query_embedding:
+            if query_embedding is None or query_embedding.size == 0:
                 return []
 
-            # Use scroll instead of search with filters to avoid typing.Union issues
-            scroll_result = self.client.scroll(
-                collection_name=self.config["music_collection"],
-                limit=1000,  # Get more points to search through
-                with_payload=True
-            )
+            # Score the cached payloads locally (scrolls only if nothing is cached)
+            self._refresh_stale_snapshot(self.config["music_collection"], 'language')
+            payloads = self._get_payloads(self.config["music_collection"])
 
-            # Filter results manually and calculate similarity scores
-            results = []
+            # Score payload shards in worker threads so the event loop stays free
             query_lower = query.lower()
+            candidates = await self._score_in_shards(
+                self._score_music_shard, payloads, query_lower,
+                _compile_query_words(query_lower), language_filter
+            )
 
-            for point in scroll_result[0]:
-                payload = point.payload
-
-                # Apply language filter if specified
-                if language_filter and payload.get('language') != language_filter:
-                    continue
+            # No text match, rank the cached vectors by similarity instead
+            if not candidates:
+                candidates = self._vector_search(
+                    self.config["music_collection"], query_embedding, 'language', language_filter, limit
+                )
 
-                # Calculate text similarity score since we can't use vector search easily
-                title = payload.get('title', '').lower()
-                romanized = payload.get('romanized', '').lower()
-                alternatives = [alt.lower() for alt in payload.get('alternatives', [])]
-                searchable_text = payload.get('searchable_text', '').lower()
-
-                score = 0.0
-
-                # Calculate similarity score
-                if query_lower in title:
-                    score = 1.0 if query_lower == title else 0.8
-                elif query_lower in romanized:
-                    score = 0.9 if query_lower == romanized else 0.7
-                elif any(query_lower in alt for alt in alternatives):
-                    score = 0.6
-                elif query_lower in searchable_text:
-                    score = 0.5
-                elif any(word in title for word in query_lower.split()):
-                    score = 0.4
-                elif any(word in romanized for word in query_lower.split()):
-                    score = 0.3
-
-                if score > 0:
-                    results.append(QdrantSearchResult(
-                        title=payload['title'],
-                        filename=payload['filename'],
-                        language_or_category=payload['language'],
-                        score=score,
-                        metadata=payload,
-                        alternatives=payload.get('alternatives', []),
-                        romanized=payload.get('romanized', '')
-                    ))
-
-            # Sort by score and limit results
-            results.sort(key=lambda x: x.score, reverse=True)
-            results = results[:limit]
+            # Keep the top scores and only build results for those
+            results = [
+                QdrantSearchResult(
+                    title=payload['title'],
+                    filename=payload['filename'],
+                    language_or_category=payload['language'],
+                    score=score,
+                    metadata=payload,
+                    alternatives=payload.get('alternatives', []),
+                    romanized=payload.get('romanized', '')
+                )
+                for score, payload in heapq.nlargest(limit, candidates, key=itemgetter(0))
+            ]
 
             logger.debug(f"Qdrant music search found {len(results)} results for '{query}'")
             return results
@@ -280,58 +680,30 @@ class QdrantSemanticSearch:
             return []
 
         try:
-            # Use scroll to get all matching points, then filter by text locally
-            # Avoid using Filter/FieldCondition to prevent Union type issues
-            scroll_result = self.client.scroll(
-                collection_name=self.config["stories_collection"],
-                limit=1000,  # Get more points to search through
-                with_payload=True
-            )
+            # Get all points from the cache, then filter by text locally
+            self._refresh_stale_snapshot(self.config["stories_collection"], 'category')
+            payloads = self._get_payloads(self.config["stories_collection"])
 
-            # Filter results by text matching
-            results = []
+            # Score payload shards in worker threads so the event loop stays free
             query_lower = query.lower()
+            candidates = await self._score_in_shards(
+                self._score_story_shard, payloads, query_lower,
+                _compile_query_words(query_lower), category_filter
+            )
 
-            for point in scroll_result[0]:
-                payload = point.payload
-                
-                # Apply category filter manually if specified
-                if category_filter and payload.get('category') != category_filter:
-                    continue
-                
-                # Check title, romanized, alternatives for text matches
-                title = payload.get('title', '').lower()
-                romanized = payload.get('romanized', '').lower()
-                alternatives = [alt.lower() for alt in payload.get('alternatives', [])]
-
-                score = 0.0
-
-                # Calculate text similarity score
-                if query_lower in title:
-                    score = 1.0 if query_lower == title else 0.8
-                elif query_lower in romanized:
-                    score = 0.9 if query_lower == romanized else 0.7
-                elif any(query_lower in alt for alt in alternatives):
-                    score = 0.6
-                elif any(word in title for word in query_lower.split()):
-                    score = 0.5
-                elif any(word in romanized for word in query_lower.split()):
-                    score = 0.4
-
-                if score > 0:
-                    results.append(QdrantSearchResult(
-                        title=payload['title'],
-                        filename=payload['filename'],
-                        language_or_category=payload.get('category', ''),
-                        score=score,
-                        metadata=payload,
-                        alternatives=payload.get('alternatives', []),
-                        romanized=payload.get('romanized', '')
-                    ))
-
-            # Sort by score and limit results
-            results.sort(key=lambda x: x.score, reverse=True)
-            results = results[:limit]
+            # Keep the top scores and only build results for those
+            results = [
+                QdrantSearchResult(
+                    title=payload['title'],
+                    filename=payload['filename'],
+                    language_or_category=payload.get('category', ''),
+                    score=score,
+                    metadata=payload,
+                    alternatives=payload.get('alternatives', []),
+                    romanized=payload.get('romanized', '')
+                )
+                for score, payload in heapq.nlargest(limit, candidates, key=itemgetter(0))
+            ]
 
             logger.debug(f"Qdrant stories search found {len(results)} results for '{query}'")
             return results
@@ -340,37 +712,56 @@ class QdrantSemanticSearch:
             logger.error(f"Qdrant stories search failed: {e}")
             return []
 
+    def _sample_random_point(self, collection_name: str, field: str, value: Optional[str]):
+        """Pick one random point server-side, optionally matching a payload field"""
+        try:
+            hits = self.client.query_points(
+                collection_name=collection_name,
+                query=models.SampleQuery(sample=models.Sample.RANDOM),
+                query_filter=self._field_filter(field, value),
+                limit=1,
+                with_payload=True
+            ).points
+            return hits[0] if hits else None
+        except Exception as e:
+            # Older clients/servers have no random sampling, fall back to scroll
+            logger.debug(f"Random sampling unavailable, falling back to scroll: {e}")
+
+        scroll_result = self.client.scroll(
+            collection_name=collection_name,
+            limit=100,  # Get more points to choose from
+            with_payload=True
+        )
+
+        valid_points = scroll_result[0]
+        if value:
+            valid_points = [p for p in valid_points if p.payload.get(field) == value]
+
+        if valid_points:
+            import random
+            return random.choice(valid_points)
+        return None
+
     async def get_random_music(self, language_filter: Optional[str] = None) -> Optional[QdrantSearchResult]:
         """Get a random song from Qdrant collection"""
         if not self.is_initialized:
             return None
 
         try:
-            # Use scroll to get random points without filters to avoid typing issues
-            scroll_result = self.client.scroll(
-                collection_name=self.config["music_collection"],
-                limit=100,  # Get more points to choose from
-                with_payload=True
+            random_point = self._sample_random_point(
+                self.config["music_collection"], 'language', language_filter
             )
 
-            if scroll_result[0]:  # Check if we have any points
-                import random
-                # Filter by language if specified
-                valid_points = scroll_result[0]
-                if language_filter:
-                    valid_points = [p for p in scroll_result[0] if p.payload.get('language') == language_filter]
-
-                if valid_points:
-                    random_point = random.choice(valid_points)
-                    return QdrantSearchResult(
-                        title=random_point.payload['title'],
-                        filename=random_point.payload['filename'],
-                        language_or_category=random_point.payload['language'],
-                        score=1.0,
-                        metadata=random_point.payload,
-                        alternatives=random_point.payload.get('alternatives', []),
-                        romanized=random_point.payload.get('romanized', '')
-                    )
+            if random_point:
+                return QdrantSearchResult(
+                    title=random_point.payload['title'],
+                    filename=random_point.payload['filename'],
+                    language_or_category=random_point.payload['language'],
+                    score=1.0,
+                    metadata=random_point.payload,
+                    alternatives=random_point.payload.get('alternatives', []),
+                    romanized=random_point.payload.get('romanized', '')
+                )
 
             return None
 
@@ -384,31 +775,20 @@ class QdrantSemanticSearch:
             return None
 
         try:
-            # Use scroll to get random points without filters to avoid typing issues
-            scroll_result = self.client.scroll(
-                collection_name=self.config["stories_collection"],
-                limit=100,  # Get more points to choose from
-                with_payload=True
+            random_point = self._sample_random_point(
+                self.config["stories_collection"], 'category', category_filter
             )
 
-            if scroll_result[0]:  # Check if we have any points
-                import random
-                # Filter by category if specified
-                valid_points = scroll_result[0]
-                if category_filter:
-                    valid_points = [p for p in scroll_result[0] if p.payload.get('category') == category_filter]
-
-                if valid_points:
-                    random_point = random.choice(valid_points)
-                    return QdrantSearchResult(
-                        title=random_point.payload['title'],
-                        filename=random_point.payload['filename'],
-                        language_or_category=random_point.payload['category'],
-                        score=1.0,
-                        metadata=random_point.payload,
-                        alternatives=random_point.payload.get('alternatives', []),
-                        romanized=random_point.payload.get('romanized', '')
-                    )
+            if random_point:
+                return QdrantSearchResult(
+                    title=random_point.payload['title'],
+                    filename=random_point.payload['filename'],
+                    language_or_category=random_point.payload['category'],
+                    score=1.0,
+                    metadata=random_point.payload,
+                    alternatives=random_point.payload.get('alternatives', []),
+                    romanized=random_point.payload.get('romanized', '')
+                )
 
             return None
 
@@ -422,19 +802,7 @@ class QdrantSemanticSearch:
             return []
 
         try:
-            # Use aggregation to get unique languages
-            scroll_result = self.client.scroll(
-                collection_name=self.config["music_collection"],
-                limit=1000,  # Get a large sample
-                with_payload=["language"]
-            )
-
-            languages = set()
-            for point in scroll_result[0]:
-                if 'language' in point.payload:
-                    languages.add(point.payload['language'])
-
-            return sorted(list(languages))
+            return self._facet_values(self.config["music_collection"], "language")
 
         except Exception as e:
             logger.error(f"Failed to get available languages: {e}")
@@ -446,20 +814,8 @@ class QdrantSemanticSearch:
             return []
 
         try:
-            # Use aggregation to get unique categories
-            scroll_result = self.client.scroll(
-                collection_name=self.config["stories_collection"],
-                limit=1000,  # Get a large sample
-                with_payload=["category"]
-            )
-
-            categories = set()
-            for point in scroll_result[0]:
-                if 'category' in point.payload:
-                    categories.add(point.payload['category'])
-
-            return sorted(list(categories))
+            return self._facet_values(self.config["stories_collection"], "category")
 
         except Exception as e:
             logger.error(f"Failed to get available categories: {e}")
-            return []
\ No newline at end of file
+            return []
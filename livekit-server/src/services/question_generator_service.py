@@ -6,10 +6,26 @@ Uses Groq API to generate varied math questions for children
 import os
 import logging
 import json
-from typing import Dict, Any, List
+import random
+import re
+import time
+from typing import Dict, Any, List, Tuple
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 logger = logging.getLogger(__name__)
 
+# JSON object inside an optional ```json fenced block
+_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+
+# One Groq call fills a pool of questions per difficulty that later requests sample from
+QUESTION_POOL_SIZE = 30
+QUESTION_POOL_TTL = 300  # seconds
+
 
 class QuestionGeneratorService:
     """Generate math question banks using Groq API"""
@@ -17,6 +33,8 @@ class QuestionGeneratorService:
     def __init__(self):
         self.groq_api_key = os.getenv("GROQ_API_KEY")
         self._initialized = False
+        # difficulty -> (created_at, questions)
+        self._pool: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
 
     async def initialize(self):
         """Initialize the service"""
@@ -65,6 +83,17 @@ class QuestionGeneratorService:
                     'error': 'Service not initialized'
                 }
 
+            # Serve from the cached pool when it is fresh and large enough
+            cached = self._pool.get(difficulty)
+            if cached and time.monotonic() - cached[0] < QUESTION_POOL_TTL and len(cached[1]) >= count:
+                questions = random.sample(cached[1], count)
+                logger.info(f"✅ Served {len(questions)} {difficulty} math questions from cache")
+                return {
+                    'success': True,
+                    'questions': questions,
+                    'error': None
+                }
+
             from openai import AsyncOpenAI
 
             # Use direct Groq API call
@@ -73,13 +102,15 @@ class QuestionGeneratorService:
                 base_url="https://api.groq.com/openai/v1"
             )
 
-            prompt = self._create_prompt(count, difficulty)
+            # Generate a whole pool in one call so repeat requests skip the API
+            pool_size = max(count, QUESTION_POOL_SIZE)
+            prompt = self._create_prompt(pool_size, difficulty)
 
             response = await client.chat.completions.create(
                 model="llama-3.1-8b-instant",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.8,  # Higher temperature for variety
-                max_tokens=500
+                max_tokens=max(500, 30 * pool_size)
             )
 
             raw_response = response.choices[0].message.content.strip()
@@ -90,6 +121,9 @@ class QuestionGeneratorService:
 
             if questions:
                 logger.info(f"✅ Generated {len(questions)} math questions")
+                self._pool[difficulty] = (time.monotonic(), questions)
+                if len(questions) > count:
+                    questions = random.sample(questions, count)
                 return {
                     'success': True,
                     'questions': questions,
@@ -155,23 +189,17 @@ Generate {count} questions now:"""
     def _parse_response(self, raw_response: str) -> List[Dict[str, Any]]:
         """Parse JSON response from LLM"""
         try:
-            # Try to extract JSON from response
-            # Sometimes LLM adds markdown code blocks
-            if "```json" in raw_response:
-                # Extract JSON from markdown
-                start = raw_response.find("```json") + 7
-                end = raw_response.find("```", start)
-                json_str = raw_response[start:end].strip()
-            elif "```" in raw_response:
-                # Extract JSON from generic code block
-                start = raw_response.find("```") + 3
-                end = raw_response.find("```", start)
-                json_str = raw_response[start:end].strip()
+            # Sometimes LLM wraps the JSON in markdown code blocks
+            match = _FENCE_RE.search(raw_response)
+            if match:
+                json_str = match.group(1)
             else:
-                json_str = raw_response.strip()
+                start = raw_response.find("{")
+                end = raw_response.rfind("}")
+                json_str = raw_response[start:end + 1] if start != -1 and end > start else raw_response.strip()
 
-            # Parse JSON
-            data = json.loads(json_str)
+            # Parse JSON (orjson errors subclass json.JSONDecodeError)
+            data = _json_loads(json_str)
 
             if 'questions' in data and isinstance(data['questions'], list):
                 # Validate each question
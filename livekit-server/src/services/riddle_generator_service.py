@@ -6,10 +6,251 @@ Uses Groq API to generate varied riddles for children
 import os
 import logging
 import json
-from typing import Dict, Any, List
+import asyncio
+import hashlib
+import random
+import re
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+
+    def _json_dumps_sorted(value) -> bytes:
+        return orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps_sorted(value) -> bytes:
+        return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+
+try:
+    import httpx
+    import openai
+    from openai import AsyncOpenAI
+except ImportError:
+    openai = None
+    AsyncOpenAI = None
+
+try:
+    from pydantic import BaseModel
+
+    class Riddle(BaseModel):
+        riddle: str
+        answer: str
+
+    class RiddleBank(BaseModel):
+        riddles: List[Riddle]
+except ImportError:
+    RiddleBank = None
 
 logger = logging.getLogger(__name__)
 
+# Correlation id for the riddle request being handled in the current task
+request_id: ContextVar[str] = ContextVar("riddle_request_id", default="-")
+
+# Fraction of raw Groq responses written to logs/riddle_raw.log
+RIDDLE_RAW_LOG_SAMPLE_RATE = float(os.getenv("RIDDLE_RAW_LOG_SAMPLE_RATE", "0.01"))
+_raw_logger: Optional[logging.Logger] = None
+
+
+def _log_raw_response(raw_response: str, always: bool = False):
+    """Write a raw response to the rotating raw log, sampled unless always is set"""
+    global _raw_logger
+    if not always and random.random() >= RIDDLE_RAW_LOG_SAMPLE_RATE:
+        return
+
+    if _raw_logger is None:
+        _raw_logger = logging.getLogger(f"{__name__}.raw")
+        _raw_logger.propagate = False  # Keep large bodies out of the main logs
+        _raw_logger.setLevel(logging.INFO)
+        try:
+            os.makedirs("logs", exist_ok=True)
+            handler = RotatingFileHandler(
+                filename=os.path.join("logs", "riddle_raw.log"),
+                maxBytes=10 * 1024 * 1024,  # 10MB
+                backupCount=3,
+                encoding='utf-8'
+            )
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            _raw_logger.addHandler(handler)
+        except Exception as e:
+            logger.warning("⚠️ Failed to configure riddle raw log: %s", e)
+
+    _raw_logger.info("rid=%s %s", request_id.get(), raw_response)
+
+# JSON object inside an optional ```json fenced block, else the outermost {...} span
+_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+_JSON_OBJ_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+# One Groq call generates a pool of riddles per difficulty that requests are served from
+RIDDLE_POOL_SIZE = 50
+# Start a background refill once a pool drops below this many riddles
+RIDDLE_POOL_REFILL_THRESHOLD = 10
+# Generated banks are reused across sessions for a day
+RIDDLE_BANK_CACHE_TTL = 86400
+# How many recently pooled riddles are remembered to filter out repeats
+RIDDLE_SEEN_WINDOW = 1000
+# Upper bound on completion tokens; a full 50-riddle pool needs ~2830
+RIDDLE_MAX_TOKENS_CAP = 3000
+
+
+# Prompt pieces are built once at import time
+_DIFFICULTY_GUIDELINES = {
+    "easy": "Simple riddles about everyday objects (animals, household items, body parts). Example: 'I have hands but cannot clap. What am I?' Answer: 'clock'",
+    "medium": "Riddles about concepts, nature, abstract ideas. Example: 'I can fly without wings. I can cry without eyes. What am I?' Answer: 'cloud'",
+    "hard": "Wordplay riddles, logic puzzles. Example: 'The more you take, the more you leave behind. What am I?' Answer: 'footsteps'"
+}
+
+_PROMPT_TEMPLATE = """You are a riddle master creating riddles for children.
+
+Generate {count} DIFFERENT riddles. Each riddle must be UNIQUE and VARIED.
+
+**Requirements:**
+- Difficulty: {difficulty} - {guidelines}
+- Make riddles diverse (don't repeat similar patterns)
+- Riddles should be simple and clear for children
+- Each riddle must have ONE clear answer (single word or simple phrase)
+- Answer should be straightforward (no multiple interpretations)
+- Return ONLY valid JSON, no other text
+
+**Output Format (JSON only):**
+{{
+  "riddles": [
+    {{"riddle": "I have hands but cannot clap. What am I?", "answer": "clock"}},
+    {{"riddle": "I have a face and two hands, but no arms or legs. What am I?", "answer": "clock"}},
+    {{"riddle": "I'm tall when I'm young, and short when I'm old. What am I?", "answer": "candle"}},
+    {{"riddle": "What has keys but no locks?", "answer": "piano"}},
+    {{"riddle": "I have a neck but no head. What am I?", "answer": "bottle"}}
+  ]
+}}
+
+**CRITICAL:**
+- Return ONLY the JSON
+- Each riddle must be different
+- Answer must be a simple word or short phrase (1-3 words)
+- Answer should be the MOST COMMON/EXPECTED answer
+
+Generate {count} riddles now:"""
+
+
+def _max_tokens_for(count: int) -> int:
+    """Completion budget sized to the riddle count (~55 JSON tokens per riddle)"""
+    return min(RIDDLE_MAX_TOKENS_CAP, 80 + 55 * count)
+
+
+class _RiddleStreamParser:
+    """Pull complete riddle objects out of a streamed {"riddles": [...]} document"""
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._current: List[str] = []
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Consume a chunk of text and return any objects it completed"""
+        completed = []
+        for char in text:
+            if self._depth >= 2:
+                self._current.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+                if self._depth == 2:
+                    self._current = [char]
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 1:
+                    try:
+                        completed.append(_json_loads("".join(self._current)))
+                    except json.JSONDecodeError:
+                        pass
+                    self._current = []
+        return completed
+
+
+class RiddleBankCache:
+    """LRU cache of generated riddle banks, backed by Redis when REDIS_URL is set"""
+
+    def __init__(self, max_entries: int = 64, redis_url: Optional[str] = None):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._redis = None
+
+        redis_url = redis_url if redis_url is not None else os.getenv("REDIS_URL", "")
+        if redis_url:
+            try:
+                import redis.asyncio as redis_asyncio
+                self._redis = redis_asyncio.from_url(redis_url)
+                logger.info("✅ Riddle bank cache using Redis")
+            except ImportError:
+                logger.warning("⚠️ redis package not installed, riddle bank cache is in-memory only")
+
+    @staticmethod
+    def cache_key(prompt: str, difficulty: str) -> str:
+        """Stable key for a prompt and difficulty"""
+        payload = _json_dumps_sorted({"prompt": prompt, "difficulty": difficulty})
+        return "riddle_bank:" + hashlib.sha256(payload).hexdigest()
+
+    async def get(self, key: str) -> Optional[List[Dict[str, str]]]:
+        """Return a cached bank, or None when missing or expired"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                return value
+            del self._entries[key]
+
+        if self._redis is not None:
+            try:
+                raw = await self._redis.get(key)
+                if raw:
+                    value = _json_loads(raw)
+                    self._remember(key, value, RIDDLE_BANK_CACHE_TTL)
+                    return value
+            except Exception as e:
+                logger.warning("⚠️ Redis riddle cache read failed: %s", e)
+
+        return None
+
+    async def set(self, key: str, value: List[Dict[str, str]], ttl: int = RIDDLE_BANK_CACHE_TTL):
+        """Store a bank in memory and, if configured, in Redis"""
+        self._remember(key, value, ttl)
+
+        if self._redis is not None:
+            try:
+                await self._redis.set(key, _json_dumps_sorted(value), ex=ttl)
+            except Exception as e:
+                logger.warning("⚠️ Redis riddle cache write failed: %s", e)
+
+    def _remember(self, key: str, value: List[Dict[str, str]], ttl: int):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def aclose(self):
+        """Close the Redis connection if one was opened"""
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
 
 class RiddleGeneratorService:
     """Generate riddle banks using Groq API"""
@@ -17,6 +258,23 @@ class RiddleGeneratorService:
     def __init__(self):
         self.groq_api_key = os.getenv("GROQ_API_KEY")
         self._initialized = False
+        self._client = None
+        self._pool: Dict[str, List[Dict[str, str]]] = {}
+        self._refill_tasks: Dict[str, asyncio.Task] = {}
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._cache = RiddleBankCache()
+        # Cache keys of banks already pooled here; their riddles are all in _seen
+        self._pooled_banks: set = set()
+        self.stats = {"hits": 0, "misses": 0}
+        # Flipped off the first time the SDK or model rejects structured outputs
+        self._structured_outputs = RiddleBank is not None
+
+        # Client-side limits: requests in flight and a token bucket for Groq's QPM
+        self._max_concurrency = int(os.getenv("RIDDLE_MAX_CONCURRENCY", "8"))
+        self._qpm = float(os.getenv("RIDDLE_QPM", "30"))
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._tokens = float(self._max_concurrency)
+        self._last_refill = time.monotonic()
 
     async def initialize(self):
         """Initialize the service"""
@@ -25,18 +283,77 @@ class RiddleGeneratorService:
                 logger.error("❌ Cannot initialize RiddleGeneratorService: GROQ_API_KEY not set")
                 return False
 
+            if AsyncOpenAI is None:
+                logger.error("❌ Cannot initialize RiddleGeneratorService: openai package not installed")
+                return False
+
+            # Created here so it binds to the running event loop
+            if self._sem is None:
+                self._sem = asyncio.Semaphore(self._max_concurrency)
+
+            # One shared client keeps the Groq connection pool warm across calls
+            if self._client is None:
+                self._client = AsyncOpenAI(
+                    api_key=self.groq_api_key,
+                    base_url="https://api.groq.com/openai/v1",
+                    timeout=httpx.Timeout(30.0, connect=5.0),
+                    max_retries=0  # Retries are handled by _with_retry
+                )
+
             logger.info("✅ Riddle Generator Service initialized with Groq API")
             self._initialized = True
             return True
 
         except Exception as e:
-            logger.error(f"❌ Error initializing RiddleGeneratorService: {e}")
+            logger.error("❌ Error initializing RiddleGeneratorService: %s", e)
             self._initialized = False
             return False
 
     def is_available(self) -> bool:
         """Check if service is ready"""
-        return self._initialized and bool(self.groq_api_key)
+        return self._initialized and bool(self.groq_api_key) and self._client is not None
+
+    async def aclose(self):
+        """Cancel pending refills and close the shared Groq client"""
+        for task in self._refill_tasks.values():
+            task.cancel()
+        self._refill_tasks.clear()
+
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+        await self._cache.aclose()
+        self._initialized = False
+
+    async def warmup(self, difficulties=("easy", "medium", "hard"), count: int = RIDDLE_POOL_SIZE) -> Dict[str, int]:
+        """
+        Fill the riddle pools for several difficulties concurrently
+
+        Args:
+            difficulties: Difficulty levels to prepare
+            count: Number of riddles to generate per difficulty
+
+        Returns:
+            dict: difficulty -> number of riddles added (0 on failure)
+        """
+        if not self.is_available():
+            logger.warning("⚠️ Riddle generator not available, skipping warmup")
+            return {}
+
+        results = await asyncio.gather(
+            *(self._refill(difficulty, count) for difficulty in difficulties),
+            return_exceptions=True
+        )
+
+        added = {}
+        for difficulty, result in zip(difficulties, results):
+            if isinstance(result, Exception):
+                logger.warning("⚠️ Riddle warmup failed for '%s': %s", difficulty, result)
+                added[difficulty] = 0
+            else:
+                added[difficulty] = result
+        logger.info("✅ Riddle pools warmed up: %s", added)
+        return added
 
     async def generate_riddle_bank(self, count: int = 5, difficulty: str = "easy") -> Dict[str, Any]:
         """
@@ -56,6 +373,7 @@ class RiddleGeneratorService:
                 'error': str or None
             }
         """
+        request_id.set(uuid.uuid4().hex[:8])
         try:
             if not self.is_available():
                 logger.warning("⚠️ Riddle generator not available")
@@ -65,31 +383,26 @@ class RiddleGeneratorService:
                     'error': 'Service not initialized'
                 }
 
-            from openai import AsyncOpenAI
-
-            # Use direct Groq API call
-            client = AsyncOpenAI(
-                api_key=self.groq_api_key,
-                base_url="https://api.groq.com/openai/v1"
-            )
+            # Top up the pool first if it can't cover this request; the second
+            # pass asks for fresh riddles when the cached bank was mostly repeats
+            for use_cache in (True, False):
+                if len(self._pool.get(difficulty, [])) >= count:
+                    break
+                await self._wait_for_refill(difficulty, max(count, RIDDLE_POOL_SIZE), use_cache)
 
-            prompt = self._create_prompt(count, difficulty)
+            pool = self._pool.get(difficulty, [])
+            riddles = pool[:count]
+            del pool[:count]
 
-            response = await client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.8,  # Higher temperature for variety
-                max_tokens=800
-            )
-
-            raw_response = response.choices[0].message.content.strip()
-            logger.debug(f"Raw riddle bank response: {raw_response}")
-
-            # Parse JSON response
-            riddles = self._parse_response(raw_response)
+            # Refill in the background so the next request is served from memory
+            if len(pool) < RIDDLE_POOL_REFILL_THRESHOLD:
+                self._schedule_refill(difficulty)
 
             if riddles:
-                logger.info(f"✅ Generated {len(riddles)} riddles")
+                logger.info(
+                    "✅ Served %d %s riddles rid=%s (%d left in pool)",
+                    len(riddles), difficulty, request_id.get(), len(pool)
+                )
                 return {
                     'success': True,
                     'riddles': riddles,
@@ -104,98 +417,315 @@ class RiddleGeneratorService:
                 }
 
         except Exception as e:
-            logger.error(f"❌ Error generating riddle bank: {e}")
+            logger.error("❌ Error generating riddle bank rid=%s: %s", request_id.get(), e)
             return {
                 'success': False,
                 'riddles': [],
                 'error': str(e)
             }
 
-    def _create_prompt(self, count: int, difficulty: str) -> str:
-        """Create prompt for riddle generation"""
-
-        difficulty_guidelines = {
-            "easy": "Simple riddles about everyday objects (animals, household items, body parts). Example: 'I have hands but cannot clap. What am I?' Answer: 'clock'",
-            "medium": "Riddles about concepts, nature, abstract ideas. Example: 'I can fly without wings. I can cry without eyes. What am I?' Answer: 'cloud'",
-            "hard": "Wordplay riddles, logic puzzles. Example: 'The more you take, the more you leave behind. What am I?' Answer: 'footsteps'"
-        }
+    async def generate_many(self, specs: List[Tuple[int, str]]) -> List[Dict[str, Any]]:
+        """
+        Generate many riddle banks concurrently, e.g. to populate a database offline
 
-        guidelines = difficulty_guidelines.get(difficulty, difficulty_guidelines["easy"])
+        Each spec gets its own fresh Groq request rather than draining the
+        shared pool; concurrency is bounded by the client-side rate limiter.
 
-        return f"""You are a riddle master creating riddles for children.
+        Args:
+            specs: (count, difficulty) pairs
 
-Generate {count} DIFFERENT riddles. Each riddle must be UNIQUE and VARIED.
+        Returns:
+            list: one generate_riddle_bank-style result dict per spec, in order
+        """
+        request_id.set(uuid.uuid4().hex[:8])
+        if not self.is_available():
+            logger.warning("⚠️ Riddle generator not available")
+            return [{'success': False, 'riddles': [], 'error': 'Service not initialized'} for _ in specs]
+
+        results = await asyncio.gather(
+            *(self._fetch_riddles(count, difficulty, use_cache=False) for count, difficulty in specs),
+            return_exceptions=True
+        )
+
+        banks = []
+        for result in results:
+            if isinstance(result, Exception):
+                banks.append({'success': False, 'riddles': [], 'error': str(result)})
+                continue
+            riddles = self._drop_seen(result)
+            banks.append({
+                'success': bool(riddles),
+                'riddles': riddles,
+                'error': None if riddles else 'Failed to parse riddles'
+            })
+
+        logger.info("✅ Generated %d riddle banks (%d failed)", len(banks), sum(not b['success'] for b in banks))
+        return banks
+
+    async def _fetch_riddles(self, count: int, difficulty: str, use_cache: bool = True) -> List[Dict[str, str]]:
+        """Get a batch of riddles from the bank cache or from Groq"""
+        prompt = self._create_prompt(count, difficulty)
+        cache_key = self._cache.cache_key(prompt, difficulty)
+
+        # Reading back a bank this process already pooled would only yield repeats
+        if use_cache and cache_key not in self._pooled_banks:
+            cached = await self._cache.get(cache_key)
+            if cached:
+                self.stats["hits"] += 1
+                self._pooled_banks.add(cache_key)
+                logger.info("✅ Riddle bank cache hit for %d %s riddles", count, difficulty)
+                # Shuffle so a reused bank doesn't replay in the same order
+                return random.sample(cached, len(cached))
+            self.stats["misses"] += 1
+
+        riddles = await self._fetch_structured(prompt, count) if self._structured_outputs else None
+
+        if riddles is None:
+            # Use direct Groq API call on the shared client
+            response = await self._with_retry(lambda: self._client.chat.completions.create(
+                model="llama-3.1-8b-instant",
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.8,  # Higher temperature for variety
+                max_tokens=_max_tokens_for(count),
+                response_format={"type": "json_object"}
+            ))
 
-**Requirements:**
-- Difficulty: {difficulty} - {guidelines}
-- Make riddles diverse (don't repeat similar patterns)
-- Riddles should be simple and clear for children
-- Each riddle must have ONE clear answer (single word or simple phrase)
-- Answer should be straightforward (no multiple interpretations)
-- Return ONLY valid JSON, no other text
+            raw_response = response.choices[0].message.content.strip()
+            _log_raw_response(raw_response)
 
-**Output Format (JSON only):**
-{{
-  "riddles": [
-    {{"riddle": "I have hands but cannot clap. What am I?", "answer": "clock"}},
-    {{"riddle": "I have a face and two hands, but no arms or legs. What am I?", "answer": "clock"}},
-    {{"riddle": "I'm tall when I'm young, and short when I'm old. What am I?", "answer": "candle"}},
-    {{"riddle": "What has keys but no locks?", "answer": "piano"}},
-    {{"riddle": "I have a neck but no head. What am I?", "answer": "bottle"}}
-  ]
-}}
+            # Parse JSON response
+            riddles = self._parse_response(raw_response)
 
-**CRITICAL:**
-- Return ONLY the JSON
-- Each riddle must be different
-- Answer must be a simple word or short phrase (1-3 words)
-- Answer should be the MOST COMMON/EXPECTED answer
+        if riddles:
+            self._pooled_banks.add(cache_key)
+            await self._cache.set(cache_key, riddles)
+        return riddles
 
-Generate {count} riddles now:"""
+    async def _fetch_structured(self, prompt: str, count: int) -> Optional[List[Dict[str, str]]]:
+        """
+        Request the bank as a RiddleBank structured output
 
-    def _parse_response(self, raw_response: str) -> List[Dict[str, Any]]:
-        """Parse JSON response from LLM"""
+        Returns None when structured outputs are unsupported by the SDK or
+        model, and disables them so later calls go straight to JSON mode.
+        """
         try:
-            # Try to extract JSON from response
-            # Sometimes LLM adds markdown code blocks
-            if "```json" in raw_response:
-                # Extract JSON from markdown
-                start = raw_response.find("```json") + 7
-                end = raw_response.find("```", start)
-                json_str = raw_response[start:end].strip()
-            elif "```" in raw_response:
-                # Extract JSON from generic code block
-                start = raw_response.find("```") + 3
-                end = raw_response.find("```", start)
-                json_str = raw_response[start:end].strip()
-            else:
-                json_str = raw_response.strip()
-
-            # Parse JSON
-            data = json.loads(json_str)
-
-            if 'riddles' in data and isinstance(data['riddles'], list):
-                # Validate each riddle
-                valid_riddles = []
-                for r in data['riddles']:
-                    if 'riddle' in r and 'answer' in r:
-                        # Ensure both are strings
-                        valid_riddles.append({
-                            'riddle': str(r['riddle']),
-                            'answer': str(r['answer']).strip()
-                        })
-                    else:
-                        logger.warning(f"⚠️ Invalid riddle format: {r}")
+            response = await self._with_retry(lambda: self._client.beta.chat.completions.parse(
+                model="llama-3.1-8b-instant",
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.8,  # Higher temperature for variety
+                max_tokens=_max_tokens_for(count),
+                response_format=RiddleBank
+            ))
+        except (AttributeError, openai.BadRequestError) as e:
+            logger.info("Structured outputs unavailable, using JSON mode: %s", e)
+            self._structured_outputs = False
+            return None
+        except (openai.LengthFinishReasonError, openai.ContentFilterFinishReasonError) as e:
+            logger.warning("⚠️ Structured riddle response incomplete: %s", e)
+            return None
+
+        parsed = response.choices[0].message.parsed
+        if parsed is None:
+            return None
+        return [{'riddle': r.riddle, 'answer': r.answer.strip()} for r in parsed.riddles]
+
+    async def _with_retry(self, request_factory, max_retries: int = 3, base: float = 1.0,
+                          cap: float = 30.0, jitter: float = 0.2):
+        """
+        Run a Groq request, retrying rate limits, timeouts and 5xx with backoff
+
+        Delays grow as base * 2**attempt (capped) with +/- jitter, and a
+        Retry-After header from the server takes precedence. Auth and bad
+        request errors are raised immediately.
+        """
+        retryable = (
+            openai.RateLimitError,
+            openai.APITimeoutError,
+            openai.APIConnectionError,
+            openai.InternalServerError,
+        )
+
+        for attempt in range(max_retries + 1):
+            try:
+                async with self._sem:
+                    await self._acquire_token()
+                    return await request_factory()
+            except retryable as e:
+                if attempt >= max_retries:
+                    raise
+
+                delay = min(cap, base * 2 ** attempt) * (1 + random.uniform(-jitter, jitter))
+                response = getattr(e, "response", None)
+                retry_after = response.headers.get("retry-after") if response is not None else None
+                if retry_after:
+                    try:
+                        delay = min(cap, float(retry_after))
+                    except ValueError:
+                        pass
+
+                logger.warning(
+                    "⚠️ Groq request failed (%s), retry %d/%d in %.1fs",
+                    type(e).__name__, attempt + 1, max_retries, delay,
+                )
+                await asyncio.sleep(delay)
+
+    async def _acquire_token(self):
+        """Wait for a request token so bursts stay under the configured QPM"""
+        rate = self._qpm / 60.0
+        while True:
+            now = time.monotonic()
+            self._tokens = min(float(self._max_concurrency), self._tokens + (now - self._last_refill) * rate)
+            self._last_refill = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return
+            await asyncio.sleep((1.0 - self._tokens) / rate)
+
+    async def _refill(self, difficulty: str, pool_size: int = RIDDLE_POOL_SIZE, use_cache: bool = True) -> int:
+        """Generate a batch of riddles in one call and add it to the pool"""
+        riddles = self._drop_seen(await self._fetch_riddles(pool_size, difficulty, use_cache=use_cache))
+        self._pool.setdefault(difficulty, []).extend(riddles)
+        logger.info("✅ Added %d %s riddles to the pool", len(riddles), difficulty)
+        return len(riddles)
+
+    def _drop_seen(self, riddles: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Filter out riddles already handed out recently and remember the rest"""
+        fresh = []
+        for r in riddles:
+            key = " ".join(r['riddle'].lower().split())
+            if key in self._seen:
+                continue
+            self._seen[key] = None
+            fresh.append(r)
+
+        while len(self._seen) > RIDDLE_SEEN_WINDOW:
+            self._seen.popitem(last=False)
+
+        if len(fresh) < len(riddles):
+            logger.info("Skipped %d repeated riddles", len(riddles) - len(fresh))
+        return fresh
+
+    async def stream_riddles(self, count: int = 5, difficulty: str = "easy") -> AsyncIterator[Dict[str, str]]:
+        """
+        Stream freshly generated riddles, yielding each one as soon as it is complete
+
+        Args:
+            count: Number of riddles to generate (default 5)
+            difficulty: Difficulty level: "easy", "medium", "hard"
+
+        Yields:
+            dict: {'riddle': str, 'answer': str}
+        """
+        request_id.set(uuid.uuid4().hex[:8])
+        if not self.is_available():
+            logger.warning("⚠️ Riddle generator not available")
+            return
+
+        stream = await self._with_retry(lambda: self._client.chat.completions.create(
+            model="llama-3.1-8b-instant",
+            messages=[{"role": "user", "content": self._create_prompt(count, difficulty)}],
+            temperature=0.8,  # Higher temperature for variety
+            max_tokens=_max_tokens_for(count),
+            response_format={"type": "json_object"},
+            stream=True
+        ))
+
+        parser = _RiddleStreamParser()
+        emitted = 0
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            for r in parser.feed(delta):
+                if 'riddle' in r and 'answer' in r:
+                    riddle = {
+                        'riddle': str(r['riddle']),
+                        'answer': str(r['answer']).strip()
+                    }
+                    if not self._drop_seen([riddle]):
                         continue
+                    yield riddle
+                    emitted += 1
+                    if emitted >= count:
+                        return
+
+    def _schedule_refill(self, difficulty: str, pool_size: int = RIDDLE_POOL_SIZE,
+                         use_cache: bool = False) -> asyncio.Task:
+        """Start a refill for a difficulty unless one is running, returning the running task"""
+        task = self._refill_tasks.get(difficulty)
+        if task is not None:
+            return task
+
+        async def _background_refill():
+            try:
+                # Top-ups fetch fresh riddles rather than replaying the cached bank
+                await self._refill(difficulty, pool_size, use_cache=use_cache)
+            except Exception as e:
+                logger.warning("⚠️ Riddle refill failed for '%s': %s", difficulty, e)
+            finally:
+                self._refill_tasks.pop(difficulty, None)
+
+        task = self._refill_tasks[difficulty] = asyncio.create_task(_background_refill())
+        return task
+
+    async def _wait_for_refill(self, difficulty: str, pool_size: int, use_cache: bool):
+        """Wait for the difficulty's refill, starting one if none is running
+
+        Concurrent callers share one task, so a cold pool costs a single Groq call.
+        """
+        task = self._schedule_refill(difficulty, pool_size, use_cache)
+        try:
+            # Shielded so one caller giving up doesn't cancel the refill for the others
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # aclose() cancelled the refill; the caller itself wasn't cancelled
+            if not task.cancelled():
+                raise
 
-                return valid_riddles
+    def _create_prompt(self, count: int, difficulty: str) -> str:
+        """Create prompt for riddle generation"""
+        guidelines = _DIFFICULTY_GUIDELINES.get(difficulty, _DIFFICULTY_GUIDELINES["easy"])
+        return _PROMPT_TEMPLATE.format(count=count, difficulty=difficulty, guidelines=guidelines)
 
-            return []
+    def _parse_response(self, raw_response: str) -> List[Dict[str, Any]]:
+        """Parse JSON response from LLM"""
+        try:
+            # JSON mode returns a bare document, so parse it directly
+            # (orjson errors subclass json.JSONDecodeError)
+            try:
+                data = _json_loads(raw_response)
+            except json.JSONDecodeError:
+                data = _json_loads(self._extract_fenced_json(raw_response))
+
+            riddles = data.get('riddles') if isinstance(data, dict) else None
+            if not isinstance(riddles, list):
+                return []
+
+            # Validate each riddle, ensuring both fields are strings
+            valid_riddles = [
+                {'riddle': str(r['riddle']), 'answer': str(r['answer']).strip()}
+                for r in riddles
+                if isinstance(r, dict) and 'riddle' in r and 'answer' in r
+            ]
+            if len(valid_riddles) < len(riddles):
+                logger.warning("⚠️ Dropped %d riddles with invalid format", len(riddles) - len(valid_riddles))
+
+            return valid_riddles
 
         except json.JSONDecodeError as e:
-            logger.error(f"❌ JSON parse error: {e}")
-            logger.debug(f"Raw response: {raw_response}")
+            logger.error("❌ JSON parse error: %s", e)
+            _log_raw_response(raw_response, always=True)
             return []
         except Exception as e:
-            logger.error(f"❌ Error parsing response: {e}")
+            logger.error("❌ Error parsing response: %s", e)
             return []
+
+    @staticmethod
+    def _extract_fenced_json(raw_response: str) -> str:
+        """Fallback for responses that wrap the JSON in markdown code blocks or prose"""
+        match = _FENCE_RE.search(raw_response) or _JSON_OBJ_RE.search(raw_response)
+        if match is None:
+            return raw_response.strip()
+        return match.group(1 if match.re is _FENCE_RE else 0)
@@ -5,22 +5,71 @@ Enhanced semantic search using vector database
 
 import logging
 import asyncio
+import hashlib
+import heapq
 import os
-from typing import Dict, List, Optional
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
+from functools import lru_cache
 
 # Qdrant and ML dependencies
 try:
-    from qdrant_client import QdrantClient
+    import numpy as np
+    from qdrant_client import AsyncQdrantClient
     from qdrant_client import models
-    from qdrant_client.models import Filter, FieldCondition, Match, PointStruct
-    from sentence_transformers import SentenceTransformer
+    from qdrant_client.models import Filter, FieldCondition, MatchAny, PointStruct
+    from qdrant_client.http.exceptions import UnexpectedResponse
+    import grpc
     QDRANT_AVAILABLE = True
 except ImportError:
     QDRANT_AVAILABLE = False
 
+# Optional C-accelerated fuzzy matching for the text search fallback
+try:
+    from rapidfuzz import fuzz, process as rf_process
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Query embeddings kept per instance (MiniLM vectors are ~1.5KB each)
+_EMB_CACHE_MAX = 4096
+# How long the in-memory payloads for random selection are used before a refresh
+_RANDOM_POOL_TTL = 3600
+# Payload fields kept per point for random selection (plus the language/category field)
+_RANDOM_PICK_FIELDS = ["title", "filename", "alternatives", "romanized", "metadata"]
+# Embedding inference runs here, off the event loop; two workers keep parallel
+# encodes from thrashing CPU caches for the transformer weights
+_encode_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="emb")
+# Vector queries arriving within this window are sent as one query_batch_points call
+_QUERY_BATCH_WINDOW = 0.005
+# Larger bursts are split so one slow batch doesn't hold every caller
+_QUERY_BATCH_MAX = 32
+# Connections kept open to Qdrant so concurrent searches don't queue on the pool
+_QDRANT_POOL_SIZE = 100
+# How long the available languages/categories lists are served from memory
+_GROUP_VALUES_TTL = 300
+# Scrolling for distinct languages/categories stops once this many are found
+_GROUP_VALUES_MAX = 50
+
+
+def _is_unsupported_call(error: BaseException) -> bool:
+    """True when the client or server has no such API, not for timeouts or transient errors"""
+    if isinstance(error, AttributeError):
+        return True  # Client predates the method
+    if isinstance(error, UnexpectedResponse):
+        return error.status_code in (404, 405)
+    if isinstance(error, grpc.RpcError):
+        return error.code() == grpc.StatusCode.UNIMPLEMENTED
+    return False
+
+
 @dataclass
 class QdrantSearchResult:
     """Enhanced search result with vector scoring"""
@@ -32,95 +81,217 @@ class QdrantSearchResult:
     alternatives: List[str]
     romanized: str
 
+@dataclass(frozen=True)
+class SearchConfig:
+    """Semantic search settings shared by every QdrantSemanticSearch instance"""
+    __slots__ = (
+        "qdrant_url", "qdrant_api_key", "qdrant_prefer_grpc", "qdrant_grpc_port", "music_collection", "stories_collection",
+        "embedding_model", "search_limit", "min_score_threshold", "allowed_music_languages"
+    )
+    qdrant_url: str
+    qdrant_api_key: str
+    qdrant_prefer_grpc: bool
+    qdrant_grpc_port: int
+    music_collection: str
+    stories_collection: str
+    embedding_model: str
+    search_limit: int
+    min_score_threshold: float
+    allowed_music_languages: Tuple[str, ...]
+
+
+def _parse_allowed_languages() -> Tuple[str, ...]:
+    """Parse allowed music languages from environment variable
+
+    Returns:
+        Allowed language names, or an empty tuple to allow all languages
+    """
+    allowed = os.getenv("ALLOWED_MUSIC_LANGUAGES", "")
+    if allowed:
+        languages = tuple(lang.strip() for lang in allowed.split(",") if lang.strip())
+        logger.info(f"🎵 Music search restricted to languages: {', '.join(languages)}")
+        return languages
+    else:
+        logger.info("🎵 Music search enabled for ALL languages (no restrictions)")
+        return ()
+
+
+@lru_cache(maxsize=1)
+def _load_config() -> SearchConfig:
+    """Build the search configuration from environment variables (once per process)"""
+    return SearchConfig(
+        qdrant_url=os.getenv("QDRANT_URL", ""),
+        qdrant_api_key=os.getenv("QDRANT_API_KEY", ""),
+        qdrant_prefer_grpc=os.getenv("QDRANT_PREFER_GRPC", "true").lower() == "true",
+        qdrant_grpc_port=int(os.getenv("QDRANT_GRPC_PORT", "6334")),
+        music_collection="xiaozhi_music",
+        stories_collection="xiaozhi_stories",
+        embedding_model="all-MiniLM-L6-v2",
+        search_limit=10,
+        min_score_threshold=0.5,
+        allowed_music_languages=_parse_allowed_languages()
+    )
+
+
+# Local copy of collection vectors for scoring when Qdrant is unreachable, shared by every
+# instance: collection name -> (L2-normalized (N, d) float32 matrix, ids, payloads)
+_local_indexes: Dict[str, tuple] = {}
+
+# One async client per process, shared by every QdrantSemanticSearch instance
+_shared_client = None
+_shared_client_loop = None
+_shared_client_lock = threading.Lock()
+
+
+def _get_shared_client(config: SearchConfig) -> "AsyncQdrantClient":
+    """Return the process-wide async Qdrant client, creating it on first use
+
+    The client's connections belong to the event loop they were opened on, so
+    a new client is created if it is requested from a different loop.
+    """
+    global _shared_client, _shared_client_loop
+    loop = asyncio.get_running_loop()
+    with _shared_client_lock:
+        if _shared_client is None or _shared_client_loop is not loop:
+            _shared_client = AsyncQdrantClient(
+                url=config.qdrant_url,
+                api_key=config.qdrant_api_key,
+                # gRPC/protobuf instead of REST/JSON, on the gRPC port of the same host
+                prefer_grpc=config.qdrant_prefer_grpc,
+                grpc_port=config.qdrant_grpc_port,
+                grpc_options={"grpc.max_receive_message_length": 32 * 1024 * 1024},
+                pool_size=_QDRANT_POOL_SIZE,
+                timeout=10  # Add timeout for faster failure detection
+            )
+            _shared_client_loop = loop
+        return _shared_client
+
+
+async def aclose_shared_client():
+    """Close the shared Qdrant client
+
+    Safe to call when a job ends: the next _get_shared_client() opens a new
+    one, and every QdrantSemanticSearch fetches it again in initialize().
+    """
+    global _shared_client, _shared_client_loop
+    with _shared_client_lock:
+        client, _shared_client, _shared_client_loop = _shared_client, None, None
+    if client is not None:
+        await client.close()
+
+
 class QdrantSemanticSearch:
     """
     Advanced semantic search using Qdrant vector database
     """
 
-    def __init__(self, preloaded_model=None, preloaded_client=None):
+    def __init__(self, preloaded_model=None):
         self.is_available = QDRANT_AVAILABLE
 
-        # Use cached models if preloaded ones not provided
-        if preloaded_model is None or preloaded_client is None:
-            from ..utils.model_cache import model_cache
-            self.client = preloaded_client or model_cache.get_qdrant_client()
-            self.model = preloaded_model or model_cache.get_embedding_model()
-        else:
-            self.client = preloaded_client
-            self.model = preloaded_model
+        # Loaded in initialize() when not passed in, so constructing the service at import is cheap
+        self.model = preloaded_model
+
+        # The process-wide shared client, fetched again by each initialize()
+        self.client: Optional["AsyncQdrantClient"] = None
 
         self.is_initialized = False
 
-        # Qdrant configuration from environment variables
-        self.config = {
-            "qdrant_url": os.getenv("QDRANT_URL", ""),
-            "qdrant_api_key": os.getenv("QDRANT_API_KEY", ""),
-            "music_collection": "xiaozhi_music",
-            "stories_collection": "xiaozhi_stories",
-            "embedding_model": "all-MiniLM-L6-v2",
-            "search_limit": 10,
-            "min_score_threshold": 0.5,
-            "allowed_music_languages": self._parse_allowed_languages()
-        }
+        # LRU of query embeddings keyed by a hash of the text
+        self._emb_cache: "OrderedDict[bytes, object]" = OrderedDict()
+        self._emb_cache_lock = threading.Lock()
+
+        # Process-wide vector snapshots for the local search fallback
+        self._local_index = _local_indexes
+
+        # Payloads for random selection: collection name -> (loaded_at, all payloads, payloads per group)
+        self._random_pool: Dict[str, tuple] = {}
+        self._random_refresh_tasks: Dict[str, asyncio.Task] = {}
+
+        # Vector queries waiting for the next batch: collection name -> [(request, future)]
+        self._pending_queries: Dict[str, List[tuple]] = {}
+        self._batch_task: Optional[asyncio.Task] = None
+
+        # Lowercased search fields per (collection, point id) for the text search fallback
+        self._lc_cache: Dict[tuple, Dict] = {}
+
+        # Distinct languages/categories: collection name -> (loaded_at, sorted values)
+        self._group_values_cache: Dict[str, Tuple[float, List[str]]] = {}
+        # One lock per collection so languages and categories can load concurrently
+        self._group_values_locks: Dict[str, asyncio.Lock] = {}
+        # Cleared when the server has no facet API (Qdrant < 1.12)
+        self._facet_supported = True
+
+        # Embedding device, switched to CUDA in initialize() when a GPU is present
+        self._device = "cpu"
+
+        # Qdrant configuration, read from the environment once per process
+        self.config = _load_config()
+
+        # Built once: the allowed languages never change after startup
+        self._allowed_filter = self._build_allowed_languages_filter()
 
         if not QDRANT_AVAILABLE:
             logger.warning("Qdrant dependencies not available, semantic search will be limited")
 
-    def _parse_allowed_languages(self) -> List[str]:
-        """Parse allowed music languages from environment variable
+    async def initialize(self, collection_name: Optional[str] = None) -> bool:
+        """Initialize Qdrant client and embedding model with fallback support
 
-        Returns:
-            List of allowed language names, or empty list to allow all languages
+        Args:
+            collection_name: Collection this instance searches; only its vectors
+                are snapshot for the local fallback
         """
-        allowed = os.getenv("ALLOWED_MUSIC_LANGUAGES", "")
-        if allowed:
-            languages = [lang.strip() for lang in allowed.split(",") if lang.strip()]
-            logger.info(f"🎵 Music search restricted to languages: {', '.join(languages)}")
-            return languages
-        else:
-            logger.info("🎵 Music search enabled for ALL languages (no restrictions)")
-            return []
-
-    async def initialize(self) -> bool:
-        """Initialize Qdrant client and embedding model with fallback support"""
         if not self.is_available:
             logger.warning("Qdrant dependencies not available, semantic search will be limited")
             return False
 
         # Check if Qdrant configuration is provided
-        if not self.config["qdrant_url"] or not self.config["qdrant_api_key"]:
+        if not self.config.qdrant_url or not self.config.qdrant_api_key:
             logger.warning("Qdrant configuration missing, semantic search will be limited")
             return False
 
         try:
-            # Use preloaded model if available, otherwise load it from cache
+            # Use preloaded model if available, otherwise take the one prewarm loads
+            # (waiting in a worker thread if prewarm is still loading it)
             if self.model is None:
-                logger.info(f"Loading embedding model from cache: {self.config['embedding_model']}")
+                logger.info("Loading embedding model from cache")
                 from ..utils.model_cache import model_cache
-                self.model = model_cache.get_embedding_model(self.config["embedding_model"])
-                logger.info(f"✅ Loaded embedding model from cache: {self.config['embedding_model']}")
+                self.model = await asyncio.to_thread(model_cache.get_embedding_model)
+                logger.info("✅ Loaded embedding model from cache")
             else:
-                logger.info("✅ Using preloaded embedding model from prewarm")
-
-            # Use preloaded client if available, otherwise create it
-            if self.client is None:
-                self.client = QdrantClient(
-                    url=self.config["qdrant_url"],
-                    api_key=self.config["qdrant_api_key"],
-                    timeout=10  # Add timeout for faster failure detection
-                )
-            else:
-                logger.info("✅ Using preloaded Qdrant client from prewarm")
+                logger.info("✅ Using preloaded embedding model")
+
+            self._select_device()
+
+            # Fetched on every initialize(): the shared client is closed when a job ends
+            client = _get_shared_client(self.config)
+            if client is not self.client:
+                # Queued queries and refreshes belonged to the previous client
+                self._pending_queries = {}
+                self._batch_task = None
+                self._random_refresh_tasks.clear()
+                self.client = client
 
             # Test connection with timeout
             try:
-                collections = self.client.get_collections()
+                await self.client.get_collections()
                 logger.info("✅ Connected to Qdrant cloud successfully")
                 
                 # Check if collections exist and have data
                 await self._ensure_collections_exist()
+
+                # Keep vectors locally so search survives a later Qdrant outage
+                if collection_name is not None and collection_name not in self._local_index:
+                    await self._load_local_index(collection_name)
+
+                # Random stories are then picked from memory without a Qdrant call
+                if collection_name == self.config.stories_collection:
+                    try:
+                        await self._load_random_pool(collection_name, "category")
+                    except Exception as e:
+                        logger.warning(f"Preloading stories for random selection failed: {e}")
                 
                 self.is_initialized = True
+                await self.prefetch_metadata()
                 return True
                 
             except Exception as conn_error:
@@ -141,27 +312,172 @@ class QdrantSemanticSearch:
         try:
             # Check music collection exists
             try:
-                music_info = self.client.get_collection(self.config["music_collection"])
-                logger.info(f"Music collection '{self.config['music_collection']}' found with {music_info.points_count} points")
+                music_info = await self.client.get_collection(self.config.music_collection)
+                logger.info(f"Music collection '{self.config.music_collection}' found with {music_info.points_count} points")
+                await self._ensure_keyword_index(self.config.music_collection, music_info, "language")
             except Exception:
-                logger.warning(f"Music collection '{self.config['music_collection']}' not found in cloud")
+                logger.warning(f"Music collection '{self.config.music_collection}' not found in cloud")
 
             # Check stories collection exists
             try:
-                stories_info = self.client.get_collection(self.config["stories_collection"])
-                logger.info(f"Stories collection '{self.config['stories_collection']}' found with {stories_info.points_count} points")
+                stories_info = await self.client.get_collection(self.config.stories_collection)
+                logger.info(f"Stories collection '{self.config.stories_collection}' found with {stories_info.points_count} points")
+                await self._ensure_keyword_index(self.config.stories_collection, stories_info, "category")
             except Exception:
-                logger.warning(f"Stories collection '{self.config['stories_collection']}' not found in cloud")
+                logger.warning(f"Stories collection '{self.config.stories_collection}' not found in cloud")
 
         except Exception as e:
             logger.error(f"Error checking collections: {e}")
 
+    async def _ensure_keyword_index(self, collection_name: str, collection_info, field_name: str):
+        """Create a keyword payload index so filters on field_name are resolved by Qdrant"""
+        if field_name in (collection_info.payload_schema or {}):
+            return
+        try:
+            await self.client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=models.PayloadSchemaType.KEYWORD
+            )
+            logger.info(f"Created '{field_name}' payload index on '{collection_name}'")
+        except Exception as e:
+            logger.warning(f"Could not create '{field_name}' payload index on '{collection_name}': {e}")
+
+    async def _load_local_index(self, collection_name: str):
+        """Snapshot a collection's vectors and payloads for the local search fallback"""
+        # Music is limited to the allowed languages, as in every music query
+        scroll_filter = self._allowed_filter if collection_name == self.config.music_collection else None
+        ids, vectors, payloads = [], [], []
+        offset = None
+        try:
+            while True:
+                points, offset = await self.client.scroll(
+                    collection_name=collection_name,
+                    scroll_filter=scroll_filter,
+                    limit=256,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=True
+                )
+                for point in points:
+                    if isinstance(point.vector, list):
+                        ids.append(point.id)
+                        vectors.append(point.vector)
+                        payloads.append(point.payload)
+                if offset is None:
+                    break
+        except Exception as e:
+            logger.warning(f"Could not cache vectors from '{collection_name}' for local search: {e}")
+            return
+
+        if not vectors:
+            return
+        matrix = np.asarray(vectors, dtype=np.float32)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        self._local_index[collection_name] = (matrix, ids, payloads)
+        logger.info(f"Cached {len(ids)} vectors from '{collection_name}' for local search")
+
+    def _local_search(self, collection_name: str, query_embedding: List[float], limit: int,
+                      score_threshold: float) -> Optional[List["models.ScoredPoint"]]:
+        """Cosine top-k over the local vector snapshot, or None if there is no snapshot"""
+        snapshot = self._local_index.get(collection_name)
+        if snapshot is None:
+            return None
+
+        matrix, ids, payloads = snapshot
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        scores = matrix @ query
+
+        k = min(limit, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            models.ScoredPoint(id=ids[i], version=0, score=float(scores[i]), payload=payloads[i])
+            for i in top
+            if scores[i] >= score_threshold
+        ]
+
+    async def _query_vectors(self, collection_name: str, query_embedding: List[float], limit: int,
+                             query_filter=None, score_threshold: float = 0.3) -> List["models.ScoredPoint"]:
+        """Vector search in Qdrant, falling back to the local snapshot if the request fails"""
+        try:
+            return await self._batched_query(collection_name, models.QueryRequest(
+                query=query_embedding,
+                filter=query_filter,
+                limit=limit,
+                with_payload=True,
+                score_threshold=score_threshold
+            ))
+        except Exception as e:
+            local_result = self._local_search(collection_name, query_embedding, limit, score_threshold)
+            if local_result is None:
+                raise
+            logger.warning(f"Qdrant vector search failed, using local embeddings: {e}")
+            return local_result
+
+    async def _batched_query(self, collection_name: str, request: "models.QueryRequest") -> List["models.ScoredPoint"]:
+        """Queue a vector query so concurrent searches share one query_batch_points round-trip"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending_queries.setdefault(collection_name, []).append((request, future))
+        if self._batch_task is None:
+            self._batch_task = asyncio.create_task(self._flush_queries())
+        return await future
+
+    async def _flush_queries(self):
+        """Send every query queued during the batch window, batched per collection"""
+        await asyncio.sleep(_QUERY_BATCH_WINDOW)
+        pending, self._pending_queries = self._pending_queries, {}
+        self._batch_task = None  # Queries arriving from now on start the next batch
+
+        async def _run(collection_name: str, batch: List[tuple]):
+            try:
+                responses = await self.client.query_batch_points(
+                    collection_name=collection_name,
+                    requests=[request for request, _ in batch]
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            for (_, future), response in zip(batch, responses):
+                if not future.done():
+                    future.set_result(response.points)
+
+        await asyncio.gather(*(
+            _run(name, batch[i:i + _QUERY_BATCH_MAX])
+            for name, batch in pending.items()
+            for i in range(0, len(batch), _QUERY_BATCH_MAX)
+        ))
+
+    def _build_allowed_languages_filter(self) -> Optional["Filter"]:
+        """Qdrant filter restricting music to the allowed languages, or None if all are allowed"""
+        allowed = self.config.allowed_music_languages
+        if not allowed or not QDRANT_AVAILABLE:
+            return None
+        return Filter(must=[FieldCondition(key="language", match=MatchAny(any=list(allowed)))])
+
     def _get_embedding(self, text: str) -> List[float]:
         """Generate embedding for text"""
         if not text or not self.model:
             return []
+
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        with self._emb_cache_lock:
+            cached = self._emb_cache.get(key)
+            if cached is not None:
+                self._emb_cache.move_to_end(key)
+                return cached.tolist()
+
         try:
-            return self.model.encode(text).tolist()
+            embedding = self.model.encode(text)
+            with self._emb_cache_lock:
+                self._emb_cache[key] = embedding
+                if len(self._emb_cache) > _EMB_CACHE_MAX:
+                    self._emb_cache.popitem(last=False)
+            return embedding.tolist()
         except AttributeError as e:
             if "model_forward_params" in str(e):
                 logger.error("Embedding model version incompatibility detected. Please update sentence-transformers: pip install sentence-transformers>=2.2.2 transformers>=4.21.0")
@@ -177,6 +493,38 @@ class QdrantSemanticSearch:
             logger.error(f"Failed to generate embedding: {e}")
             return []
 
+    def _select_device(self):
+        """Move the embedding model to CUDA when available"""
+        try:
+            import torch
+            if not torch.cuda.is_available():
+                return
+            torch.backends.cuda.matmul.allow_tf32 = True  # TF32 matmuls on Ampere+
+            self.model = self.model.to("cuda")
+            self._device = "cuda"
+            logger.info("✅ Embedding model running on CUDA")
+        except Exception as e:
+            logger.debug(f"Embedding model stays on CPU: {e}")
+
+    def _get_embeddings(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        """Generate embeddings for many texts in batches"""
+        if not texts or not self.model:
+            return []
+        if batch_size is None:
+            # Larger batches keep a GPU busy; CPU throughput flattens out around 64
+            batch_size = 256 if self._device == "cuda" else 64
+        try:
+            return self.model.encode(
+                texts,
+                batch_size=batch_size,
+                device=self._device,
+                show_progress_bar=False,
+                convert_to_numpy=True
+            ).tolist()
+        except Exception as e:
+            logger.error(f"Failed to generate embeddings: {e}")
+            return []
+
     async def index_music_metadata(self, music_metadata: Dict) -> bool:
         """Index music metadata into Qdrant"""
         if not self.is_initialized:
@@ -184,8 +532,9 @@ class QdrantSemanticSearch:
             return False
 
         try:
-            points = []
-            point_id = 0
+            # First pass: build payloads and the text to embed for every song
+            drafts = []
+            texts = []
 
             for language, language_metadata in music_metadata.items():
                 for song_title, song_info in language_metadata.items():
@@ -214,39 +563,36 @@ class QdrantSemanticSearch:
                     if not combined_text:
                         continue
 
-                    # Generate embedding
-                    embedding = self._get_embedding(combined_text)
-                    if not embedding:
-                        continue
-
-                    # Prepare payload
-                    payload = {
+                    # song_info is stored once under 'metadata'; romanized/alternatives
+                    # are read from it when results are built (see _expand_metadata)
+                    drafts.append({
                         'title': song_title,
-                        'language': language,
-                        'romanized': song_info.get('romanized', song_title),
-                        'alternatives': alternatives,
-                        'keywords': keywords,
                         'filename': song_info.get('filename', f"{song_title}.mp3"),
-                        'file_path': f"{language}/{song_info.get('filename', f'{song_title}.mp3')}",
-                        'searchable_text': combined_text,
-                        'metadata': song_info
-                    }
-
-                    points.append(
-                        PointStruct(
-                            id=point_id,
-                            vector=embedding,
-                            payload=payload
-                        )
-                    )
-                    point_id += 1
+                        'language': language,
+                        'metadata': song_info,
+                        '_lc': self._lowercase_fields({
+                            'title': song_title,
+                            'romanized': song_info.get('romanized', song_title),
+                            'alternatives': alternatives,
+                            'keywords': keywords,
+                            'language': language
+                        }, 'language')
+                    })
+                    texts.append(combined_text)
+
+            # Second pass: embed all songs in batched forward passes
+            embeddings = await asyncio.get_running_loop().run_in_executor(_encode_executor, self._get_embeddings, texts)
+            points = [
+                PointStruct(id=point_id, vector=embedding, payload=payload)
+                for point_id, (embedding, payload) in enumerate(zip(embeddings, drafts))
+            ]
 
             # Upsert points to Qdrant
             if points:
-                self.client.upsert(
-                    collection_name=self.config["music_collection"],
-                    points=points
-                )
+                await self._upsert_in_batches(self.config.music_collection, points)
+                self._random_pool.pop(self.config.music_collection, None)
+                self._lc_cache.clear()
+                self._group_values_cache.pop(self.config.music_collection, None)
                 logger.info(f"Indexed {len(points)} music tracks into Qdrant")
                 return True
             else:
@@ -257,6 +603,19 @@ class QdrantSemanticSearch:
             logger.error(f"Failed to index music metadata: {e}")
             return False
 
+    async def _upsert_in_batches(self, collection_name: str, points: List["PointStruct"],
+                                 batch_size: int = 64, max_in_flight: int = 2):
+        """Upload points in fixed-size batches with a couple of requests in flight"""
+        semaphore = asyncio.Semaphore(max_in_flight)
+        batches = [points[i:i + batch_size] for i in range(0, len(points), batch_size)]
+
+        async def _upload(batch):
+            async with semaphore:
+                # Don't block on index commit per batch
+                await self.client.upsert(collection_name=collection_name, points=batch, wait=False)
+
+        await asyncio.gather(*(_upload(batch) for batch in batches))
+
     async def index_stories_metadata(self, stories_metadata: Dict) -> bool:
         """Skip indexing - use existing cloud collections"""
         logger.info("Skipping stories indexing - using existing cloud collections")
@@ -272,20 +631,20 @@ class QdrantSemanticSearch:
             if self.client:
                 try:
                     # Generate query embedding for true semantic search
-                    query_embedding = self._get_embedding(query)
+                    query_embedding = await asyncio.get_running_loop().run_in_executor(_encode_executor, self._get_embedding, query)
                     if query_embedding:
-                        search_result = self.client.search(
-                            collection_name=self.config["music_collection"],
-                            query_vector=query_embedding,
+                        search_result = await self._query_vectors(
+                            self.config.music_collection,
+                            query_embedding,
                             limit=limit * 3,  # Get more results for filtering
-                            with_payload=True,
+                            query_filter=self._allowed_filter,
                             score_threshold=0.3  # Lower threshold for better recall
                         )
                         
                         # Convert to our result format
                         results = []
                         for scored_point in search_result:
-                            payload = scored_point.payload
+                            payload = self._expand_metadata(self.config.music_collection, scored_point.payload)
                             
                             # Apply language filter if specified (but don't exclude all other languages)
                             if language_filter and payload.get('language') != language_filter:
@@ -303,11 +662,6 @@ class QdrantSemanticSearch:
                                 alternatives=payload.get('alternatives', []),
                                 romanized=payload.get('romanized', '')
                             ))
-                        
-                        # Filter by allowed languages if configured
-                        if self.config["allowed_music_languages"]:
-                            results = [r for r in results if r.language_or_category in self.config["allowed_music_languages"]]
-                            logger.info(f"🔒 Filtered to allowed languages: {len(results)} results remain")
 
                         # If we have good vector results, return them
                         if results:
@@ -320,65 +674,13 @@ class QdrantSemanticSearch:
 
                 # Fallback to enhanced text search with Qdrant data
                 try:
-                    scroll_result = self.client.scroll(
-                        collection_name=self.config["music_collection"],
-                        limit=1000,  # Get all points for comprehensive search
-                        with_payload=True
+                    final_results = await self._text_search(
+                        self.config.music_collection, "language", query, language_filter, limit,
+                        scroll_filter=self._allowed_filter
                     )
 
-                    results = []
-                    query_lower = query.lower().strip()
-                    query_words = query_lower.split()
-
-                    for point in scroll_result[0]:
-                        payload = point.payload
-                        
-                        # Get all searchable text fields
-                        title = payload.get('title', '').lower()
-                        romanized = payload.get('romanized', '').lower()
-                        alternatives = [alt.lower() for alt in payload.get('alternatives', [])]
-                        keywords = [kw.lower() for kw in payload.get('keywords', [])]
-                        language = payload.get('language', '').lower()
-                        
-                        # Calculate comprehensive similarity score
-                        score = self._calculate_fuzzy_score(query_lower, query_words, {
-                            'title': title,
-                            'romanized': romanized,
-                            'alternatives': alternatives,
-                            'keywords': keywords,
-                            'language': language
-                        })
-                        
-                        # Apply language preference (not filter)
-                        if language_filter:
-                            if payload.get('language') == language_filter:
-                                score *= 1.2  # Boost preferred language
-                            else:
-                                score *= 0.8  # Slight penalty for other languages
-                        
-                        # Only include results with meaningful scores
-                        if score > 0.2:
-                            results.append(QdrantSearchResult(
-                                title=payload['title'],
-                                filename=payload['filename'],
-                                language_or_category=payload['language'],
-                                score=score,
-                                metadata=payload,
-                                alternatives=payload.get('alternatives', []),
-                                romanized=payload.get('romanized', '')
-                            ))
-
-                    # Filter by allowed languages if configured
-                    if self.config["allowed_music_languages"]:
-                        results = [r for r in results if r.language_or_category in self.config["allowed_music_languages"]]
-                        logger.info(f"🔒 Filtered to allowed languages: {len(results)} results remain")
-
-                    # Sort by score and return top results
-                    results.sort(key=lambda x: x.score, reverse=True)
-                    final_results = results[:limit]
-
-                    if self.config["allowed_music_languages"]:
-                        logger.info(f"✅ Enhanced text search found {len(final_results)} results for '{query}' in allowed languages: {', '.join(self.config['allowed_music_languages'])}")
+                    if self.config.allowed_music_languages:
+                        logger.info(f"✅ Enhanced text search found {len(final_results)} results for '{query}' in allowed languages: {', '.join(self.config.allowed_music_languages)}")
                     else:
                         logger.info(f"✅ Enhanced text search found {len(final_results)} results for '{query}' across all languages")
                     return final_results
@@ -394,10 +696,152 @@ class QdrantSemanticSearch:
             logger.error(f"Music search completely failed: {e}")
             return []
 
-    def _calculate_fuzzy_score(self, query: str, query_words: list, fields: dict) -> float:
-        """Calculate fuzzy similarity score with spell tolerance"""
-        max_score = 0.0
-        
+    async def _scroll_pages(self, collection_name: str, scroll_filter=None, page_size: int = 200,
+                            with_payload=True):
+        """Yield a collection's points page by page"""
+        offset = None
+        while True:
+            points, offset = await self.client.scroll(
+                collection_name=collection_name,
+                scroll_filter=scroll_filter,
+                limit=page_size,
+                offset=offset,
+                with_payload=with_payload
+            )
+            if points:
+                yield points
+            if offset is None:
+                return
+
+    async def _text_search(self, collection_name: str, group_field: str, query: str,
+                           preferred_group: Optional[str], limit: int,
+                           scroll_filter=None) -> List[QdrantSearchResult]:
+        """Fuzzy text search over a collection, keeping the top results in a heap
+
+        Pages are scored as they arrive, and scanning stops once the heap is
+        full of results that no remaining point could outscore.
+        """
+        if limit <= 0:
+            return []
+
+        query_lower = query.lower().strip()
+        query_words = [word for word in query_lower.split() if len(word) >= 2]
+        best_possible = 1.2 if preferred_group else 1.0  # Exact title match with group boost
+
+        # Entries are (score, -sequence, payload) so ties keep scroll order
+        heap = []
+        sequence = 0
+        async for points in self._scroll_pages(collection_name, scroll_filter):
+            # Lowercased searchable fields are computed once per point and reused
+            lowered = [self._lowered_fields(collection_name, point, group_field) for point in points]
+            fuzzy_scores = self._batch_fuzzy_scores(
+                query_words,
+                [fields['title'] for fields in lowered],
+                [fields['romanized'] for fields in lowered]
+            )
+
+            for i, point in enumerate(points):
+                payload = point.payload
+
+                # Calculate comprehensive similarity score
+                score = self._calculate_fuzzy_score(
+                    query_lower, query_words, lowered[i],
+                    fuzzy_scores[i] if fuzzy_scores is not None else None
+                )
+
+                # Apply language/category preference (not filter)
+                if preferred_group:
+                    if payload.get(group_field) == preferred_group:
+                        score *= 1.2  # Boost preferred group
+                    else:
+                        score *= 0.8  # Slight penalty for other groups
+
+                # Only include results with meaningful scores
+                if score > 0.2:
+                    entry = (score, -sequence, payload)
+                    if len(heap) < limit:
+                        heapq.heappush(heap, entry)
+                    else:
+                        heapq.heappushpop(heap, entry)
+                sequence += 1
+
+            if len(heap) == limit and heap[0][0] >= best_possible:
+                break
+
+        ranked = [
+            (score, self._expand_metadata(collection_name, payload))
+            for score, _, payload in sorted(heap, reverse=True)
+        ]
+        return [
+            QdrantSearchResult(
+                title=payload['title'],
+                filename=payload['filename'],
+                language_or_category=payload[group_field],
+                score=score,
+                metadata=payload,
+                alternatives=payload.get('alternatives', []),
+                romanized=payload.get('romanized', '')
+            )
+            for score, payload in ranked
+        ]
+
+    def _expand_metadata(self, collection_name: str, payload: Dict) -> Dict:
+        """Music payload with romanized/alternatives filled in from its song_info"""
+        if collection_name != self.config.music_collection:
+            return payload
+        song_info = payload.get('metadata')
+        if not isinstance(song_info, dict):
+            return payload
+        return {'romanized': payload.get('title', ''), **song_info, **payload}
+
+    @staticmethod
+    def _lowercase_fields(payload: Dict, group_field: str) -> Dict:
+        """Lowercased copies of the fields the text search compares against"""
+        return {
+            'title': payload.get('title', '').lower(),
+            'romanized': payload.get('romanized', '').lower(),
+            'alternatives': [alt.lower() for alt in payload.get('alternatives', [])],
+            'keywords': [kw.lower() for kw in payload.get('keywords', [])],
+            'language': payload.get(group_field, '').lower()  # Category for stories
+        }
+
+    def _lowered_fields(self, collection_name: str, point, group_field: str) -> Dict:
+        """Lowercased search fields for a point, from its '_lc' payload or computed once"""
+        key = (collection_name, point.id)
+        fields = self._lc_cache.get(key)
+        if fields is None:
+            fields = point.payload.get('_lc') or self._lowercase_fields(point.payload, group_field)
+            self._lc_cache[key] = fields
+        return fields
+
+    def _batch_fuzzy_scores(self, query_words: list, titles: List[str], romanized_values: List[str]):
+        """Score every candidate title/romanized name against the query words in one call
+
+        Returns:
+            Per-candidate [title, romanized] best word similarity in [0, 1],
+            or None when rapidfuzz is not installed
+        """
+        if not RAPIDFUZZ_AVAILABLE or not query_words or not titles:
+            return None
+
+        # Compare query words with every word of every title, like _simple_fuzzy_match
+        choices = []
+        offsets = []
+        for text in titles + romanized_values:
+            offsets.append(len(choices))
+            choices.extend(text.split() or [""])
+
+        scores = rf_process.cdist(query_words, choices, scorer=fuzz.ratio, workers=-1).max(axis=0)
+        best = np.maximum.reduceat(scores, offsets) / 100.0
+        return best.reshape(2, len(titles)).T.tolist()
+
+    def _calculate_fuzzy_score(self, query: str, query_words: list, fields: dict,
+                               fuzzy_scores=None) -> float:
+        """Calculate fuzzy similarity score with spell tolerance
+
+        fuzzy_scores optionally holds precomputed (title, romanized) similarities
+        from _batch_fuzzy_scores, replacing the per-word Python fuzzy pass.
+        """
         # Exact matches (highest priority)
         if query == fields['title']:
             return 1.0
@@ -407,44 +851,59 @@ class QdrantSemanticSearch:
             return 0.9
         if query in fields['keywords']:
             return 0.85
-            
-        # Substring matches
+
+        # Substring matches; each tier outscores everything below it, so the
+        # first hit is final
         if query in fields['title']:
-            max_score = max(max_score, 0.8)
+            return 0.8
         if query in fields['romanized']:
-            max_score = max(max_score, 0.75)
+            return 0.75
         for alt in fields['alternatives']:
             if query in alt:
-                max_score = max(max_score, 0.7)
+                return 0.7
         for kw in fields['keywords']:
             if query in kw:
-                max_score = max(max_score, 0.65)
-                
-        # Word-level matching (handles partial matches and misspellings)
+                return 0.65
+
+        # Word-level matching (handles partial matches); query_words excludes
+        # words shorter than 2 characters
+        max_score = 0.0
         for word in query_words:
-            if len(word) < 2:  # Skip very short words
-                continue
-                
-            # Check each field for word matches
             if word in fields['title']:
-                max_score = max(max_score, 0.6)
-            if word in fields['romanized']:
-                max_score = max(max_score, 0.55)
-            for alt in fields['alternatives']:
-                if word in alt:
-                    max_score = max(max_score, 0.5)
-            for kw in fields['keywords']:
-                if word in kw:
-                    max_score = max(max_score, 0.45)
-                    
-            # Fuzzy matching for misspellings (simple edit distance)
-            for field_name, field_value in [('title', fields['title']), ('romanized', fields['romanized'])]:
+                return 0.6  # Nothing below can beat a title word match
+            if word in fields['romanized'] and 0.55 > max_score:
+                max_score = 0.55
+            if max_score < 0.5:
+                for alt in fields['alternatives']:
+                    if word in alt:
+                        max_score = 0.5
+                        break
+            if max_score < 0.45:
+                for kw in fields['keywords']:
+                    if word in kw:
+                        max_score = 0.45
+                        break
+
+        # Fuzzy matches score at most 0.4, so skip them once a word matched
+        if max_score >= 0.4:
+            return max_score
+
+        if fuzzy_scores is not None:
+            title_fuzzy, romanized_fuzzy = fuzzy_scores
+            if title_fuzzy > 0.7 and title_fuzzy * 0.4 > max_score:  # Only consider good fuzzy matches
+                max_score = title_fuzzy * 0.4
+            if romanized_fuzzy > 0.7 and romanized_fuzzy * 0.35 > max_score:
+                max_score = romanized_fuzzy * 0.35
+            return max_score
+
+        # Fuzzy matching for misspellings (simple edit distance)
+        for word in query_words:
+            for field_value, bonus in ((fields['title'], 0.4), (fields['romanized'], 0.35)):
                 if field_value:
                     fuzzy_score = self._simple_fuzzy_match(word, field_value)
-                    if fuzzy_score > 0.7:  # Only consider good fuzzy matches
-                        bonus = 0.4 if field_name == 'title' else 0.35
-                        max_score = max(max_score, fuzzy_score * bonus)
-        
+                    if fuzzy_score > 0.7 and fuzzy_score * bonus > max_score:  # Only consider good fuzzy matches
+                        max_score = fuzzy_score * bonus
+
         return max_score
     
     def _simple_fuzzy_match(self, word: str, text: str) -> float:
@@ -480,18 +939,17 @@ class QdrantSemanticSearch:
 
         try:
             # Generate query embedding for true semantic search
-            query_embedding = self._get_embedding(query)
+            query_embedding = await asyncio.get_running_loop().run_in_executor(_encode_executor, self._get_embedding, query)
             if not query_embedding:
                 logger.warning("Failed to generate embedding for query")
                 return []
 
             # First try vector similarity search
             try:
-                search_result = self.client.search(
-                    collection_name=self.config["stories_collection"],
-                    query_vector=query_embedding,
+                search_result = await self._query_vectors(
+                    self.config.stories_collection,
+                    query_embedding,
                     limit=limit * 3,  # Get more results for filtering
-                    with_payload=True,
                     score_threshold=0.3  # Lower threshold for better recall
                 )
                 
@@ -527,58 +985,10 @@ class QdrantSemanticSearch:
                 logger.warning(f"Vector search failed, falling back to text search: {e}")
 
             # Fallback to enhanced text search with fuzzy matching
-            scroll_result = self.client.scroll(
-                collection_name=self.config["stories_collection"],
-                limit=1000,  # Get all points for comprehensive search
-                with_payload=True
+            final_results = await self._text_search(
+                self.config.stories_collection, "category", query, category_filter, limit
             )
 
-            results = []
-            query_lower = query.lower().strip()
-            query_words = query_lower.split()
-
-            for point in scroll_result[0]:
-                payload = point.payload
-                
-                # Get all searchable text fields
-                title = payload.get('title', '').lower()
-                romanized = payload.get('romanized', '').lower()
-                alternatives = [alt.lower() for alt in payload.get('alternatives', [])]
-                keywords = [kw.lower() for kw in payload.get('keywords', [])]
-                category = payload.get('category', '').lower()
-                
-                # Calculate comprehensive similarity score
-                score = self._calculate_fuzzy_score(query_lower, query_words, {
-                    'title': title,
-                    'romanized': romanized,
-                    'alternatives': alternatives,
-                    'keywords': keywords,
-                    'language': category  # Use category as language field for stories
-                })
-                
-                # Apply category preference (not filter)
-                if category_filter:
-                    if payload.get('category') == category_filter:
-                        score *= 1.2  # Boost preferred category
-                    else:
-                        score *= 0.8  # Slight penalty for other categories
-                
-                # Only include results with meaningful scores
-                if score > 0.2:
-                    results.append(QdrantSearchResult(
-                        title=payload['title'],
-                        filename=payload['filename'],
-                        language_or_category=payload['category'],
-                        score=score,
-                        metadata=payload,
-                        alternatives=payload.get('alternatives', []),
-                        romanized=payload.get('romanized', '')
-                    ))
-
-            # Sort by score and return top results
-            results.sort(key=lambda x: x.score, reverse=True)
-            final_results = results[:limit]
-            
             logger.info(f"Enhanced text search found {len(final_results)} results for '{query}' across all categories")
             return final_results
 
@@ -586,44 +996,70 @@ class QdrantSemanticSearch:
             logger.error(f"Story search failed: {e}")
             return []
 
+    async def _load_random_pool(self, collection_name: str, group_field: str, scroll_filter=None):
+        """Scroll the fields random results need into memory, grouped by language/category"""
+        entries = []
+        entries_by_group: Dict[str, List[Dict]] = {}
+        async for points in self._scroll_pages(
+            collection_name, scroll_filter, page_size=1000,
+            with_payload=[*_RANDOM_PICK_FIELDS, group_field]
+        ):
+            for point in points:
+                payload = point.payload or {}
+                if 'title' not in payload or 'filename' not in payload:
+                    continue
+                entries.append(payload)
+                group = payload.get(group_field)
+                if group is not None:
+                    entries_by_group.setdefault(group, []).append(payload)
+
+        self._random_pool[collection_name] = (time.monotonic(), entries, entries_by_group)
+        logger.info(f"Cached {len(entries)} points from '{collection_name}' for random selection")
+
+    async def _get_random_pool(self, collection_name: str, group_field: str, group: Optional[str] = None,
+                               scroll_filter=None) -> List[Dict]:
+        """Payloads to pick from, refreshed in the background once the cache is stale"""
+        cached = self._random_pool.get(collection_name)
+        if cached is None:
+            await self._load_random_pool(collection_name, group_field, scroll_filter)
+            cached = self._random_pool[collection_name]
+        elif time.monotonic() - cached[0] > _RANDOM_POOL_TTL and collection_name not in self._random_refresh_tasks:
+            async def _refresh():
+                try:
+                    await self._load_random_pool(collection_name, group_field, scroll_filter)
+                except Exception as e:
+                    logger.warning(f"Refreshing random selection cache for '{collection_name}' failed: {e}")
+                finally:
+                    self._random_refresh_tasks.pop(collection_name, None)
+
+            self._random_refresh_tasks[collection_name] = asyncio.create_task(_refresh())
+
+        _, entries, entries_by_group = cached
+        return entries_by_group.get(group, []) if group else entries
+
     async def get_random_music(self, language_filter: Optional[str] = None) -> Optional[QdrantSearchResult]:
         """Get a random song from Qdrant collection"""
         if not self.is_initialized:
             return None
 
         try:
-            # Use scroll to get random points without filters to avoid typing issues
-            scroll_result = self.client.scroll(
-                collection_name=self.config["music_collection"],
-                limit=100,  # Get more points to choose from
-                with_payload=True
+            # Allowed languages are filtered by Qdrant so only eligible songs are cached
+            songs = await self._get_random_pool(
+                self.config.music_collection, "language", language_filter,
+                scroll_filter=self._allowed_filter
             )
 
-            if scroll_result[0]:  # Check if we have any points
-                import random
-                # Filter by language if specified
-                valid_points = scroll_result[0]
-
-                # First apply allowed languages filter if configured
-                if self.config["allowed_music_languages"]:
-                    valid_points = [p for p in valid_points if p.payload.get('language') in self.config["allowed_music_languages"]]
-                    logger.info(f"🔒 Random music restricted to allowed languages: {', '.join(self.config['allowed_music_languages'])}")
-
-                # Then apply specific language filter if requested
-                if language_filter:
-                    valid_points = [p for p in valid_points if p.payload.get('language') == language_filter]
-
-                if valid_points:
-                    random_point = random.choice(valid_points)
-                    return QdrantSearchResult(
-                        title=random_point.payload['title'],
-                        filename=random_point.payload['filename'],
-                        language_or_category=random_point.payload['language'],
-                        score=1.0,
-                        metadata=random_point.payload,
-                        alternatives=random_point.payload.get('alternatives', []),
-                        romanized=random_point.payload.get('romanized', '')
-                    )
+            if songs:
+                payload = self._expand_metadata(self.config.music_collection, random.choice(songs))
+                return QdrantSearchResult(
+                    title=payload['title'],
+                    filename=payload['filename'],
+                    language_or_category=payload['language'],
+                    score=1.0,
+                    metadata=payload,
+                    alternatives=payload.get('alternatives', []),
+                    romanized=payload.get('romanized', '')
+                )
 
             return None
 
@@ -637,31 +1073,19 @@ class QdrantSemanticSearch:
             return None
 
         try:
-            # Use scroll to get random points without filters to avoid typing issues
-            scroll_result = self.client.scroll(
-                collection_name=self.config["stories_collection"],
-                limit=100,  # Get more points to choose from
-                with_payload=True
-            )
-
-            if scroll_result[0]:  # Check if we have any points
-                import random
-                # Filter by category if specified
-                valid_points = scroll_result[0]
-                if category_filter:
-                    valid_points = [p for p in scroll_result[0] if p.payload.get('category') == category_filter]
-
-                if valid_points:
-                    random_point = random.choice(valid_points)
-                    return QdrantSearchResult(
-                        title=random_point.payload['title'],
-                        filename=random_point.payload['filename'],
-                        language_or_category=random_point.payload['category'],
-                        score=1.0,
-                        metadata=random_point.payload,
-                        alternatives=random_point.payload.get('alternatives', []),
-                        romanized=random_point.payload.get('romanized', '')
-                    )
+            stories = await self._get_random_pool(self.config.stories_collection, "category", category_filter)
+
+            if stories:
+                payload = random.choice(stories)
+                return QdrantSearchResult(
+                    title=payload['title'],
+                    filename=payload['filename'],
+                    language_or_category=payload['category'],
+                    score=1.0,
+                    metadata=payload,
+                    alternatives=payload.get('alternatives', []),
+                    romanized=payload.get('romanized', '')
+                )
 
             return None
 
@@ -675,20 +1099,7 @@ class QdrantSemanticSearch:
             return []
 
         try:
-            # Use aggregation to get unique languages
-            scroll_result = self.client.scroll(
-                collection_name=self.config["music_collection"],
-                limit=1000,  # Get a large sample
-                with_payload=["language"]
-            )
-
-            languages = set()
-            for point in scroll_result[0]:
-                if 'language' in point.payload:
-                    languages.add(point.payload['language'])
-
-            return sorted(list(languages))
-
+            return await self._get_group_values(self.config.music_collection, "language")
         except Exception as e:
             logger.error(f"Failed to get available languages: {e}")
             return []
@@ -699,20 +1110,69 @@ class QdrantSemanticSearch:
             return []
 
         try:
-            # Use aggregation to get unique categories
-            scroll_result = self.client.scroll(
-                collection_name=self.config["stories_collection"],
-                limit=1000,  # Get a large sample
-                with_payload=["category"]
-            )
-
-            categories = set()
-            for point in scroll_result[0]:
-                if 'category' in point.payload:
-                    categories.add(point.payload['category'])
-
-            return sorted(list(categories))
-
+            return await self._get_group_values(self.config.stories_collection, "category")
         except Exception as e:
             logger.error(f"Failed to get available categories: {e}")
-            return []
\ No newline at end of file
+            return []
+
+    async def prefetch_metadata(self):
+        """Warm the languages and categories caches with both Qdrant requests in parallel"""
+        await asyncio.gather(self.get_available_languages(), self.get_available_categories())
+
+    def refresh_metadata(self):
+        """Drop cached languages/categories and random selection pools so they are re-read from Qdrant"""
+        self._group_values_cache.clear()
+        self._random_pool.clear()
+
+    async def _get_group_values(self, collection_name: str, group_field: str) -> List[str]:
+        """Distinct values of a payload field, cached for _GROUP_VALUES_TTL seconds"""
+        cached = self._group_values_cache.get(collection_name)
+        if cached and time.monotonic() - cached[0] < _GROUP_VALUES_TTL:
+            return list(cached[1])
+
+        # Created lazily so it binds to the running event loop
+        lock = self._group_values_locks.get(collection_name)
+        if lock is None:
+            lock = self._group_values_locks[collection_name] = asyncio.Lock()
+
+        async with lock:
+            # Another caller may have refreshed the cache while we waited
+            cached = self._group_values_cache.get(collection_name)
+            if cached and time.monotonic() - cached[0] < _GROUP_VALUES_TTL:
+                return list(cached[1])
+
+            values = None
+            if self._facet_supported:
+                try:
+                    # Distinct values come straight from the keyword payload index
+                    facet_result = await self.client.facet(
+                        collection_name=collection_name,
+                        key=group_field,
+                        limit=100
+                    )
+                    values = sorted(hit.value for hit in facet_result.hits)
+                except Exception as e:
+                    if _is_unsupported_call(e):
+                        self._facet_supported = False
+                        logger.warning(f"Qdrant facet query unavailable, scrolling payloads instead: {e}")
+                    else:
+                        # Transient failure: scroll this time and try facets again next time
+                        logger.warning(f"Qdrant facet query failed, scrolling payloads instead: {e}")
+
+            if values is None:
+                values = await self._scroll_group_values(collection_name, group_field)
+
+            self._group_values_cache[collection_name] = (time.monotonic(), values)
+            return list(values)
+
+    async def _scroll_group_values(self, collection_name: str, group_field: str) -> List[str]:
+        """Distinct values of a payload field collected by paging through the collection"""
+        values = set()
+        # Small pages avoid the timeouts a single large scroll can hit
+        async for points in self._scroll_pages(collection_name, page_size=256, with_payload=[group_field]):
+            values.update(point.payload[group_field] for point in points if group_field in point.payload)
+            # Languages/categories are few; stop once we clearly have them all
+            if len(values) >= _GROUP_VALUES_MAX:
+                break
+
+        return sorted(values)
\ No newline at end of file
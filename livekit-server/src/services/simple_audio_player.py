@@ -61,6 +61,33 @@ class SimpleAudioPlayer:
         self.stop_event.clear()
         self.current_task = asyncio.create_task(self._play_audio(url, title))
 
+    @staticmethod
+    def _convert_to_wav_file(audio_data: bytes):
+        """Decode MP3 bytes and export them to a temporary WAV file (blocking)"""
+        # Convert MP3 to WAV
+        audio_segment = AudioSegment.from_mp3(io.BytesIO(audio_data))
+
+        # Create temporary file
+        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
+            temp_file_path = temp_file.name
+
+        # Export as WAV
+        try:
+            audio_segment.export(temp_file_path, format="wav")
+        except Exception:
+            os.unlink(temp_file_path)
+            raise
+        return audio_segment, temp_file_path
+
+    @staticmethod
+    def _remove_temp_file(temp_file_path: str):
+        """Delete a temporary audio file (blocking)"""
+        try:
+            if os.path.exists(temp_file_path):
+                os.unlink(temp_file_path)
+        except Exception as cleanup_error:
+            logger.warning(f"Failed to cleanup temp file: {cleanup_error}")
+
     async def _play_audio(self, url: str, title: str):
         """Download and play audio through TTS system"""
         try:
@@ -87,17 +114,10 @@ class SimpleAudioPlayer:
                 return
 
             # Convert and save as temporary WAV file
-            temp_file = None
+            temp_file_path = None
             try:
-                # Convert MP3 to WAV
-                audio_segment = AudioSegment.from_mp3(io.BytesIO(audio_data))
-
-                # Create temporary file
-                with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-                    temp_file_path = temp_file.name
-
-                # Export as WAV
-                audio_segment.export(temp_file_path, format="wav")
+                # Decoding and file writes run in a worker thread so audio tasks keep running
+                audio_segment, temp_file_path = await asyncio.to_thread(self._convert_to_wav_file, audio_data)
                 logger.info(f"Converted audio to WAV: {temp_file_path}")
 
                 # Use TTS to play the WAV file
@@ -118,11 +138,8 @@ class SimpleAudioPlayer:
 
             finally:
                 # Clean up temp file
-                if temp_file and os.path.exists(temp_file_path):
-                    try:
-                        os.unlink(temp_file_path)
-                    except Exception as cleanup_error:
-                        logger.warning(f"Failed to cleanup temp file: {cleanup_error}")
+                if temp_file_path:
+                    await asyncio.to_thread(self._remove_temp_file, temp_file_path)
 
         except asyncio.CancelledError:
             logger.info(f"Playback cancelled: {title}")
@@ -3,32 +3,74 @@ Story Service Module for LiveKit Agent
 Handles story search and playback with AWS CloudFront streaming and semantic search
 """
 
+import asyncio
 import json
 import os
 import random
 import logging
+from functools import lru_cache
 from typing import Dict, List, Optional
 from pathlib import Path
-import urllib.parse
+from urllib.parse import quote
 from src.services.semantic_search import QdrantSemanticSearch
 
 logger = logging.getLogger(__name__)
 
+
+@lru_cache(maxsize=64)
+def _quote_category(category: str) -> str:
+    """URL-encoded category path segment (there are only a handful of categories)"""
+    return quote(category, safe='/')
+
+
+# Played when Qdrant can't pick a random story
+_FALLBACK_STORIES = (
+    {'title': 'Why Bananas Belong to Monkeys', 'filename': 'why bananas belong to monkeys.mp3', 'category': 'Adventure'},
+    {'title': 'Agent Bertie', 'filename': 'agent bertie part.mp3', 'category': 'Adventure'},
+    {'title': 'The Three Dogs', 'filename': 'the three dogs.mp3', 'category': 'Bedtime'},
+    {'title': 'Sleeping Beauty', 'filename': 'sleeping beauty.mp3', 'category': 'Bedtime'},
+    {'title': 'The Christmas Cherry Tree', 'filename': 'the christmas cherry tree.mp3', 'category': 'Educational'},
+    {'title': 'Hansel and Gretel', 'filename': 'hansel and gretel.mp3', 'category': 'Fantasy'},
+    {'title': 'Katie Unicorn', 'filename': 'katie unicorn.mp3', 'category': 'Fantasy'},
+    {'title': 'A Portrait of a Cat', 'filename': 'a portrait of a cat.mp3', 'category': 'Fairy Tales'},
+    {'title': 'Honest Jack', 'filename': 'honest jack.mp3', 'category': 'Fairy Tales'},
+)
+
+# Search results fetched per story returned, to make room for duplicate hits
+_STORY_OVERFETCH = 4
+
+
 class StoryService:
     """Service for handling story playback and search with semantic search"""
 
-    def __init__(self, preloaded_model=None, preloaded_client=None):
+    def __init__(self, preloaded_model=None):
         self.cloudfront_domain = os.getenv("CLOUDFRONT_DOMAIN", "")
         self.s3_base_url = os.getenv("S3_BASE_URL", "")
         self.use_cdn = os.getenv("USE_CDN", "true").lower() == "true"
+        # Story URLs always start with the same CDN or S3 base
+        if self.use_cdn and self.cloudfront_domain:
+            self._url_base = f"https://{self.cloudfront_domain}/stories/"
+        else:
+            self._url_base = f"{self.s3_base_url}/stories/"
+        # Fallback stories with their URLs, built once and grouped by lowercased category
+        self._fallback_stories = tuple(
+            {**story, 'url': self.get_story_url(story['filename'], story['category'])}
+            for story in _FALLBACK_STORIES
+        )
+        by_category: Dict[str, list] = {}
+        for story in self._fallback_stories:
+            by_category.setdefault(story['category'].lower(), []).append(story)
+        self._fallback_by_category = {key: tuple(stories) for key, stories in by_category.items()}
         self.is_initialized = False
-        self.semantic_search = QdrantSemanticSearch(preloaded_model, preloaded_client)
+        self.semantic_search = QdrantSemanticSearch(preloaded_model)
+        # Semantic searches in progress, so identical concurrent requests share one
+        self._inflight: Dict[tuple, asyncio.Future] = {}
 
     async def initialize(self) -> bool:
         """Initialize story service with semantic search using Qdrant"""
         try:
             # Initialize semantic search
-            initialized = await self.semantic_search.initialize()
+            initialized = await self.semantic_search.initialize(self.semantic_search.config.stories_collection)
             if initialized:
                 logger.info("[STORY] Story service initialized with Qdrant semantic search")
                 self.is_initialized = True
@@ -47,14 +89,44 @@ class StoryService:
 
     def get_story_url(self, filename: str, category: str = "Adventure") -> str:
         """Generate URL for story file"""
-        audio_path = f"stories/{category}/{filename}"
         # Ensure we don't encode the slashes in the path
-        encoded_path = urllib.parse.quote(audio_path, safe='/')
+        return f"{self._url_base}{_quote_category(category)}/{quote(filename, safe='/')}"
 
-        if self.use_cdn and self.cloudfront_domain:
-            return f"https://{self.cloudfront_domain}/{encoded_path}"
-        else:
-            return f"{self.s3_base_url}/{encoded_path}"
+    def _unique_stories(self, search_results: list, limit: int) -> List[Dict]:
+        """Convert search results to story dicts, keeping the best-scoring hit per story
+
+        Args:
+            search_results: QdrantSearchResult list from semantic search
+            limit: Maximum number of stories to return
+
+        Returns:
+            Distinct stories (by title and filename) sorted by score
+        """
+        best: Dict[tuple, Dict] = {}
+        for result in search_results:
+            key = (result.title.lower(), result.filename.lower())
+            if key in best and best[key]['score'] >= result.score:
+                continue
+            best[key] = {
+                'title': result.title,
+                'filename': result.filename,
+                'category': result.language_or_category,  # Stories use category instead of language
+                'url': self.get_story_url(result.filename, result.language_or_category),
+                'score': result.score
+            }
+
+        return sorted(best.values(), key=lambda story: story['score'], reverse=True)[:limit]
+
+    async def _search_coalesced(self, query: str, category: Optional[str], limit: int) -> list:
+        """Run a semantic story search, joining an identical one that is already in flight"""
+        key = (query.strip().lower(), category, limit)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.semantic_search.search_stories(query, category, limit=limit))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one caller being cancelled doesn't cancel the search for the others
+        return await asyncio.shield(task)
 
     async def search_stories(self, query: str, category: Optional[str] = None) -> List[Dict]:
         """Search for stories using enhanced semantic search with spell tolerance"""
@@ -64,18 +136,11 @@ class StoryService:
 
         try:
             # Use semantic search service with enhanced fuzzy matching
-            search_results = await self.semantic_search.search_stories(query, category, limit=5)
+            # Overfetch so several hits on the same story still leave 5 distinct ones
+            search_results = await self._search_coalesced(query, category, limit=5 * _STORY_OVERFETCH)
 
             # Convert search results to expected format
-            results = []
-            for result in search_results:
-                results.append({
-                    'title': result.title,
-                    'filename': result.filename,
-                    'category': result.language_or_category,  # Stories use category instead of language
-                    'url': self.get_story_url(result.filename, result.language_or_category),
-                    'score': result.score
-                })
+            results = self._unique_stories(search_results, limit=5)
 
             if results:
                 logger.info(f"📚 Found {len(results)} stories for '{query}' - top match: '{results[0]['title']}' (score: {results[0]['score']:.2f})")
@@ -113,19 +178,10 @@ class StoryService:
             logger.info(f"🔍 [STORY-SEARCH] Searching for story: '{story_name}', Category: {category or 'Any'}")
 
             # Use the existing semantic search which already has fuzzy matching
-            search_results = await self.semantic_search.search_stories(search_query, category, limit=limit)
+            search_results = await self._search_coalesced(search_query, category, limit=limit * _STORY_OVERFETCH)
 
             # Convert to expected format with additional metadata
-            results = []
-            for result in search_results:
-                story_data = {
-                    'title': result.title,
-                    'filename': result.filename,
-                    'category': result.language_or_category,
-                    'url': self.get_story_url(result.filename, result.language_or_category),
-                    'score': result.score
-                }
-                results.append(story_data)
+            results = self._unique_stories(search_results, limit)
 
             if results:
                 logger.info(f"🔍 [STORY-SEARCH] Found {len(results)} matches for '{story_name}' - best: '{results[0]['title']}' (score: {results[0]['score']:.2f})")
@@ -159,63 +215,13 @@ class StoryService:
 
             # Fallback to hardcoded stories if Qdrant fails
             logger.warning("📚 Qdrant random story failed - using fallback stories")
-            sample_stories = [
-                {
-                    'title': 'Why Bananas Belong to Monkeys',
-                    'filename': 'why bananas belong to monkeys.mp3',
-                    'category': 'Adventure'
-                },
-                {
-                    'title': 'Agent Bertie',
-                    'filename': 'agent bertie part.mp3',
-                    'category': 'Adventure'
-                },
-                {
-                    'title': 'The Three Dogs',
-                    'filename': 'the three dogs.mp3',
-                    'category': 'Bedtime'
-                },
-                {
-                    'title': 'Sleeping Beauty',
-                    'filename': 'sleeping beauty.mp3',
-                    'category': 'Bedtime'
-                },
-                {
-                    'title': 'The Christmas Cherry Tree',
-                    'filename': 'the christmas cherry tree.mp3',
-                    'category': 'Educational'
-                },
-                {
-                    'title': 'Hansel and Gretel',
-                    'filename': 'hansel and gretel.mp3',
-                    'category': 'Fantasy'
-                },
-                {
-                    'title': 'Katie Unicorn',
-                    'filename': 'katie unicorn.mp3',
-                    'category': 'Fantasy'
-                },
-                {
-                    'title': 'A Portrait of a Cat',
-                    'filename': 'a portrait of a cat.mp3',
-                    'category': 'Fairy Tales'
-                },
-                {
-                    'title': 'Honest Jack',
-                    'filename': 'honest jack.mp3',
-                    'category': 'Fairy Tales'
-                }
-            ]
-
             # Filter by category if specified
+            stories = self._fallback_stories
             if category:
-                filtered_stories = [s for s in sample_stories if s['category'].lower() == category.lower()]
-                if filtered_stories:
-                    sample_stories = filtered_stories
+                stories = self._fallback_by_category.get(category.lower()) or stories
 
             # Select a random story from the fallback list
-            story = random.choice(sample_stories)
-            story['url'] = self.get_story_url(story['filename'], story['category'])
+            story = dict(random.choice(stories))
 
             logger.info(f"📚 Selected fallback story: {story['title']} ({story['category']})")
             return story
@@ -5,14 +5,20 @@ Plays music/stories through LiveKit's native audio player for optimal performanc
 
 import logging
 import asyncio
-import tempfile
+import json
 import os
-from typing import Optional
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Optional
+from urllib.parse import urlsplit
 import aiohttp
 from ..utils.audio_state_manager import audio_state_manager
+from ..utils.audio_file_cache import get_audio_file_cache
+from ..utils.cdn_urls import cf_to_s3_hosts
 
 try:
     from livekit.agents import BackgroundAudioPlayer
+    from livekit.agents.utils.codecs import AudioStreamDecoder
     LIVEKIT_AUDIO_AVAILABLE = True
 except ImportError:
     LIVEKIT_AUDIO_AVAILABLE = False
@@ -25,9 +31,26 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Data channel message telling the device music has stopped (fixed, so encoded once)
+_MUSIC_STOP_PAYLOAD: bytes = json.dumps({"type": "music_playback_stopped"}).encode()
+# Bytes read from the HTTP response per chunk while streaming
+_DOWNLOAD_CHUNK_SIZE = 65536
+# CloudFront path prefixes that recently returned 403 go straight to S3 for this long
+_CF_BAD_PREFIX_TTL = 600
+_CF_BAD_PREFIX_MAX = 256
+# How often CloudFront is re-checked with a HEAD on CLOUDFRONT_PROBE_PATH (when set)
+_CF_PROBE_INTERVAL = 3600
+
+
 class TTSAudioPlayer:
     """Plays audio through LiveKit's native audio player for optimal performance"""
 
+    # First two path segments (e.g. "stories/Adventure") -> time of the last CloudFront 403
+    _bad_cf_prefixes: "OrderedDict[str, float]" = OrderedDict()
+    # Result of the last CloudFront probe: every download goes straight to S3 while True
+    _use_s3_direct = False
+    _cf_probed_at: Optional[float] = None
+
     def __init__(self):
         self.session = None
         self.context = None
@@ -35,14 +58,62 @@ class TTSAudioPlayer:
         self.is_playing = False
         self.stop_event = asyncio.Event()
         self.background_audio = None
-        self.temp_files = []  # Track temporary files for cleanup
+        # Kept open across playbacks so CDN/S3 connections are reused
+        self._http: Optional[aiohttp.ClientSession] = None
 
     def set_session(self, session):
         """Set the LiveKit agent session"""
         self.session = session
         self._initialize_background_audio()
+        self._get_http()
+        self._schedule_cf_probe()
         logger.info("Native audio player integrated with session")
 
+    def _get_http(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, opening it on first use"""
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                # No total timeout: the body is read for as long as the track plays
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=15, sock_read=15),
+                connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300, keepalive_timeout=60)
+            )
+        return self._http
+
+    def _schedule_cf_probe(self):
+        """Start a background CloudFront probe if none ran in the last hour"""
+        cls = TTSAudioPlayer
+        if cls._cf_probed_at is not None and time.monotonic() - cls._cf_probed_at < _CF_PROBE_INTERVAL:
+            return
+        if not os.getenv("CLOUDFRONT_PROBE_PATH") or not cf_to_s3_hosts():
+            return
+        try:
+            cls._cf_probed_at = time.monotonic()
+            asyncio.get_running_loop().create_task(self._probe_cloudfront())
+        except RuntimeError:
+            cls._cf_probed_at = None  # No running loop yet; probe on a later call
+
+    async def _probe_cloudfront(self):
+        """HEAD a known CloudFront object and send all downloads to S3 if it isn't served"""
+        probe_url = f"https://{cf_to_s3_hosts()[0]}/{os.getenv('CLOUDFRONT_PROBE_PATH', '').lstrip('/')}"
+        try:
+            async with self._get_http().head(probe_url) as response:
+                use_s3_direct = response.status != 200
+        except Exception as e:
+            logger.warning(f"🎵 NATIVE: CloudFront probe failed: {e}")
+            return
+
+        if use_s3_direct != TTSAudioPlayer._use_s3_direct:
+            logger.info(f"🎵 NATIVE: CloudFront probe returned HTTP {response.status}, "
+                        f"{'using S3 directly' if use_s3_direct else 'using CloudFront'}")
+        TTSAudioPlayer._use_s3_direct = use_s3_direct
+
+    async def aclose(self):
+        """Stop playback and close the HTTP session"""
+        await self.stop()
+        if self._http is not None and not self._http.closed:
+            await self._http.close()
+        self._http = None
+
     def set_context(self, context):
         """Set the job context"""
         self.context = context
@@ -90,7 +161,6 @@ class TTSAudioPlayer:
 
         self.is_playing = False
         audio_state_manager.set_music_playing(False)
-        self._cleanup_temp_files()
         logger.info("🎵 Native audio playback stopped")
 
     async def play_from_url(self, url: str, title: str = "Audio"):
@@ -117,11 +187,18 @@ class TTSAudioPlayer:
             if self.background_audio:
                 logger.info(f"🎵 NATIVE: Using LiveKit BackgroundAudioPlayer for {title}")
                 try:
-                    # Download to temporary file for LiveKit to play
-                    temp_file = await self._download_to_temp_file(url, title)
-                    if temp_file:
-                        # Play using LiveKit's native player - handles MP3 directly!
-                        await self.background_audio.play(temp_file)
+                    # Replays of a recently downloaded track are read from disk
+                    cached_path = await asyncio.to_thread(get_audio_file_cache().get, url)
+                    if cached_path:
+                        logger.info(f"🎵 NATIVE: Playing {title} from disk cache")
+                        await self.background_audio.play(cached_path)
+                        logger.info(f"🎵 NATIVE: Successfully played {title} via BackgroundAudioPlayer")
+                        return
+
+                    # Decode frames as the MP3 downloads so playback starts on the first chunk
+                    frames = await self._stream_frames(url, title)
+                    if frames:
+                        await self.background_audio.play(frames)
                         logger.info(f"🎵 NATIVE: Successfully played {title} via BackgroundAudioPlayer")
                         return
                 except Exception as e:
@@ -143,27 +220,22 @@ class TTSAudioPlayer:
             # Send music end signal via data channel
             try:
                 if self.context and hasattr(self.context, 'room'):
-                    import json
-                    music_end_data = {
-                        "type": "music_playback_stopped"
-                    }
                     await self.context.room.local_participant.publish_data(
-                        json.dumps(music_end_data).encode(),
+                        _MUSIC_STOP_PAYLOAD,
                         topic="music_control"
                     )
                     logger.info("🎵 NATIVE: Sent music_playback_stopped via data channel")
             except Exception as e:
                 logger.warning(f"🎵 NATIVE: Failed to send music end signal: {e}")
 
-    async def _download_to_temp_file(self, url: str, title: str) -> Optional[str]:
-        """Download MP3 to temporary file for LiveKit to play directly"""
-        try:
-            logger.info(f"🎵 NATIVE: Downloading {title} from {url}")
-            timeout = aiohttp.ClientTimeout(total=15)
+    async def _stream_frames(self, url: str, title: str) -> Optional[AsyncIterator["rtc.AudioFrame"]]:
+        """Start downloading the MP3 and return its decoded audio frames
 
-            # Create temporary file with MP3 extension
-            temp_fd, temp_path = tempfile.mkstemp(suffix='.mp3', prefix='livekit_music_')
-            os.close(temp_fd)  # Close the file descriptor, we'll write to the path
+        Returns:
+            Async iterator of frames for BackgroundAudioPlayer, or None if the download failed
+        """
+        try:
+            logger.info(f"🎵 NATIVE: Streaming {title} from {url}")
 
             # Try downloading with proper headers to avoid 403
             headers = {
@@ -171,58 +243,131 @@ class TTSAudioPlayer:
                 'Accept': 'audio/mpeg, audio/*',
             }
 
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 403:
-                        logger.warning(f"Got 403 from CDN, trying S3 direct URL")
-                        # Try S3 URL if CloudFront fails
-                        if 'cloudfront' in url:
-                            s3_url = url.replace('dbtnllz9fcr1z.cloudfront.net', 'cheeko-audio-files.s3.us-east-1.amazonaws.com')
-                            async with session.get(s3_url, headers=headers) as s3_response:
-                                if s3_response.status == 200:
-                                    response = s3_response
-                                    logger.info("Successfully fell back to S3 URL")
-                                else:
-                                    logger.error(f"S3 fallback also failed: HTTP {s3_response.status}")
-                                    os.unlink(temp_path)
-                                    return None
-                        else:
-                            logger.error(f"Failed to download: HTTP {response.status}")
-                            os.unlink(temp_path)
-                            return None
-                    elif response.status != 200:
-                        logger.error(f"Failed to download: HTTP {response.status}")
-                        os.unlink(temp_path)
-                        return None
-
-                    # Write MP3 data directly to temp file
-                    with open(temp_path, 'wb') as f:
-                        async for chunk in response.content.iter_chunked(8192):
-                            f.write(chunk)
-
-                    file_size = os.path.getsize(temp_path)
-                    logger.info(f"🎵 NATIVE: Downloaded {file_size} bytes to {temp_path}")
-
-                    # Track temp file for cleanup
-                    self.temp_files.append(temp_path)
-                    return temp_path
+            session = self._get_http()
+            hosts = cf_to_s3_hosts()
+            prefix = self._cf_prefix(url) if hosts and hosts[0] in url else None
+            if prefix is not None:
+                self._schedule_cf_probe()
+            skip_cloudfront = prefix is not None and (self._use_s3_direct or self._is_bad_cf_prefix(prefix))
+            if skip_cloudfront:
+                # CloudFront is refusing this deployment or prefix, don't pay for another 403
+                logger.info(f"🎵 NATIVE: Skipping CloudFront for {prefix}, using S3 direct URL")
+                response = await session.get(self._to_s3_url(url), headers=headers)
+            else:
+                response = await session.get(url, headers=headers)
+                if prefix and response.status == 200:
+                    self._bad_cf_prefixes.pop(prefix, None)
+
+            if response.status == 403 and prefix and not skip_cloudfront:
+                logger.warning(f"Got 403 from CDN, trying S3 direct URL")
+                self._mark_bad_cf_prefix(prefix)
+                # Try S3 URL if CloudFront fails
+                response.release()
+                response = await session.get(self._to_s3_url(url), headers=headers)
+                if response.status == 200:
+                    logger.info("Successfully fell back to S3 URL")
+                else:
+                    logger.error(f"S3 fallback also failed: HTTP {response.status}")
+                    response.release()
+                    return None
+            elif response.status != 200:
+                logger.error(f"Failed to download: HTTP {response.status}")
+                response.release()
+                return None
+
+            return self._decode_stream(response, title, url)
 
         except Exception as e:
             logger.error(f"🎵 NATIVE: Error downloading {title}: {e}")
-            if 'temp_path' in locals() and os.path.exists(temp_path):
-                os.unlink(temp_path)
             return None
 
-    def _cleanup_temp_files(self):
-        """Clean up temporary audio files"""
-        for temp_file in self.temp_files:
+    @staticmethod
+    def _to_s3_url(url: str) -> str:
+        """Rewrite a CloudFront URL to the S3 bucket behind it"""
+        return url.replace(*cf_to_s3_hosts())
+
+    @staticmethod
+    def _cf_prefix(url: str) -> str:
+        """First two path segments of a URL, e.g. 'stories/Adventure'"""
+        return "/".join(urlsplit(url).path.lstrip("/").split("/")[:2])
+
+    @classmethod
+    def _is_bad_cf_prefix(cls, prefix: str) -> bool:
+        """Whether CloudFront returned 403 for this prefix within the TTL"""
+        failed_at = cls._bad_cf_prefixes.get(prefix)
+        if failed_at is None:
+            return False
+        if time.monotonic() - failed_at >= _CF_BAD_PREFIX_TTL:
+            del cls._bad_cf_prefixes[prefix]
+            return False
+        cls._bad_cf_prefixes.move_to_end(prefix)
+        return True
+
+    @classmethod
+    def _mark_bad_cf_prefix(cls, prefix: str):
+        """Remember a CloudFront 403 for the prefix, evicting the oldest entries past the cap"""
+        cls._bad_cf_prefixes[prefix] = time.monotonic()
+        cls._bad_cf_prefixes.move_to_end(prefix)
+        while len(cls._bad_cf_prefixes) > _CF_BAD_PREFIX_MAX:
+            cls._bad_cf_prefixes.popitem(last=False)
+
+    async def _decode_stream(self, response: aiohttp.ClientResponse, title: str,
+                             cache_url: str) -> AsyncIterator["rtc.AudioFrame"]:
+        """Feed response chunks into a decoder and yield frames while the download continues
+
+        The bytes are also written to the disk cache under cache_url once the download completes.
+        """
+        decoder = AudioStreamDecoder(sample_rate=48000, num_channels=1)
+        downloaded = 0
+
+        async def _feed():
+            nonlocal downloaded
+            temp_path = None
+            cache_file = None
             try:
-                if os.path.exists(temp_file):
-                    os.unlink(temp_file)
-                    logger.debug(f"🎵 NATIVE: Cleaned up temp file: {temp_file}")
+                temp_path = await asyncio.to_thread(get_audio_file_cache().new_temp_file)
+                cache_file = await asyncio.to_thread(open, temp_path, 'wb')
             except Exception as e:
-                logger.warning(f"Failed to cleanup temp file {temp_file}: {e}")
-        self.temp_files.clear()
+                logger.warning(f"🎵 NATIVE: Audio disk cache unavailable: {e}")
+
+            completed = False
+            try:
+                async for chunk in response.content.iter_chunked(_DOWNLOAD_CHUNK_SIZE):
+                    decoder.push(chunk)
+                    downloaded += len(chunk)
+                    if cache_file is not None:
+                        await asyncio.to_thread(cache_file.write, chunk)
+                completed = True
+                logger.info(f"🎵 NATIVE: Downloaded {downloaded} bytes for {title}")
+            except Exception as e:
+                logger.warning(f"🎵 NATIVE: Download of {title} ended early: {e}")
+            finally:
+                try:
+                    if cache_file is not None:
+                        # Shielded so a cancelled playback still cleans up its partial file
+                        await asyncio.shield(asyncio.to_thread(
+                            self._finish_cache_file, cache_file, temp_path, cache_url, completed
+                        ))
+                finally:
+                    decoder.end_input()
+
+        feeder = asyncio.create_task(_feed())
+        try:
+            async for frame in decoder:
+                yield frame
+        finally:
+            feeder.cancel()
+            await decoder.aclose()
+            response.release()
+
+    @staticmethod
+    def _finish_cache_file(cache_file, temp_path: str, cache_url: str, completed: bool):
+        """Close the download's cache file and keep it only if the whole body arrived"""
+        cache_file.close()
+        if completed:
+            get_audio_file_cache().put(cache_url, temp_path)
+        else:
+            get_audio_file_cache().discard(temp_path)
 
     # Note: Legacy complex TTS injection methods removed
     # Now using LiveKit's native BackgroundAudioPlayer which handles MP3 directly
@@ -6,9 +6,15 @@ Plays music/stories through the agent's main TTS channel using session.say()
 import logging
 import asyncio
 import io
-from typing import Optional, AsyncIterator
+import json
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, AsyncIterator, Tuple, Union
 import aiohttp
 from ..utils.audio_state_manager import audio_state_manager
+from ..utils.audio_file_cache import get_pcm_file_cache
+from ..utils.cdn_urls import to_s3_url
 
 try:
     from livekit import rtc
@@ -17,15 +23,189 @@ except ImportError:
     LIVEKIT_AVAILABLE = False
 
 try:
-    from pydub import AudioSegment
-    PYDUB_AVAILABLE = True
-    # Suppress pydub's verbose DEBUG logs from ffmpeg
-    logging.getLogger("pydub.converter").setLevel(logging.WARNING)
+    from livekit.agents.utils.codecs import AudioStreamDecoder
+    STREAM_DECODER_AVAILABLE = True
 except ImportError:
-    PYDUB_AVAILABLE = False
+    STREAM_DECODER_AVAILABLE = False
+
+try:
+    import miniaudio
+    MINIAUDIO_AVAILABLE = True
+except ImportError:
+    MINIAUDIO_AVAILABLE = False
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+try:
+    import soxr
+    SOXR_AVAILABLE = True
+except ImportError:
+    SOXR_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Data channel messages sent after every track (fixed, so encoded once)
+_MUSIC_STOP_PAYLOAD: bytes = json.dumps({"type": "music_playback_stopped"}).encode()
+_AGENT_LISTENING_PAYLOAD: bytes = json.dumps({
+    "type": "agent_state_changed",
+    "data": {
+        "old_state": "speaking",
+        "new_state": "listening"
+    }
+}).encode()
+
+# Decoded frames buffered between the streaming producer and consumer (power of two)
+_FRAME_RING_SIZE = 128
+_FRAME_RING_MASK = _FRAME_RING_SIZE - 1
+# Decoded PCM is written to the PCM cache in blocks of this size while streaming
+_PCM_CACHE_WRITE_BYTES = 256 * 1024
+# Fallback downloads at least this large are fetched as parallel HTTP Range requests
+_RANGE_DOWNLOAD_MIN_BYTES = 4 * 1024 * 1024
+_RANGE_DOWNLOAD_PARTS = 4
+# Streaming download progress is logged each time this many more bytes have arrived
+_PROGRESS_LOG_BYTES = 512 * 1024
+
+
+def _to_mono_pcm(samples, source_rate: int, sample_rate: int) -> Optional[bytes]:
+    """Mix (frames, channels) int16 samples down to mono and resample in one numpy/soxr pass
+
+    Returns None when a resample is needed and soxr is not installed.
+    """
+    if samples.shape[1] == 2:
+        # Integer average of the two channels; numpy vectorizes this, unlike audioop.tomono
+        mono = ((samples[:, 0].astype(np.int32) + samples[:, 1]) >> 1).astype(np.int16)
+    elif samples.shape[1] > 2:
+        mono = samples.mean(axis=1, dtype=np.float32)
+    else:
+        mono = samples[:, 0]
+
+    if source_rate != sample_rate:
+        if not SOXR_AVAILABLE:
+            return None
+        mono = soxr.resample(mono, source_rate, sample_rate)
+
+    if mono.dtype != np.int16:
+        mono = np.clip(mono, -32768, 32767).astype(np.int16)
+    return mono.tobytes()
+
+
+def _decode_with_soundfile(audio_data: bytes, sample_rate: int) -> Optional[bytes]:
+    """Decode to mono int16 PCM with libsndfile (MP3 needs libsndfile >= 1.1)"""
+    samples, source_rate = sf.read(io.BytesIO(audio_data), dtype='int16', always_2d=True)
+    return _to_mono_pcm(samples, source_rate, sample_rate)
+
+
+def _decode_to_pcm(audio_data: bytes, sample_rate: int) -> Optional[bytes]:
+    """Decode a whole file to mono int16 PCM (blocking; run it in a worker thread)"""
+    # miniaudio decodes, downmixes and resamples in one C call into a single buffer
+    if MINIAUDIO_AVAILABLE:
+        try:
+            decoded = miniaudio.decode(
+                audio_data,
+                output_format=miniaudio.SampleFormat.SIGNED16,
+                nchannels=1,
+                sample_rate=sample_rate
+            )
+            return decoded.samples.tobytes()
+        except Exception as e:
+            logger.debug(f"🎵 UNIFIED: miniaudio decode failed, trying soundfile: {e}")
+
+    if SOUNDFILE_AVAILABLE:
+        try:
+            return _decode_with_soundfile(audio_data, sample_rate)
+        except Exception as e:
+            logger.debug(f"🎵 UNIFIED: soundfile decode failed: {e}")
+
+    return None
+
+
+def _store_pcm(url: str, pcm: bytes):
+    """Write a fully decoded track into the PCM cache (blocking)"""
+    temp_path = None
+    try:
+        temp_path = get_pcm_file_cache().new_temp_file()
+        with open(temp_path, 'wb') as f:
+            f.write(pcm)
+        get_pcm_file_cache().put(url, temp_path)
+    except Exception as e:
+        logger.warning(f"🎵 UNIFIED: Failed to cache decoded audio: {e}")
+        if temp_path is not None:
+            get_pcm_file_cache().discard(temp_path)
+
+
+def _decode_to_mapped_pcm(audio_data: bytes, sample_rate: int, cache_url: Optional[str]):
+    """Decode a whole file, store it in the PCM cache and return a read-only map of the cached file
+
+    The decoded bytes are dropped once written, so playback reads from the page cache rather
+    than holding the whole track on the Python heap. Returns the bytes if caching fails.
+    """
+    pcm = _decode_to_pcm(audio_data, sample_rate)
+    if pcm is None or not cache_url:
+        return pcm
+
+    _store_pcm(cache_url, pcm)
+    try:
+        path = get_pcm_file_cache().get(cache_url)
+        mapped = _map_pcm_file(path) if path else None
+    except Exception as e:
+        logger.warning(f"🎵 UNIFIED: Could not map cached audio, playing from memory: {e}")
+        mapped = None
+    return mapped if mapped is not None else pcm
+
+
+def _open_pcm_file():
+    """Create and open a temp file in the PCM cache (blocking)"""
+    temp_path = get_pcm_file_cache().new_temp_file()
+    try:
+        return temp_path, open(temp_path, 'wb')
+    except Exception:
+        get_pcm_file_cache().discard(temp_path)
+        raise
+
+
+def _discard_opened_pcm_file(opening: "asyncio.Future"):
+    """Done callback removing a cache file whose opener was cancelled before using it"""
+    if opening.cancelled() or opening.exception() is not None:
+        return
+    temp_path, cache_file = opening.result()
+    cache_file.close()
+    get_pcm_file_cache().discard(temp_path)
+
+
+def _finish_pcm_file(cache_file, temp_path: str, url: str, tail: bytes, completed: bool):
+    """Close a streamed track's PCM cache file, keeping it only if the whole track was decoded"""
+    try:
+        if completed:
+            cache_file.write(tail)
+        cache_file.close()
+    except Exception as e:
+        logger.warning(f"🎵 STREAMING: Failed to write decoded audio cache: {e}")
+        completed = False
+
+    if completed:
+        get_pcm_file_cache().put(url, temp_path)
+    else:
+        get_pcm_file_cache().discard(temp_path)
+
+
+def _map_pcm_file(path: str) -> Optional[mmap.mmap]:
+    """Memory-map a cached PCM file read-only"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
 class UnifiedAudioPlayer:
     """Plays audio through the agent's main TTS channel using session.say()"""
 
@@ -37,6 +217,15 @@ class UnifiedAudioPlayer:
         self.stop_event = asyncio.Event()
         self.session_say_task = None
         self._playback_lock = asyncio.Lock()  # Prevent race conditions on rapid requests
+        # Set once the previous speech handle and playback task have actually finished
+        self._drain_event = asyncio.Event()
+        self._drain_event.set()
+        # Shared across tracks so repeat downloads reuse pooled keep-alive connections
+        self._http: Optional[aiohttp.ClientSession] = None
+        self._http_loop: Optional[asyncio.AbstractEventLoop] = None
+        # One long-lived thread for full-file decodes: no per-song thread handoff through the
+        # default executor, and concurrent fallbacks cannot hold several decoded songs at once
+        self._decode_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio-decode")
 
     def set_session(self, session):
         """Set the LiveKit agent session"""
@@ -48,6 +237,25 @@ class UnifiedAudioPlayer:
         self.context = context
         logger.info("Unified audio player integrated with context")
 
+    def _get_http(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, opening it on first use or when the event loop changed"""
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._http.closed or self._http_loop is not loop:
+            self._http = aiohttp.ClientSession(
+                # No total timeout: the body is read for as long as the track plays
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=15, sock_read=15),
+                connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300, keepalive_timeout=60)
+            )
+            self._http_loop = loop
+        return self._http
+
+    async def aclose(self):
+        """Stop playback and close the HTTP session"""
+        await self.stop()
+        if self._http is not None and not self._http.closed:
+            await self._http.close()
+        self._http = None
+
     async def stop(self):
         """Stop current playback and interrupt session.say() IMMEDIATELY with FULL cancellation"""
         logger.info("🛑 UNIFIED: IMMEDIATE STOP requested")
@@ -55,22 +263,26 @@ class UnifiedAudioPlayer:
         # Set stop event FIRST - this stops audio frame iteration immediately
         self.stop_event.set()
 
+        self._drain_event.clear()
+        speech_handle = self.session_say_task
+        playback_task = self.current_task
+
         # ROBUSTLY cancel and wait for session.say() task to fully terminate
         if self.session_say_task:
             try:
-                logger.info("🛑 UNIFIED: Cancelling active speech handle...")
+                logger.debug("🛑 UNIFIED: Cancelling active speech handle...")
 
                 # Method 1: Try cancel() if available
                 if hasattr(self.session_say_task, 'cancel'):
                     self.session_say_task.cancel()
-                    logger.info("🛑 UNIFIED: Called cancel() on speech handle")
+                    logger.debug("🛑 UNIFIED: Called cancel() on speech handle")
 
                     # Wait for cancellation to complete with timeout
                     try:
                         await asyncio.wait_for(self.session_say_task, timeout=0.5)
-                        logger.info("🛑 UNIFIED: Speech handle fully cancelled")
+                        logger.debug("🛑 UNIFIED: Speech handle fully cancelled")
                     except asyncio.CancelledError:
-                        logger.info("🛑 UNIFIED: Speech handle cancellation confirmed")
+                        logger.debug("🛑 UNIFIED: Speech handle cancellation confirmed")
                     except asyncio.TimeoutError:
                         logger.warning("🛑 UNIFIED: Speech handle cancellation timeout (will force continue)")
                     except Exception as e:
@@ -79,7 +291,7 @@ class UnifiedAudioPlayer:
                 # Method 2: Try interrupt() as fallback
                 elif hasattr(self.session_say_task, 'interrupt'):
                     self.session_say_task.interrupt()
-                    logger.info("🛑 UNIFIED: Called interrupt() on speech handle")
+                    logger.debug("🛑 UNIFIED: Called interrupt() on speech handle")
 
                     # Give it a moment to process the interrupt
                     await asyncio.sleep(0.1)
@@ -96,15 +308,15 @@ class UnifiedAudioPlayer:
 
         # Cancel background task aggressively and WAIT for it
         if self.current_task and not self.current_task.done():
-            logger.info("🛑 UNIFIED: Cancelling background playback task...")
+            logger.debug("🛑 UNIFIED: Cancelling background playback task...")
             self.current_task.cancel()
 
             try:
                 # Wait for background task to fully cancel with timeout
                 await asyncio.wait_for(self.current_task, timeout=0.5)
-                logger.info("🛑 UNIFIED: Background task fully cancelled")
+                logger.debug("🛑 UNIFIED: Background task fully cancelled")
             except asyncio.CancelledError:
-                logger.info("🛑 UNIFIED: Background task cancellation confirmed")
+                logger.debug("🛑 UNIFIED: Background task cancellation confirmed")
             except asyncio.TimeoutError:
                 logger.warning("🛑 UNIFIED: Background task cancellation timeout")
             except Exception as e:
@@ -116,22 +328,38 @@ class UnifiedAudioPlayer:
         # Force clear all states immediately
         self.is_playing = False
         audio_state_manager.force_stop_music()
-        logger.info("🛑 UNIFIED: IMMEDIATE stop completed - ready for new playback")
+        self._signal_drained(speech_handle, playback_task)
+        logger.debug("🛑 UNIFIED: IMMEDIATE stop completed - ready for new playback")
+
+    def _signal_drained(self, speech_handle, playback_task):
+        """Set the drain event now, or as soon as the stopped handle and task report done"""
+        if playback_task is not None and not playback_task.done():
+            playback_task.add_done_callback(lambda _: self._signal_drained(speech_handle, None))
+            return
+
+        if speech_handle is None or (hasattr(speech_handle, 'done') and speech_handle.done()):
+            self._drain_event.set()
+        elif hasattr(speech_handle, 'add_done_callback'):
+            speech_handle.add_done_callback(lambda _: self._drain_event.set())
+        # Otherwise play_from_url waits out its bound
 
     async def play_from_url(self, url: str, title: str = "Audio"):
         """Play audio from URL through agent's TTS channel using session.say()"""
         # Use lock to prevent race conditions when multiple rapid requests arrive
         async with self._playback_lock:
-            logger.info(f"🎵 UNIFIED: Acquired playback lock for: {title}")
+            logger.debug("🎵 UNIFIED: Acquired playback lock for: %s", title)
 
             await self.stop()  # Stop any current playback and wait for full cancellation
 
-            # CRITICAL: Small delay to ensure LiveKit session clears its internal audio buffer
+            # CRITICAL: Wait for the old speech to finish so LiveKit has cleared its audio buffer
             # Without this, old audio frames may still be in the pipeline
-            await asyncio.sleep(0.2)
-            logger.info(f"🎵 UNIFIED: Audio pipeline cleared, starting playback: {title}")
+            try:
+                await asyncio.wait_for(self._drain_event.wait(), timeout=0.2)
+            except asyncio.TimeoutError:
+                logger.debug("🎵 UNIFIED: Previous playback still draining after 200ms, continuing")
+            logger.debug("🎵 UNIFIED: Audio pipeline cleared, starting playback: %s", title)
 
-            logger.info(f"🎵 UNIFIED: Starting playback: {title}")
+            logger.info("🎵 UNIFIED: Starting playback: %s", title)
             self.is_playing = True
             self.stop_event.clear()
 
@@ -143,18 +371,23 @@ class UnifiedAudioPlayer:
 
             # Return immediately - don't wait for completion to avoid blocking the agent
             # The agent function should return empty string to avoid TTS interference
-            logger.info(f"🎵 UNIFIED: Started playback task for: {title}")
+            logger.debug("🎵 UNIFIED: Started playback task for: %s", title)
             return f"Started playing {title}"
 
     async def _play_via_session_say(self, url: str, title: str):
         """Play audio through session.say() with audio frames"""
+        audio_frames = None
         try:
             if not self.session:
                 logger.error("No session available for playback")
                 return
 
+            # Replays come straight from the decoded PCM cache
+            audio_frames = await self._frames_from_pcm_cache(url, title)
+
             # Stream and convert audio to frames (NEW: no full download!)
-            audio_frames = await self._stream_download_and_convert(url, title)
+            if audio_frames is None:
+                audio_frames = await self._stream_download_and_convert(url, title)
 
             # Fallback to full download if streaming fails
             if audio_frames is None:
@@ -162,7 +395,7 @@ class UnifiedAudioPlayer:
                 audio_frames = await self._download_and_convert_to_frames_fallback(url, title)
 
             if audio_frames is not None:
-                logger.info(f"🎵 UNIFIED: Injecting {title} into TTS queue via session.say()")
+                logger.debug("🎵 UNIFIED: Injecting %s into TTS queue via session.say()", title)
 
                 try:
                     # Use session.say() with audio frames - NO TEXT to avoid TTS before music!
@@ -178,17 +411,17 @@ class UnifiedAudioPlayer:
 
                     # Wait for the speech to complete (only if we got a valid handle)
                     if speech_handle is not None:
-                        logger.info(f"🎵 UNIFIED: Waiting for {title} to complete playback...")
+                        logger.debug("🎵 UNIFIED: Waiting for %s to complete playback...", title)
                         await speech_handle
-                        logger.info(f"🎵 UNIFIED: {title} playback completed normally")
+                        logger.debug("🎵 UNIFIED: %s playback completed normally", title)
                     else:
                         logger.error("🎵 UNIFIED: session.say() returned None - cannot await")
                         return
 
-                    logger.info(f"🎵 UNIFIED: Successfully completed {title} playback")
+                    logger.debug("🎵 UNIFIED: Successfully completed %s playback", title)
 
                 except asyncio.CancelledError:
-                    logger.info(f"🎵 UNIFIED: Playback of {title} was cancelled (interrupted by new request)")
+                    logger.debug("🎵 UNIFIED: Playback of %s was cancelled (interrupted by new request)", title)
                     # Re-raise to propagate cancellation
                     raise
                 except Exception as e:
@@ -199,15 +432,19 @@ class UnifiedAudioPlayer:
                 return
 
         except asyncio.CancelledError:
-            logger.info(f"🎵 UNIFIED: Playback cancelled: {title}")
+            logger.debug("🎵 UNIFIED: Playback cancelled: %s", title)
             raise
         except Exception as e:
             logger.error(f"🎵 UNIFIED: Error playing audio: {e}")
         finally:
+            # Release the stream if session.say() never drained it
+            if isinstance(audio_frames, StreamingAudioIterator):
+                await audio_frames.aclose()
+
             self.is_playing = False
             # Force clear music state to allow listening state transitions
             audio_state_manager.force_stop_music()
-            logger.info(f"🎵 UNIFIED: Finished playing: {title}")
+            logger.info("🎵 UNIFIED: Finished playing: %s", title)
 
             # Send music end signal via data channel FIRST (most important!)
             await self._send_music_end_signal()
@@ -219,84 +456,72 @@ class UnifiedAudioPlayer:
             # The completion message was causing the agent to go back to "speaking" state
             # which could trap the system if the state change gets suppressed
 
+    async def _frames_from_pcm_cache(self, url: str, title: str) -> Optional[AsyncIterator[rtc.AudioFrame]]:
+        """Frames over previously decoded PCM on disk, or None on a cache miss"""
+        try:
+            path = await asyncio.to_thread(get_pcm_file_cache().get, url)
+            if path is None:
+                return None
+            pcm = await asyncio.to_thread(_map_pcm_file, path)
+        except Exception as e:
+            logger.warning(f"🎵 UNIFIED: PCM cache read failed for {title}: {e}")
+            return None
+
+        if pcm is None or not LIVEKIT_AVAILABLE:
+            return None
+
+        logger.info("🎵 UNIFIED: Playing %s from decoded PCM cache", title)
+        return AudioFrameIterator(pcm, 48000, 960, self.stop_event)
+
     async def _stream_download_and_convert(self, url: str, title: str) -> Optional[AsyncIterator[rtc.AudioFrame]]:
         """Stream audio chunks and convert to frames on-the-fly (OPTIMIZED: no full download!)"""
         try:
-            logger.info(f"🎵 UNIFIED: Starting streaming for {title} from {url}")
+            logger.debug("🎵 UNIFIED: Starting streaming for %s from %s", title, url)
 
-            # Use longer timeout for streaming
-            timeout = aiohttp.ClientTimeout(total=None)  # No timeout for streaming
             headers = {
                 'User-Agent': 'LiveKit-Agent/1.0',
                 'Accept': 'audio/mpeg, audio/*',
             }
 
-            session = aiohttp.ClientSession(timeout=timeout)
+            session = self._get_http()
             response = None
-            
+
             try:
                 response = await session.get(url, headers=headers)
-                
-                # Check if response is valid
-                if response is None:
-                    logger.error("Failed to get response from URL")
-                    await session.close()
-                    return None
 
-                if response.status == 403 and 'cloudfront' in url:
+                s3_url = to_s3_url(url)
+                if response.status == 403 and s3_url:
                     # Try S3 fallback
-                    close_result = response.close()
-                    if close_result is not None and asyncio.iscoroutine(close_result):
-                        await close_result
-                    
-                    s3_url = url.replace('dbtnllz9fcr1z.cloudfront.net', 'cheeko-audio-files.s3.us-east-1.amazonaws.com')
+                    response.release()
+
                     logger.warning("Trying S3 fallback URL for streaming")
                     response = await session.get(s3_url, headers=headers)
-                    
-                    # Check fallback response
-                    if response is None:
-                        logger.error("Failed to get S3 fallback response")
-                        await session.close()
-                        return None
 
                 if response.status != 200:
                     logger.error(f"Streaming failed: HTTP {response.status}")
-                    close_result = response.close()
-                    if close_result is not None and asyncio.iscoroutine(close_result):
-                        await close_result
-                    await session.close()
+                    response.release()
                     return None
 
                 # Get content length for progress tracking
                 content_length = response.headers.get('Content-Length')
-                logger.info(f"🎵 UNIFIED: Streaming {content_length or 'unknown'} bytes")
+                logger.debug("🎵 UNIFIED: Streaming %s bytes", content_length or 'unknown')
 
                 # Return streaming audio iterator (NEW: no full download!)
-                if PYDUB_AVAILABLE and LIVEKIT_AVAILABLE:
-                    return StreamingAudioIterator(response, session, self.stop_event, title)
+                if STREAM_DECODER_AVAILABLE and NUMPY_AVAILABLE and LIVEKIT_AVAILABLE:
+                    frames = StreamingAudioIterator(response, self.stop_event, title, cache_url=url)
+                    # Begin download and decode now so frames are buffered by the time session.say() pulls
+                    frames.start()
+                    return frames
                 else:
                     logger.error("Required libraries not available for audio conversion")
-                    close_result = response.close()
-                    if close_result is not None and asyncio.iscoroutine(close_result):
-                        await close_result
-                    await session.close()
+                    response.release()
                     return None
 
-            except Exception as e:
+            except Exception:
                 # Clean up on error
                 if response is not None:
-                    try:
-                        close_result = response.close()
-                        if close_result is not None and asyncio.iscoroutine(close_result):
-                            await close_result
-                    except Exception:
-                        pass
-                        
-                try:
-                    await session.close()
-                except Exception:
-                    pass
-                raise e
+                    response.release()
+                raise
 
         except Exception as e:
             logger.error(f"🎵 UNIFIED: Error starting stream: {e}")
@@ -305,7 +530,7 @@ class UnifiedAudioPlayer:
     async def _download_and_convert_to_frames_fallback(self, url: str, title: str) -> Optional[AsyncIterator[rtc.AudioFrame]]:
         """LEGACY: Download full audio and convert to AudioFrame iterator (kept for fallback)"""
         try:
-            logger.info(f"🎵 UNIFIED: FALLBACK - Downloading {title} from {url}")
+            logger.debug("🎵 UNIFIED: FALLBACK - Downloading %s from %s", title, url)
 
             # Download audio
             timeout = aiohttp.ClientTimeout(total=30)
@@ -314,29 +539,22 @@ class UnifiedAudioPlayer:
                 'Accept': 'audio/mpeg, audio/*',
             }
 
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 403 and 'cloudfront' in url:
-                        # Try S3 fallback
-                        s3_url = url.replace('dbtnllz9fcr1z.cloudfront.net', 'cheeko-audio-files.s3.us-east-1.amazonaws.com')
-                        logger.warning("Trying S3 fallback URL")
-                        async with session.get(s3_url, headers=headers) as s3_response:
-                            if s3_response.status == 200:
-                                audio_data = await s3_response.read()
-                            else:
-                                logger.error(f"Download failed: HTTP {s3_response.status}")
-                                return None
-                    elif response.status == 200:
-                        audio_data = await response.read()
-                    else:
-                        logger.error(f"Download failed: HTTP {response.status}")
-                        return None
+            status, audio_data = await self._fetch_audio(url, headers, timeout)
+            s3_url = to_s3_url(url)
+            if status == 403 and s3_url:
+                # Try S3 fallback
+                logger.warning("Trying S3 fallback URL")
+                status, audio_data = await self._fetch_audio(s3_url, headers, timeout)
 
-            logger.info(f"🎵 UNIFIED: Downloaded {len(audio_data)} bytes")
+            if audio_data is None:
+                logger.error(f"Download failed: HTTP {status}")
+                return None
+
+            logger.debug("🎵 UNIFIED: Downloaded %s bytes", len(audio_data))
 
             # Convert to audio frames
-            if PYDUB_AVAILABLE and LIVEKIT_AVAILABLE:
-                return await self._create_frame_iterator(audio_data)
+            if (MINIAUDIO_AVAILABLE or SOUNDFILE_AVAILABLE) and LIVEKIT_AVAILABLE:
+                return await self._create_frame_iterator(audio_data, cache_url=url)
             else:
                 logger.error("Required libraries not available for audio conversion")
                 return None
@@ -345,23 +563,80 @@ class UnifiedAudioPlayer:
             logger.error(f"🎵 UNIFIED: Error downloading/converting: {e}")
             return None
 
-    async def _create_frame_iterator(self, audio_data: bytes):
-        """Create an async iterator of AudioFrames from audio data for session.say()"""
+    async def _fetch_audio(self, url: str, headers: dict, timeout: aiohttp.ClientTimeout) -> Tuple[int, Optional[bytes]]:
+        """Download a whole file as (HTTP status, body), in parallel byte ranges when it is large"""
+        session = self._get_http()
+
+        total = 0
         try:
-            # Convert MP3 to PCM using pydub
-            audio_segment = AudioSegment.from_mp3(io.BytesIO(audio_data))
+            async with session.head(url, headers=headers, timeout=timeout) as head:
+                if head.status == 200 and head.headers.get('Accept-Ranges') == 'bytes':
+                    total = int(head.headers.get('Content-Length') or 0)
+        except Exception as e:
+            logger.debug(f"🎵 UNIFIED: HEAD failed, downloading in one request: {e}")
+
+        if total >= _RANGE_DOWNLOAD_MIN_BYTES:
+            audio_data = await self._fetch_ranges(url, headers, timeout, total)
+            if audio_data is not None:
+                return 200, audio_data
+
+        async with session.get(url, headers=headers, timeout=timeout) as response:
+            if response.status != 200:
+                return response.status, None
+            return 200, await response.read()
+
+    async def _fetch_ranges(self, url: str, headers: dict, timeout: aiohttp.ClientTimeout, total: int) -> Optional[bytes]:
+        """Fetch total bytes as _RANGE_DOWNLOAD_PARTS concurrent Range requests into one buffer"""
+        session = self._get_http()
+        buffer = bytearray(total)
+        view = memoryview(buffer)
+        part_size = -(-total // _RANGE_DOWNLOAD_PARTS)
+
+        async def fetch_part(start: int):
+            end = min(start + part_size, total) - 1
+            part_headers = {**headers, 'Range': f'bytes={start}-{end}'}
+            async with session.get(url, headers=part_headers, timeout=timeout) as response:
+                if response.status != 206:
+                    raise ValueError(f"HTTP {response.status} for bytes {start}-{end}")
+                position = start
+                async for chunk in response.content.iter_any():
+                    view[position:position + len(chunk)] = chunk
+                    position += len(chunk)
+                if position != end + 1:
+                    raise ValueError(f"short read for bytes {start}-{end}")
+
+        tasks = [asyncio.create_task(fetch_part(start)) for start in range(0, total, part_size)]
+        try:
+            await asyncio.gather(*tasks)
+        except Exception as e:
+            logger.warning(f"🎵 UNIFIED: Ranged download failed, retrying in one request: {e}")
+            return None
+        finally:
+            # Stops the remaining parts after a failure or cancellation (no-op once all are done)
+            for task in tasks:
+                task.cancel()
 
-            # Convert to 48kHz mono for LiveKit
-            audio_segment = audio_segment.set_frame_rate(48000)
-            audio_segment = audio_segment.set_channels(1)
-            audio_segment = audio_segment.set_sample_width(2)
+        logger.debug("🎵 UNIFIED: Downloaded %s bytes in %s parallel ranges", total, len(tasks))
+        return bytes(buffer)
 
-            raw_audio = audio_segment.raw_data
+    async def _create_frame_iterator(self, audio_data: bytes, cache_url: Optional[str] = None):
+        """Create an async iterator of AudioFrames from audio data for session.say()"""
+        try:
             sample_rate = 48000
+
+            # Decoding takes hundreds of ms for a full song; keep it off the event loop
+            loop = asyncio.get_running_loop()
+            raw_audio = await loop.run_in_executor(
+                self._decode_pool, _decode_to_mapped_pcm, audio_data, sample_rate, cache_url
+            )
+            if raw_audio is None:
+                logger.error("🎵 UNIFIED: Could not decode audio (needs miniaudio or soundfile)")
+                return None
+
             frame_duration_ms = 20
             samples_per_frame = sample_rate * frame_duration_ms // 1000
 
-            logger.info(f"🎵 UNIFIED: Created audio frames for {len(raw_audio)} bytes")
+            logger.debug("🎵 UNIFIED: Created audio frames for %s bytes", len(raw_audio))
 
             # Return an async iterator
             return AudioFrameIterator(raw_audio, sample_rate, samples_per_frame, self.stop_event)
@@ -374,15 +649,11 @@ class UnifiedAudioPlayer:
         """Send music end signal via data channel"""
         try:
             if self.context and hasattr(self.context, 'room'):
-                import json
-                music_end_data = {
-                    "type": "music_playback_stopped"
-                }
                 await self.context.room.local_participant.publish_data(
-                    json.dumps(music_end_data).encode(),
+                    _MUSIC_STOP_PAYLOAD,
                     topic="music_control"
                 )
-                logger.info("🎵 UNIFIED: Sent music_playback_stopped via data channel")
+                logger.debug("🎵 UNIFIED: Sent music_playback_stopped via data channel")
         except Exception as e:
             logger.warning(f"🎵 UNIFIED: Failed to send music end signal: {e}")
 
@@ -404,7 +675,7 @@ class UnifiedAudioPlayer:
                 
                 # Use session.say() to send completion message
                 await self.session.say(message, allow_interruptions=True)
-                logger.info(f"🎵 UNIFIED: Sent completion message: {message}")
+                logger.debug("🎵 UNIFIED: Sent completion message: %s", message)
         except Exception as e:
             logger.warning(f"🎵 UNIFIED: Failed to send completion message: {e}")
 
@@ -412,54 +683,50 @@ class UnifiedAudioPlayer:
         """Send agent state change to listening mode (mimics normal TTS completion)"""
         try:
             if self.context and hasattr(self.context, 'room'):
-                import json
-                agent_state_data = {
-                    "type": "agent_state_changed",
-                    "data": {
-                        "old_state": "speaking",
-                        "new_state": "listening"
-                    }
-                }
                 await self.context.room.local_participant.publish_data(
-                    json.dumps(agent_state_data).encode(),
+                    _AGENT_LISTENING_PAYLOAD,
                     reliable=True
                 )
-                logger.info("🎵 UNIFIED: Sent agent_state_changed (speaking -> listening) via data channel")
+                logger.debug("🎵 UNIFIED: Sent agent_state_changed (speaking -> listening) via data channel")
         except Exception as e:
             logger.warning(f"🎵 UNIFIED: Failed to send agent state change: {e}")
 
 
 class AudioFrameIterator:
-    """Async iterator for audio frames"""
+    """Async iterator for audio frames over in-memory or memory-mapped PCM"""
 
-    def __init__(self, raw_audio: bytes, sample_rate: int, samples_per_frame: int, stop_event):
-        self.raw_audio = raw_audio
+    def __init__(self, raw_audio: Union[bytes, mmap.mmap], sample_rate: int, samples_per_frame: int, stop_event):
         self.sample_rate = sample_rate
         self.samples_per_frame = samples_per_frame
         self.stop_event = stop_event
+        # Bound once so the per-frame check is a single call
+        self.is_stopped = stop_event.is_set
+        self.frame_bytes = samples_per_frame * 2
+        # Whole frames are zero-copy slices of one view (rtc.AudioFrame copies what it is given);
+        # only the short last frame is padded, once
+        self.audio_view = memoryview(raw_audio)
+        self.full_frames_end = len(raw_audio) - len(raw_audio) % self.frame_bytes
+        tail = raw_audio[self.full_frames_end:]
+        self.tail = bytes(tail) + b'\x00' * (self.frame_bytes - len(tail)) if tail else None
         self.position = 0
 
     def __aiter__(self):
         return self
 
     async def __anext__(self):
-        # Check stop event FIRST - immediate response to abort
-        if self.stop_event.is_set():
-            raise StopAsyncIteration
-
-        if self.position >= len(self.raw_audio):
+        # Check stop event FIRST - immediate response to abort. Nothing below awaits, so the
+        # event cannot change before the frame is returned and one check is enough
+        if self.is_stopped():
             raise StopAsyncIteration
 
         # Get next chunk
-        chunk = self.raw_audio[self.position:self.position + self.samples_per_frame * 2]
-        self.position += self.samples_per_frame * 2
-
-        if len(chunk) < self.samples_per_frame * 2:
-            chunk += b'\x00' * (self.samples_per_frame * 2 - len(chunk))
-
-        # Check stop event again before creating frame - double check for responsiveness
-        if self.stop_event.is_set():
+        if self.position < self.full_frames_end:
+            chunk = self.audio_view[self.position:self.position + self.frame_bytes]
+        elif self.position == self.full_frames_end and self.tail is not None:
+            chunk = self.tail
+        else:
             raise StopAsyncIteration
+        self.position += self.frame_bytes
 
         frame = rtc.AudioFrame(
             data=chunk,
@@ -472,22 +739,37 @@ class AudioFrameIterator:
 
 
 class StreamingAudioIterator:
-    """Async iterator for streaming audio frames - processes MP3 chunks in real-time"""
+    """Async iterator for streaming audio frames - decodes MP3 bytes as they download"""
 
-    def __init__(self, response, session, stop_event, title: str):
+    def __init__(self, response, stop_event, title: str, cache_url: Optional[str] = None):
         self.response = response
-        self.session = session
         self.stop_event = stop_event
         self.title = title
-        self.chunk_size = 64 * 1024  # 64KB chunks for good balance
-        self.buffer = b''
-        self.audio_converter = None
-        self.frame_queue = asyncio.Queue(maxsize=100)  # Buffer frames for smooth playback
-        self.producer_task = None
+        # Decoded PCM is teed to the PCM cache under cache_url and kept if the track completes
+        self.cache_url = cache_url
+        self.cache_file = None
+        self.cache_temp_path = None
+        self.cache_pending = bytearray()
+        self.download_complete = False
         self.sample_rate = 48000
         self.samples_per_frame = 960  # 20ms at 48kHz
+        self.frame_bytes = self.samples_per_frame * 2
+        # Frames that straddle two decoder outputs are assembled in this one preallocated buffer;
+        # rtc.AudioFrame copies its data, so the buffer is reused for every such frame
+        self.frame_buf = bytearray(self.frame_bytes)
+        self.staged = 0  # Bytes of the next frame already in frame_buf
+        # One decoder for the whole track; it keeps its own state between pushes
+        self.decoder = AudioStreamDecoder(sample_rate=self.sample_rate, num_channels=1)
+        # Single-producer/single-consumer ring of frames; None marks the end of the stream
+        self.ring = [None] * _FRAME_RING_SIZE
+        self.head = 0  # Next slot to read
+        self.tail = 0  # Next slot to write
+        self.not_empty = asyncio.Event()
+        self.not_full = asyncio.Event()
+        self.producer_task = None
         self.is_finished = False
         self.bytes_processed = 0
+        self.next_log_at = _PROGRESS_LOG_BYTES
 
     def __aiter__(self):
         return self
@@ -502,13 +784,19 @@ class StreamingAudioIterator:
             await self._cleanup()
             raise StopAsyncIteration
 
-        # Start producer task if not already started
-        if self.producer_task is None:
-            self.producer_task = asyncio.create_task(self._produce_frames())
+        self.start()
 
         try:
-            # Get next frame from queue with timeout
-            frame = await asyncio.wait_for(self.frame_queue.get(), timeout=5.0)
+            # Get next frame from the ring, waiting (with timeout) only when it is empty
+            while self.head == self.tail:
+                self.not_empty.clear()
+                await asyncio.wait_for(self.not_empty.wait(), timeout=5.0)
+
+            slot = self.head & _FRAME_RING_MASK
+            frame = self.ring[slot]
+            self.ring[slot] = None
+            self.head += 1
+            self.not_full.set()
 
             if frame is None:  # End of stream marker
                 await self._cleanup()
@@ -528,35 +816,150 @@ class StreamingAudioIterator:
             raise StopAsyncIteration
 
     async def _produce_frames(self):
-        """Background task to download chunks and convert to audio frames"""
+        """Background task to feed downloaded chunks to the decoder and queue the decoded frames"""
+        feeder = asyncio.create_task(self._feed_decoder())
+        completed = False
         try:
-            logger.info(f"🎵 STREAMING: Starting frame producer for {self.title}")
+            logger.debug("🎵 STREAMING: Starting frame producer for %s", self.title)
+            await self._open_cache_file()
 
-            async for chunk in self._download_chunks():
+            async for decoded in self.decoder:
                 if self.stop_event.is_set():
                     break
+                pcm = memoryview(decoded.data).cast('B')
+                await self._cache_write(pcm)
+                for frame in self._regroup(pcm):
+                    await self._put_frame(frame)
 
-                # Process chunk to audio frames
-                frames = await self._process_chunk(chunk)
+            if self.staged and not self.stop_event.is_set():
+                # Pad the last partial frame with silence
+                self.frame_buf[self.staged:] = bytes(self.frame_bytes - self.staged)
+                self.staged = 0
+                await self._put_frame(self._make_frame(self.frame_buf))
 
-                # Add frames to queue
-                for frame in frames:
-                    if self.stop_event.is_set():
-                        break
-                    await self.frame_queue.put(frame)
+            completed = self.download_complete and not self.stop_event.is_set()
 
             # Signal end of stream
-            await self.frame_queue.put(None)
-            logger.info(f"🎵 STREAMING: Finished producing frames for {self.title} ({self.bytes_processed} bytes)")
+            await self._put_frame(None)
+            logger.debug("🎵 STREAMING: Finished producing frames for %s (%s bytes)", self.title, self.bytes_processed)
 
         except Exception as e:
             logger.error(f"🎵 STREAMING: Producer error: {e}")
-            await self.frame_queue.put(None)  # Signal end
+            await self._put_frame(None)  # Signal end
+        finally:
+            feeder.cancel()
+            await self._finish_cache_file(completed)
+
+    async def _open_cache_file(self):
+        """Open a temp file in the PCM cache for this track (skipped if the cache is unusable)"""
+        if not self.cache_url:
+            return
+        opening = asyncio.ensure_future(asyncio.to_thread(_open_pcm_file))
+        try:
+            self.cache_temp_path, self.cache_file = await asyncio.shield(opening)
+        except asyncio.CancelledError:
+            # Stopped mid-open: drop the file once the worker thread has created it
+            opening.add_done_callback(_discard_opened_pcm_file)
+            raise
+        except Exception as e:
+            logger.warning(f"🎵 STREAMING: PCM cache unavailable: {e}")
+
+    async def _cache_write(self, pcm: memoryview):
+        """Buffer decoded PCM and write it out in large blocks on a worker thread"""
+        if self.cache_file is None:
+            return
+        self.cache_pending += pcm
+        if len(self.cache_pending) >= _PCM_CACHE_WRITE_BYTES:
+            block = bytes(self.cache_pending)
+            self.cache_pending.clear()
+            try:
+                await asyncio.to_thread(self.cache_file.write, block)
+            except Exception as e:
+                logger.warning(f"🎵 STREAMING: PCM cache write failed: {e}")
+                await self._finish_cache_file(False)
+
+    async def _finish_cache_file(self, completed: bool):
+        """Keep the cached PCM if the whole track was decoded, otherwise drop it"""
+        if self.cache_file is None:
+            return
+        cache_file, self.cache_file = self.cache_file, None
+        tail = bytes(self.cache_pending)
+        self.cache_pending.clear()
+        # Shielded so a cancelled playback still cleans up its partial file
+        await asyncio.shield(asyncio.to_thread(
+            _finish_pcm_file, cache_file, self.cache_temp_path, self.cache_url, tail, completed
+        ))
+
+    def start(self):
+        """Start downloading and decoding in the background (idempotent)"""
+        if self.producer_task is None:
+            self.producer_task = asyncio.create_task(self._produce_frames())
+
+    async def aclose(self):
+        """Stop the producer and release the HTTP response"""
+        await self._cleanup()
+
+    def _regroup(self, pcm: memoryview) -> list:
+        """Cut decoded PCM into 20ms frames, carrying any remainder over in the frame buffer"""
+        frames = []
+        offset = 0
+
+        # Complete the frame left over from the previous call
+        if self.staged:
+            offset = min(self.frame_bytes - self.staged, len(pcm))
+            self.frame_buf[self.staged:self.staged + offset] = pcm[:offset]
+            self.staged += offset
+            if self.staged < self.frame_bytes:
+                return frames
+            frames.append(self._make_frame(self.frame_buf))
+            self.staged = 0
+
+        # Whole frames are rows of one (n, 960) view over the decoded data - no per-frame slicing
+        whole = (len(pcm) - offset) // self.frame_bytes
+        if whole:
+            rows = np.frombuffer(pcm, dtype=np.int16, count=whole * self.samples_per_frame, offset=offset)
+            frames.extend(self._make_frame(row) for row in rows.reshape(whole, self.samples_per_frame))
+            offset += whole * self.frame_bytes
+
+        # Keep the tail for the next call
+        self.staged = len(pcm) - offset
+        self.frame_buf[:self.staged] = pcm[offset:]
+        return frames
+
+    def _make_frame(self, data):
+        return rtc.AudioFrame(
+            data=data,
+            sample_rate=self.sample_rate,
+            num_channels=1,
+            samples_per_channel=self.samples_per_frame
+        )
+
+    async def _put_frame(self, frame):
+        """Write a frame into the ring, waiting while the consumer is a full ring behind"""
+        while self.tail - self.head >= _FRAME_RING_SIZE:
+            self.not_full.clear()
+            await self.not_full.wait()
+
+        self.ring[self.tail & _FRAME_RING_MASK] = frame
+        self.tail += 1
+        self.not_empty.set()
+
+    async def _feed_decoder(self):
+        """Push MP3 bytes into the decoder as they arrive; it decodes on its own thread"""
+        try:
+            async for chunk in self._download_chunks():
+                self.decoder.push(chunk)
+            self.download_complete = not self.stop_event.is_set()
+        except Exception:
+            pass  # Already logged by _download_chunks; decode what arrived
+        finally:
+            self.decoder.end_input()
 
     async def _download_chunks(self):
         """Download HTTP response in chunks"""
         try:
-            async for chunk in self.response.content.iter_chunked(self.chunk_size):
+            # iter_any hands over whatever has arrived instead of regrouping into fixed-size chunks
+            async for chunk in self.response.content.iter_any():
                 if self.stop_event.is_set():
                     break
 
@@ -564,72 +967,14 @@ class StreamingAudioIterator:
                 yield chunk
 
                 # Log progress every 512KB
-                if self.bytes_processed % (512 * 1024) == 0:
-                    logger.debug(f"🎵 STREAMING: Downloaded {self.bytes_processed // 1024}KB for {self.title}")
+                if self.bytes_processed >= self.next_log_at:
+                    logger.debug("🎵 STREAMING: Downloaded %sKB for %s", self.bytes_processed // 1024, self.title)
+                    self.next_log_at = (self.bytes_processed // _PROGRESS_LOG_BYTES + 1) * _PROGRESS_LOG_BYTES
 
         except Exception as e:
             logger.error(f"🎵 STREAMING: Download error: {e}")
             raise
 
-    async def _process_chunk(self, chunk: bytes) -> list:
-        """Convert MP3 chunk to audio frames"""
-        try:
-            # Add to buffer
-            self.buffer += chunk
-
-            # Try to process complete MP3 frames from buffer
-            frames = []
-
-            # For simplicity, we'll process when we have enough data
-            # In production, you'd want proper MP3 frame boundary detection
-            if len(self.buffer) >= 4096:  # Process when we have enough data
-                try:
-                    # Convert MP3 data to PCM using pydub
-                    if PYDUB_AVAILABLE:
-                        audio_segment = AudioSegment.from_mp3(io.BytesIO(self.buffer))
-
-                        # Convert to 48kHz mono for LiveKit
-                        audio_segment = audio_segment.set_frame_rate(self.sample_rate)
-                        audio_segment = audio_segment.set_channels(1)
-                        audio_segment = audio_segment.set_sample_width(2)
-
-                        raw_audio = audio_segment.raw_data
-
-                        # Split into frames
-                        frame_size = self.samples_per_frame * 2  # 2 bytes per sample
-                        for i in range(0, len(raw_audio), frame_size):
-                            if self.stop_event.is_set():
-                                break
-
-                            frame_data = raw_audio[i:i + frame_size]
-
-                            # Pad if necessary
-                            if len(frame_data) < frame_size:
-                                frame_data += b'\x00' * (frame_size - len(frame_data))
-
-                            frame = rtc.AudioFrame(
-                                data=frame_data,
-                                sample_rate=self.sample_rate,
-                                num_channels=1,
-                                samples_per_channel=self.samples_per_frame
-                            )
-                            frames.append(frame)
-
-                        # Clear processed buffer
-                        self.buffer = b''
-
-                except Exception as e:
-                    # If processing fails, try with smaller buffer or skip
-                    logger.debug(f"🎵 STREAMING: Chunk processing issue (normal): {e}")
-                    if len(self.buffer) > 64 * 1024:  # If buffer too large, clear it
-                        self.buffer = self.buffer[-8192:]  # Keep last 8KB
-
-            return frames
-
-        except Exception as e:
-            logger.error(f"🎵 STREAMING: Chunk processing error: {e}")
-            return []
-
     async def _cleanup(self):
         """Clean up resources"""
         if not self.is_finished:
@@ -643,18 +988,14 @@ class StreamingAudioIterator:
                     pass
 
             try:
-                if self.response and hasattr(self.response, 'close'):
-                    close_result = self.response.close()
-                    # Only await if it's actually a coroutine
-                    if close_result is not None and asyncio.iscoroutine(close_result):
-                        await close_result
-                    
-                if self.session and hasattr(self.session, 'close'):
-                    close_result = self.session.close()
-                    # Only await if it's actually a coroutine
-                    if close_result is not None and asyncio.iscoroutine(close_result):
-                        await close_result
+                await self.decoder.aclose()
+            except Exception as e:
+                logger.debug(f"🎵 STREAMING: Decoder close error: {e}")
+
+            try:
+                # Hands a fully read connection back to the shared pool (closes it otherwise)
+                self.response.release()
             except Exception as e:
                 logger.debug(f"🎵 STREAMING: Cleanup error: {e}")
 
-            logger.info(f"🎵 STREAMING: Cleaned up resources for {self.title}")
\ No newline at end of file
+            logger.debug("🎵 STREAMING: Cleaned up resources for %s", self.title)
\ No newline at end of file
@@ -1,5 +1,6 @@
 """
-Utils module initialization with automatic model preloading
+Utils module initialization
+Model preloading is started explicitly by the server via start_preloading()
 """
 
 import os
@@ -7,10 +8,12 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-# Auto-start model preloading when utils module is imported
-# This ensures models start loading as soon as the server starts
-def _auto_start_preloading():
-    """Auto-start model preloading if enabled"""
+def start_preloading():
+    """Start background model preloading if enabled
+
+    Called from the worker's prewarm hook rather than at import time, so importing
+    any utils module (tools, tests, subprocesses) does not kick off model loading.
+    """
     try:
         # Check if auto-preloading is enabled (default: true)
         auto_preload = os.getenv("AUTO_PRELOAD_MODELS", "true").lower() == "true"
@@ -23,6 +26,3 @@ def _auto_start_preloading():
 
     except Exception as e:
         logger.warning(f"Auto-preloading failed: {e}")
-
-# Start preloading when module is imported
-_auto_start_preloading()
\ No newline at end of file
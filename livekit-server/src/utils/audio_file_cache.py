@@ -0,0 +1,210 @@
+"""
+On-disk LRU caches for audio files
+Keeps recently played MP3s (and their decoded PCM) so replays skip the network and decoder
+"""
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # No cross-process index lock on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class AudioFileCache:
+    """Size-capped cache of audio files keyed by a hash of their URL
+
+    All methods do blocking file I/O; call them from a worker thread
+    (asyncio.to_thread) when on the event loop.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None, suffix: str = ".mp3"):
+        self.cache_dir = cache_dir or os.getenv("AUDIO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "livekit_music_cache"))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("AUDIO_CACHE_MAX_MB", "500")) * 1024 * 1024
+        self.suffix = suffix
+        self._index_path = os.path.join(self.cache_dir, "cache.json")
+        self._lock = threading.Lock()
+        # key -> [size in bytes, last access time]; loaded on first use
+        self._index: Optional[Dict[str, List[float]]] = None
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}{self.suffix}")
+
+    def _read_index(self) -> Dict[str, List[float]]:
+        """Read cache.json, dropping entries whose files are gone"""
+        index = {}
+        try:
+            with open(self._index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"[AUDIO-CACHE] Ignoring unreadable cache index: {e}")
+        return {key: entry for key, entry in index.items() if os.path.exists(self._path(key))}
+
+    def _load_index(self) -> Dict[str, List[float]]:
+        """This process's view of the index, read from disk on first use"""
+        if self._index is None:
+            self._index = self._read_index()
+        return self._index
+
+    def _merge_index(self) -> Dict[str, List[float]]:
+        """Re-read the shared index and fold in this process's access times and stray files
+
+        Must be called with the file lock held. Other worker processes write the
+        same cache.json, and files they stored without a surviving index entry
+        are picked up from the directory so eviction still accounts for them.
+        """
+        index = self._read_index()
+        for key, (size, accessed) in (self._index or {}).items():
+            if key in index:
+                index[key][1] = max(index[key][1], accessed)
+            elif os.path.exists(self._path(key)):
+                index[key] = [size, accessed]
+
+        try:
+            names = os.listdir(self.cache_dir)
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            if not name.endswith(self.suffix):
+                continue
+            key = name[:-len(self.suffix)]
+            if key not in index:
+                try:
+                    stat = os.stat(self._path(key))
+                except FileNotFoundError:
+                    continue
+                index[key] = [stat.st_size, stat.st_mtime]
+
+        self._index = index
+        return index
+
+    @contextmanager
+    def _index_file_lock(self):
+        """Hold an exclusive lock on the index across worker processes"""
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(os.path.join(self.cache_dir, "cache.lock"), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save_index(self):
+        """Write cache.json atomically"""
+        tmp_path = f"{self._index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path)
+
+    def get(self, url: str) -> Optional[str]:
+        """Path of the cached file for a URL, or None on a miss"""
+        key = self._key(url)
+        path = self._path(key)
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(key)
+            if not os.path.exists(path):
+                index.pop(key, None)
+                return None
+            if entry is None:
+                # Stored by another worker after this process read the index
+                try:
+                    entry = index[key] = [os.path.getsize(path), 0.0]
+                except FileNotFoundError:
+                    return None
+            entry[1] = time.time()
+            return path
+
+    def new_temp_file(self) -> str:
+        """Create an empty temp file inside the cache dir for a download in progress"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(suffix='.part', dir=self.cache_dir)
+        os.close(fd)
+        return temp_path
+
+    def put(self, url: str, temp_path: str):
+        """Move a completed download into the cache and evict least recently used files"""
+        key = self._key(url)
+        try:
+            size = os.path.getsize(temp_path)
+            if size > self.max_bytes:
+                os.unlink(temp_path)
+                return
+            os.replace(temp_path, self._path(key))
+        except Exception as e:
+            logger.warning(f"[AUDIO-CACHE] Failed to store {url}: {e}")
+            self.discard(temp_path)
+            return
+
+        with self._lock, self._index_file_lock():
+            index = self._merge_index()
+            index[key] = [size, time.time()]
+
+            total = sum(entry[0] for entry in index.values())
+            for old_key, (old_size, _) in sorted(index.items(), key=lambda item: item[1][1]):
+                if total <= self.max_bytes:
+                    break
+                if old_key == key:
+                    continue
+                try:
+                    os.unlink(self._path(old_key))
+                except FileNotFoundError:
+                    pass
+                except Exception as e:
+                    logger.warning(f"[AUDIO-CACHE] Failed to evict {old_key}: {e}")
+                    continue
+                del index[old_key]
+                total -= old_size
+
+            try:
+                self._save_index()
+            except Exception as e:
+                logger.warning(f"[AUDIO-CACHE] Failed to save cache index: {e}")
+
+    @staticmethod
+    def discard(temp_path: str):
+        """Remove an unfinished download"""
+        try:
+            os.unlink(temp_path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"[AUDIO-CACHE] Failed to remove {temp_path}: {e}")
+
+
+# Settings are read on first use so values loaded from .env after import still apply
+@lru_cache(maxsize=1)
+def get_audio_file_cache() -> AudioFileCache:
+    """Shared cache of downloaded MP3s used by the audio players"""
+    return AudioFileCache()
+
+
+@lru_cache(maxsize=1)
+def get_pcm_file_cache() -> AudioFileCache:
+    """Shared cache of decoded 48kHz mono int16 PCM, keyed by the source URL (about 5.5 MB per minute of audio)"""
+    return AudioFileCache(
+        cache_dir=os.getenv("PCM_CACHE_DIR", os.path.join(tempfile.gettempdir(), "livekit_pcm_cache")),
+        max_bytes=int(os.getenv("PCM_CACHE_MAX_MB", "1000")) * 1024 * 1024,
+        suffix=".pcm"
+    )
@@ -0,0 +1,27 @@
+"""
+CloudFront to S3 URL rewriting
+Audio is served through CloudFront; when it refuses a file the players retry the S3 bucket behind it
+"""
+
+import os
+from functools import lru_cache
+from typing import Optional, Tuple
+from urllib.parse import urlsplit
+
+
+@lru_cache(maxsize=1)
+def cf_to_s3_hosts() -> Optional[Tuple[str, str]]:
+    """(CloudFront host, S3 host) used to rewrite CDN URLs, read from the environment once"""
+    cf_host = os.getenv("CLOUDFRONT_DOMAIN", "dbtnllz9fcr1z.cloudfront.net")
+    s3_host = urlsplit(os.getenv("S3_BASE_URL", "https://cheeko-audio-files.s3.us-east-1.amazonaws.com")).hostname
+    if not cf_host or not s3_host:
+        return None
+    return cf_host, s3_host
+
+
+def to_s3_url(url: str) -> Optional[str]:
+    """S3 URL for a CloudFront URL, or None when the URL is not on the CloudFront host"""
+    hosts = cf_to_s3_hosts()
+    if not hosts or hosts[0] not in url:
+        return None
+    return url.replace(*hosts)
@@ -5,6 +5,9 @@ from typing import Optional
 
 logger = logging.getLogger("database_helper")
 
+# Idle gap between health checks that keep a pooled Manager API socket warm
+KEEPALIVE_INTERVAL = 60  # seconds
+
 class DatabaseHelper:
     """Helper class for database-related operations via Manager API"""
 
@@ -19,6 +22,61 @@ class DatabaseHelper:
         self.manager_api_url = manager_api_url.rstrip('/')
         self.secret = secret
         self.retry_attempts = 3
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_lock = asyncio.Lock()
+        self._keepalive_task: Optional[asyncio.Task] = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared Manager API session, opening it on first use"""
+        if self._session is not None and not self._session.closed:
+            return self._session
+        async with self._session_lock:
+            if self._session is None or self._session.closed:
+                self._session = aiohttp.ClientSession(
+                    timeout=aiohttp.ClientTimeout(total=10),
+                    headers={
+                        "Authorization": f"Bearer {self.secret}",
+                        "Content-Type": "application/json"
+                    },
+                    # Idle sockets outlive the keepalive ping, so quiet periods don't cost a new handshake
+                    connector=aiohttp.TCPConnector(
+                        limit=100,
+                        limit_per_host=32,
+                        keepalive_timeout=75,
+                        ttl_dns_cache=300,
+                        enable_cleanup_closed=True
+                    )
+                )
+            return self._session
+
+    def start_keepalive(self):
+        """Ping the Manager API in the background so a pooled connection stays open"""
+        if self._keepalive_task is None or self._keepalive_task.done():
+            self._keepalive_task = asyncio.create_task(self._keepalive_loop())
+
+    async def _keepalive_loop(self):
+        while True:
+            await asyncio.sleep(KEEPALIVE_INTERVAL)
+            await self.verify_manager_api_connection()
+
+    async def aclose(self):
+        """Stop the keepalive task and close the shared Manager API session"""
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            try:
+                await self._keepalive_task
+            except asyncio.CancelledError:
+                pass
+            self._keepalive_task = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
 
     def _normalize_mac_address(self, mac_address: str) -> str:
         """
@@ -48,42 +106,37 @@ class DatabaseHelper:
         logger.info(f"🔍 [DB HELPER] get_agent_id - MAC: {device_mac} -> normalized: {normalized_mac}")
         
         url = f"{self.manager_api_url}/agent/device/{normalized_mac}/agent-id"
-        headers = {
-            "Authorization": f"Bearer {self.secret}",
-            "Content-Type": "application/json"
-        }
 
         for attempt in range(self.retry_attempts):
             try:
-                timeout = aiohttp.ClientTimeout(total=10)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
-                    async with session.get(url, headers=headers) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            # Check for Result<String> format: {code: 0, data: "agent_id"}
-                            if data.get('code') == 0 and data.get('data'):
-                                agent_id = data.get('data')
-                                logger.info(f"🆔✅ Retrieved agent_id: {agent_id} for MAC: {device_mac} (normalized: {normalized_mac})")
-                                return str(agent_id)
-                            # Fallback to direct fields
-                            agent_id = data.get('agentId') or data.get('agent_id')
-                            if agent_id:
-                                logger.info(f"🆔✅ Retrieved agent_id: {agent_id} for MAC: {device_mac} (normalized: {normalized_mac})")
-                                return str(agent_id)
-                            else:
-                                logger.warning(f"🆔⚠️ No agent_id found in response for MAC: {device_mac} (normalized: {normalized_mac}). Response: {data}")
-                                return None
-                        elif response.status == 404:
-                            logger.warning(f"No agent found for MAC: {device_mac} (normalized: {normalized_mac})")
-                            return None
+                session = await self._get_session()
+                async with session.get(url) as response:
+                    if response.status == 200:
+                        data = await response.json()
+                        # Check for Result<String> format: {code: 0, data: "agent_id"}
+                        if data.get('code') == 0 and data.get('data'):
+                            agent_id = data.get('data')
+                            logger.info(f"🆔✅ Retrieved agent_id: {agent_id} for MAC: {device_mac} (normalized: {normalized_mac})")
+                            return str(agent_id)
+                        # Fallback to direct fields
+                        agent_id = data.get('agentId') or data.get('agent_id')
+                        if agent_id:
+                            logger.info(f"🆔✅ Retrieved agent_id: {agent_id} for MAC: {device_mac} (normalized: {normalized_mac})")
+                            return str(agent_id)
                         else:
-                            error_text = await response.text()
-                            logger.warning(f"API request failed: {response.status} - {error_text}")
+                            logger.warning(f"🆔⚠️ No agent_id found in response for MAC: {device_mac} (normalized: {normalized_mac}). Response: {data}")
+                            return None
+                    elif response.status == 404:
+                        logger.warning(f"No agent found for MAC: {device_mac} (normalized: {normalized_mac})")
+                        return None
+                    else:
+                        error_text = await response.text()
+                        logger.warning(f"API request failed: {response.status} - {error_text}")
 
-                            # Don't retry client errors (4xx)
-                            if 400 <= response.status < 500:
-                                logger.error(f"Client error, not retrying: {response.status}")
-                                return None
+                        # Don't retry client errors (4xx)
+                        if 400 <= response.status < 500:
+                            logger.error(f"Client error, not retrying: {response.status}")
+                            return None
 
             except asyncio.TimeoutError:
                 logger.warning(f"API request timeout (attempt {attempt + 1}/{self.retry_attempts})")
@@ -115,41 +168,36 @@ class DatabaseHelper:
         logger.info(f"🔍 [DB HELPER] get_current_character - MAC: {device_mac} -> normalized: {normalized_mac}")
 
         url = f"{self.manager_api_url}/agent/device/{normalized_mac}/current-character"
-        headers = {
-            "Authorization": f"Bearer {self.secret}",
-            "Content-Type": "application/json"
-        }
 
         for attempt in range(self.retry_attempts):
             try:
-                timeout = aiohttp.ClientTimeout(total=10)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
-                    async with session.get(url, headers=headers) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            # Check for Result<String> format: {code: 0, data: "character_name"}
-                            if isinstance(data, dict) and data.get('code') == 0:
-                                character_name = data.get('data')
-                                if character_name:
-                                    logger.info(f"✅ [DB HELPER] Current character: {character_name}")
-                                    return character_name
-                                else:
-                                    logger.warning(f"⚠️ [DB HELPER] API returned success but no character name")
-                                    return "Conversation"  # Default
+                session = await self._get_session()
+                async with session.get(url) as response:
+                    if response.status == 200:
+                        data = await response.json()
+                        # Check for Result<String> format: {code: 0, data: "character_name"}
+                        if isinstance(data, dict) and data.get('code') == 0:
+                            character_name = data.get('data')
+                            if character_name:
+                                logger.info(f"✅ [DB HELPER] Current character: {character_name}")
+                                return character_name
                             else:
-                                logger.warning(f"⚠️ [DB HELPER] Unexpected API response format: {data}")
+                                logger.warning(f"⚠️ [DB HELPER] API returned success but no character name")
                                 return "Conversation"  # Default
-                        elif response.status == 404:
-                            logger.warning(f"No agent found for MAC: {device_mac}, using default Conversation mode")
-                            return "Conversation"
                         else:
-                            error_text = await response.text()
-                            logger.warning(f"API request failed: {response.status} - {error_text}")
+                            logger.warning(f"⚠️ [DB HELPER] Unexpected API response format: {data}")
+                            return "Conversation"  # Default
+                    elif response.status == 404:
+                        logger.warning(f"No agent found for MAC: {device_mac}, using default Conversation mode")
+                        return "Conversation"
+                    else:
+                        error_text = await response.text()
+                        logger.warning(f"API request failed: {response.status} - {error_text}")
 
-                            # Don't retry client errors (4xx)
-                            if 400 <= response.status < 500:
-                                logger.error(f"Client error, not retrying: {response.status}")
-                                return "Conversation"  # Default
+                        # Don't retry client errors (4xx)
+                        if 400 <= response.status < 500:
+                            logger.error(f"Client error, not retrying: {response.status}")
+                            return "Conversation"  # Default
 
             except asyncio.TimeoutError:
                 logger.warning(f"API request timeout (attempt {attempt + 1}/{self.retry_attempts})")
@@ -181,38 +229,33 @@ class DatabaseHelper:
         logger.info(f"🔍 [DB HELPER] get_child_profile_by_mac - MAC: {device_mac} -> normalized: {normalized_mac}")
         
         url = f"{self.manager_api_url}/config/child-profile-by-mac"
-        headers = {
-            "Authorization": f"Bearer {self.secret}",
-            "Content-Type": "application/json"
-        }
         payload = {"macAddress": normalized_mac}
 
         for attempt in range(self.retry_attempts):
             try:
-                timeout = aiohttp.ClientTimeout(total=10)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
-                    async with session.post(url, json=payload, headers=headers) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            # Check for Result<ChildProfileDTO> format: {code: 0, data: {...}}
-                            if data.get('code') == 0 and data.get('data'):
-                                child_profile = data.get('data')
-                                logger.info(f"👶✅ Retrieved child profile for MAC: {device_mac} (normalized: {normalized_mac}) - {child_profile.get('name')}, age {child_profile.get('age')}")
-                                return child_profile
-                            else:
-                                logger.warning(f"👶⚠️ API returned error: {data}")
-                                return None
-                        elif response.status == 404:
-                            logger.warning(f"No child profile found for MAC: {device_mac} (normalized: {normalized_mac})")
-                            return None
+                session = await self._get_session()
+                async with session.post(url, json=payload) as response:
+                    if response.status == 200:
+                        data = await response.json()
+                        # Check for Result<ChildProfileDTO> format: {code: 0, data: {...}}
+                        if data.get('code') == 0 and data.get('data'):
+                            child_profile = data.get('data')
+                            logger.info(f"👶✅ Retrieved child profile for MAC: {device_mac} (normalized: {normalized_mac}) - {child_profile.get('name')}, age {child_profile.get('age')}")
+                            return child_profile
                         else:
-                            error_text = await response.text()
-                            logger.warning(f"API request failed: {response.status} - {error_text}")
+                            logger.warning(f"👶⚠️ API returned error: {data}")
+                            return None
+                    elif response.status == 404:
+                        logger.warning(f"No child profile found for MAC: {device_mac} (normalized: {normalized_mac})")
+                        return None
+                    else:
+                        error_text = await response.text()
+                        logger.warning(f"API request failed: {response.status} - {error_text}")
 
-                            # Don't retry client errors (4xx)
-                            if 400 <= response.status < 500:
-                                logger.error(f"Client error, not retrying: {response.status}")
-                                return None
+                        # Don't retry client errors (4xx)
+                        if 400 <= response.status < 500:
+                            logger.error(f"Client error, not retrying: {response.status}")
+                            return None
 
             except asyncio.TimeoutError:
                 logger.warning(f"API request timeout (attempt {attempt + 1}/{self.retry_attempts})")
@@ -237,21 +280,16 @@ class DatabaseHelper:
             bool: True if connection successful, False otherwise
         """
         url = f"{self.manager_api_url}/health"
-        headers = {
-            "Authorization": f"Bearer {self.secret}",
-            "Content-Type": "application/json"
-        }
 
         try:
-            timeout = aiohttp.ClientTimeout(total=5)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        logger.info("Manager API connection verified")
-                        return True
-                    else:
-                        logger.warning(f"Manager API health check failed: {response.status}")
-                        return False
+            session = await self._get_session()
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=5)) as response:
+                if response.status == 200:
+                    logger.debug("Manager API connection verified")
+                    return True
+                else:
+                    logger.warning(f"Manager API health check failed: {response.status}")
+                    return False
         except Exception as e:
             logger.error(f"Failed to verify Manager API connection: {e}")
             return False
@@ -271,38 +309,33 @@ class DatabaseHelper:
         logger.info(f"🔍 [DB HELPER] get_agent_template_id - MAC: {device_mac} -> normalized: {normalized_mac}")
         
         url = f"{self.manager_api_url}/config/agent-template-id"
-        headers = {
-            "Authorization": f"Bearer {self.secret}",
-            "Content-Type": "application/json"
-        }
         payload = {"macAddress": normalized_mac}
 
         for attempt in range(self.retry_attempts):
             try:
-                timeout = aiohttp.ClientTimeout(total=10)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
-                    async with session.post(url, json=payload, headers=headers) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            # Check for Result<String> format: {code: 0, data: "template_id"}
-                            if data.get('code') == 0 and data.get('data'):
-                                template_id = data.get('data')
-                                logger.info(f"📄✅ Retrieved template_id: {template_id} for MAC: {device_mac} (normalized: {normalized_mac})")
-                                return str(template_id)
-                            else:
-                                logger.warning(f"📄⚠️ No template_id in response for MAC: {device_mac} (normalized: {normalized_mac}). Response: {data}")
-                                return None
-                        elif response.status == 404:
-                            logger.warning(f"No template found for MAC: {device_mac} (normalized: {normalized_mac})")
-                            return None
+                session = await self._get_session()
+                async with session.post(url, json=payload) as response:
+                    if response.status == 200:
+                        data = await response.json()
+                        # Check for Result<String> format: {code: 0, data: "template_id"}
+                        if data.get('code') == 0 and data.get('data'):
+                            template_id = data.get('data')
+                            logger.info(f"📄✅ Retrieved template_id: {template_id} for MAC: {device_mac} (normalized: {normalized_mac})")
+                            return str(template_id)
                         else:
-                            error_text = await response.text()
-                            logger.warning(f"API request failed: {response.status} - {error_text}")
+                            logger.warning(f"📄⚠️ No template_id in response for MAC: {device_mac} (normalized: {normalized_mac}). Response: {data}")
+                            return None
+                    elif response.status == 404:
+                        logger.warning(f"No template found for MAC: {device_mac} (normalized: {normalized_mac})")
+                        return None
+                    else:
+                        error_text = await response.text()
+                        logger.warning(f"API request failed: {response.status} - {error_text}")
 
-                            # Don't retry client errors (4xx)
-                            if 400 <= response.status < 500:
-                                logger.error(f"Client error, not retrying: {response.status}")
-                                return None
+                        # Don't retry client errors (4xx)
+                        if 400 <= response.status < 500:
+                            logger.error(f"Client error, not retrying: {response.status}")
+                            return None
 
             except asyncio.TimeoutError:
                 logger.warning(f"API request timeout (attempt {attempt + 1}/{self.retry_attempts})")
@@ -330,37 +363,32 @@ class DatabaseHelper:
             str: Template content (agent personality/prompt)
         """
         url = f"{self.manager_api_url}/config/template/{template_id}"
-        headers = {
-            "Authorization": f"Bearer {self.secret}",
-            "Content-Type": "application/json"
-        }
 
         for attempt in range(self.retry_attempts):
             try:
-                timeout = aiohttp.ClientTimeout(total=10)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
-                    async with session.get(url, headers=headers) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            # Check for Result<String> format: {code: 0, data: "template_content"}
-                            if data.get('code') == 0 and data.get('data'):
-                                content = data.get('data')
-                                logger.info(f"📝✅ Retrieved template content for ID: {template_id} ({len(content)} chars)")
-                                return content
-                            else:
-                                logger.warning(f"📝⚠️ No content in response for template_id: {template_id}. Response: {data}")
-                                return None
-                        elif response.status == 404:
-                            logger.warning(f"Template not found: {template_id}")
-                            return None
+                session = await self._get_session()
+                async with session.get(url) as response:
+                    if response.status == 200:
+                        data = await response.json()
+                        # Check for Result<String> format: {code: 0, data: "template_content"}
+                        if data.get('code') == 0 and data.get('data'):
+                            content = data.get('data')
+                            logger.info(f"📝✅ Retrieved template content for ID: {template_id} ({len(content)} chars)")
+                            return content
                         else:
-                            error_text = await response.text()
-                            logger.warning(f"API request failed: {response.status} - {error_text}")
+                            logger.warning(f"📝⚠️ No content in response for template_id: {template_id}. Response: {data}")
+                            return None
+                    elif response.status == 404:
+                        logger.warning(f"Template not found: {template_id}")
+                        return None
+                    else:
+                        error_text = await response.text()
+                        logger.warning(f"API request failed: {response.status} - {error_text}")
 
-                            # Don't retry client errors (4xx)
-                            if 400 <= response.status < 500:
-                                logger.error(f"Client error, not retrying: {response.status}")
-                                return None
+                        # Don't retry client errors (4xx)
+                        if 400 <= response.status < 500:
+                            logger.error(f"Client error, not retrying: {response.status}")
+                            return None
 
             except asyncio.TimeoutError:
                 logger.warning(f"API request timeout (attempt {attempt + 1}/{self.retry_attempts})")
@@ -392,36 +420,31 @@ class DatabaseHelper:
         logger.info(f"🔍 [DB HELPER] get_device_location - MAC: {device_mac} -> normalized: {normalized_mac}")
         
         url = f"{self.manager_api_url}/config/device-location"
-        headers = {
-            "Authorization": f"Bearer {self.secret}",
-            "Content-Type": "application/json"
-        }
         payload = {"macAddress": normalized_mac}
 
         for attempt in range(self.retry_attempts):
             try:
-                timeout = aiohttp.ClientTimeout(total=10)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
-                    async with session.post(url, json=payload, headers=headers) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            # Check for Result<String> format: {code: 0, data: "city_name"}
-                            if data.get('code') == 0 and data.get('data'):
-                                location = data.get('data')
-                                logger.info(f"📍✅ Retrieved location: {location} for MAC: {device_mac} (normalized: {normalized_mac})")
-                                return location
-                            else:
-                                logger.warning(f"📍⚠️ No location in response for MAC: {device_mac} (normalized: {normalized_mac})")
-                                return None
-                        elif response.status == 404:
-                            logger.warning(f"No location found for MAC: {device_mac} (normalized: {normalized_mac})")
-                            return None
+                session = await self._get_session()
+                async with session.post(url, json=payload) as response:
+                    if response.status == 200:
+                        data = await response.json()
+                        # Check for Result<String> format: {code: 0, data: "city_name"}
+                        if data.get('code') == 0 and data.get('data'):
+                            location = data.get('data')
+                            logger.info(f"📍✅ Retrieved location: {location} for MAC: {device_mac} (normalized: {normalized_mac})")
+                            return location
                         else:
-                            error_text = await response.text()
-                            logger.warning(f"API request failed: {response.status} - {error_text}")
+                            logger.warning(f"📍⚠️ No location in response for MAC: {device_mac} (normalized: {normalized_mac})")
+                            return None
+                    elif response.status == 404:
+                        logger.warning(f"No location found for MAC: {device_mac} (normalized: {normalized_mac})")
+                        return None
+                    else:
+                        error_text = await response.text()
+                        logger.warning(f"API request failed: {response.status} - {error_text}")
 
-                            if 400 <= response.status < 500:
-                                return None
+                        if 400 <= response.status < 500:
+                            return None
 
             except asyncio.TimeoutError:
                 logger.warning(f"API request timeout (attempt {attempt + 1}/{self.retry_attempts})")
@@ -448,36 +471,31 @@ class DatabaseHelper:
             str: Weather forecast text
         """
         url = f"{self.manager_api_url}/config/weather"
-        headers = {
-            "Authorization": f"Bearer {self.secret}",
-            "Content-Type": "application/json"
-        }
         payload = {"location": location}
 
         for attempt in range(self.retry_attempts):
             try:
-                timeout = aiohttp.ClientTimeout(total=10)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
-                    async with session.post(url, json=payload, headers=headers) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            # Check for Result<String> format: {code: 0, data: "weather_text"}
-                            if data.get('code') == 0 and data.get('data'):
-                                weather = data.get('data')
-                                logger.info(f"🌤️✅ Retrieved weather for: {location}")
-                                return weather
-                            else:
-                                logger.warning(f"🌤️⚠️ No weather in response for location: {location}")
-                                return None
-                        elif response.status == 404:
-                            logger.warning(f"No weather data found for location: {location}")
-                            return None
+                session = await self._get_session()
+                async with session.post(url, json=payload) as response:
+                    if response.status == 200:
+                        data = await response.json()
+                        # Check for Result<String> format: {code: 0, data: "weather_text"}
+                        if data.get('code') == 0 and data.get('data'):
+                            weather = data.get('data')
+                            logger.info(f"🌤️✅ Retrieved weather for: {location}")
+                            return weather
                         else:
-                            error_text = await response.text()
-                            logger.warning(f"API request failed: {response.status} - {error_text}")
+                            logger.warning(f"🌤️⚠️ No weather in response for location: {location}")
+                            return None
+                    elif response.status == 404:
+                        logger.warning(f"No weather data found for location: {location}")
+                        return None
+                    else:
+                        error_text = await response.text()
+                        logger.warning(f"API request failed: {response.status} - {error_text}")
 
-                            if 400 <= response.status < 500:
-                                return None
+                        if 400 <= response.status < 500:
+                            return None
 
             except asyncio.TimeoutError:
                 logger.warning(f"API request timeout (attempt {attempt + 1}/{self.retry_attempts})")
@@ -491,4 +509,43 @@ class DatabaseHelper:
                 await asyncio.sleep(wait_time)
 
         logger.error(f"Failed to get weather after {self.retry_attempts} attempts for location: {location}")
-        return None
\ No newline at end of file
+        return None
+
+
+# One helper per process for code that calls the Manager API repeatedly
+_shared_helper: Optional[DatabaseHelper] = None
+_shared_helper_loop = None
+
+
+def get_shared_database_helper(manager_api_url: str, secret: str) -> DatabaseHelper:
+    """
+    Return the process-wide helper, creating it with a keepalive task on first use
+
+    Its session belongs to the event loop it was opened on, so a new helper is
+    created when called from a different loop. Inside a LiveKit job the helper
+    is closed on job shutdown.
+    """
+    global _shared_helper, _shared_helper_loop
+    loop = asyncio.get_running_loop()
+    if _shared_helper is not None and _shared_helper_loop is loop:
+        return _shared_helper
+
+    helper = _shared_helper = DatabaseHelper(manager_api_url, secret)
+    _shared_helper_loop = loop
+    helper.start_keepalive()
+
+    try:
+        from livekit.agents import get_job_context
+        get_job_context().add_shutdown_callback(aclose_shared_database_helper)
+    except (ImportError, RuntimeError):
+        pass  # Not inside a job; the owner calls aclose_shared_database_helper()
+
+    return helper
+
+
+async def aclose_shared_database_helper():
+    """Stop the shared helper's keepalive and close its session"""
+    global _shared_helper, _shared_helper_loop
+    helper, _shared_helper, _shared_helper_loop = _shared_helper, None, None
+    if helper is not None:
+        await helper.aclose()
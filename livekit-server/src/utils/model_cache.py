@@ -138,7 +138,7 @@ class ModelCache:
     def _save_to_disk(self, model_key: str, model: Any):
         """Save model to disk cache (background thread)"""
         # Skip certain models that can't be pickled
-        if model_key in ['qdrant_client', 'vad_model']:
+        if model_key == 'vad_model':
             logger.debug(
                 f"[CACHE] Skipping disk cache for {model_key} (not serializable)")
             return
@@ -162,9 +162,6 @@ class ModelCache:
                 # Load embedding model
                 self.get_embedding_model()
 
-                # Load Qdrant client
-                self.get_qdrant_client()
-
                 logger.info("[PRELOAD] All models preloaded successfully")
 
             except Exception as e:
@@ -209,13 +206,25 @@ class ModelCache:
         if model_name is None:
             model_name = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
 
-        model_key = f"embedding_{model_name}"
+        # EMBEDDING_BACKEND=onnx runs the encoder on ONNX Runtime (int8 by default)
+        backend = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+        model_key = f"embedding_{model_name}" if backend == "torch" else f"embedding_{model_name}_{backend}"
+
+        # EMBEDDING_QUANTIZE=int8|fp16 reduces precision of the PyTorch encoder
+        quantize = os.getenv("EMBEDDING_QUANTIZE", "").lower() if backend == "torch" else ""
+        if quantize:
+            model_key = f"{model_key}_{quantize}"
 
         def load_embedding():
             try:
                 from sentence_transformers import SentenceTransformer
-                logger.info(f"[CACHE] Loading SentenceTransformer model: {model_name}")
-                model = SentenceTransformer(model_name)
+                logger.info(f"[CACHE] Loading SentenceTransformer model: {model_name} (backend: {backend})")
+                if backend == "onnx":
+                    model = self._load_onnx_embedding(model_name)
+                else:
+                    model = SentenceTransformer(model_name)
+                    if quantize:
+                        model = self._quantize_embedding(model, quantize)
                 
                 # Test the model to ensure it works
                 test_embedding = model.encode("test")
@@ -232,23 +241,62 @@ class ModelCache:
 
         return self.get_model(model_key, load_embedding)
 
-    def get_qdrant_client(self):
-        """Get Qdrant client with caching"""
-        def load_qdrant():
-            from qdrant_client import QdrantClient
-            qdrant_url = os.getenv("QDRANT_URL", "")
-            qdrant_api_key = os.getenv("QDRANT_API_KEY", "")
+    def _quantize_embedding(self, model, quantize: str):
+        """Apply dynamic int8 quantization (CPU) or fp16 weights (CUDA) to the encoder"""
+        try:
+            import torch
+            if quantize == "int8":
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+                logger.info("[CACHE] Embedding model quantized to dynamic int8")
+            elif quantize == "fp16":
+                if not torch.cuda.is_available():
+                    logger.warning("[CACHE] fp16 embeddings need a CUDA device, keeping fp32")
+                    return model
+                model = model.to("cuda").half()
+                logger.info("[CACHE] Embedding model converted to fp16 on CUDA")
+            else:
+                logger.warning(f"[CACHE] Unknown EMBEDDING_QUANTIZE value: {quantize}")
+        except Exception as e:
+            logger.warning(f"[CACHE] Embedding quantization failed, keeping fp32: {e}")
+        return model
 
-            if not qdrant_url or not qdrant_api_key:
-                return None
+    def _onnx_session_options(self):
+        """ONNX Runtime session with all graph optimizations (kernel fusion) enabled"""
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            return None
 
-            return QdrantClient(
-                url=qdrant_url,
-                api_key=qdrant_api_key,
-                timeout=10
-            )
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # Leave half the cores for the event loop and audio work
+        threads = int(os.getenv("EMBEDDING_NUM_THREADS", "0")) or max(1, (os.cpu_count() or 2) // 2)
+        options.intra_op_num_threads = threads
+        return options
+
+    def _load_onnx_embedding(self, model_name: str):
+        """Load the embedding model on ONNX Runtime, falling back to PyTorch"""
+        from sentence_transformers import SentenceTransformer
 
-        return self.get_model("qdrant_client", load_qdrant)
+        # Hub models such as all-MiniLM-L6-v2 ship pre-quantized int8 exports
+        onnx_file = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model_qint8_avx512_vnni.onnx")
+        try:
+            model_kwargs = {"file_name": onnx_file}
+            session_options = self._onnx_session_options()
+            if session_options is not None:
+                model_kwargs["session_options"] = session_options
+
+            model = SentenceTransformer(
+                model_name,
+                backend="onnx",
+                model_kwargs=model_kwargs
+            )
+            logger.info(f"[CACHE] Using ONNX Runtime embedding model: {onnx_file}")
+            return model
+        except Exception as e:
+            # Needs sentence-transformers>=3.2 with the onnx extra installed
+            logger.warning(f"[CACHE] ONNX embedding backend unavailable, using PyTorch: {e}")
+            return SentenceTransformer(model_name)
 
     def clear_cache(self):
         """Clear all cached models (for testing/debugging)"""
@@ -57,18 +57,6 @@ class ModelPreloader:
             except Exception as e:
                 logger.error(f"[PRELOAD] Embedding model loading failed: {e}")
 
-            # 3. Load Qdrant client (usually fast)
-            try:
-                qdrant_start = time.time()
-                qdrant = model_cache.get_qdrant_client()
-                qdrant_time = time.time() - qdrant_start
-                if qdrant:
-                    logger.info(f"[PRELOAD] Qdrant client loaded in {qdrant_time:.2f}s")
-                else:
-                    logger.info("[PRELOAD] Qdrant client not configured (optional)")
-            except Exception as e:
-                logger.error(f"[PRELOAD] Qdrant client loading failed: {e}")
-
             total_time = time.time() - start_time
             logger.info(f"[PRELOAD] Background model preloading completed in {total_time:.2f}s")
 
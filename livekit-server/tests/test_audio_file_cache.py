@@ -0,0 +1,113 @@
+import itertools
+import os
+
+import pytest
+
+from src.utils import audio_file_cache
+from src.utils.audio_file_cache import AudioFileCache
+
+CHUNK = 1000
+
+
+@pytest.fixture(autouse=True)
+def ticking_clock(monkeypatch):
+    """Strictly increasing access times so LRU order does not depend on clock resolution"""
+    clock = itertools.count(1)
+    monkeypatch.setattr(audio_file_cache.time, "time", lambda: float(next(clock)))
+
+
+def _put(cache, url, size=CHUNK):
+    temp_path = cache.new_temp_file()
+    with open(temp_path, "wb") as f:
+        f.write(os.urandom(size))
+    cache.put(url, temp_path)
+    return temp_path
+
+
+def _cached_files(cache):
+    return sorted(name for name in os.listdir(cache.cache_dir) if name.endswith(cache.suffix))
+
+
+def test_put_then_get_returns_cached_file(tmp_path):
+    cache = AudioFileCache(cache_dir=str(tmp_path), max_bytes=CHUNK * 3)
+    temp_path = _put(cache, "https://cdn/a.mp3")
+
+    path = cache.get("https://cdn/a.mp3")
+
+    assert path is not None and path.endswith(".mp3")
+    assert os.path.getsize(path) == CHUNK
+    assert not os.path.exists(temp_path)
+    assert cache.get("https://cdn/missing.mp3") is None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = AudioFileCache(cache_dir=str(tmp_path), max_bytes=CHUNK * 3)
+    for name in "abc":
+        _put(cache, f"https://cdn/{name}.mp3")
+
+    # Reading "a" makes "b" the oldest entry
+    assert cache.get("https://cdn/a.mp3")
+    _put(cache, "https://cdn/d.mp3")
+
+    assert cache.get("https://cdn/b.mp3") is None
+    for name in "acd":
+        assert cache.get(f"https://cdn/{name}.mp3")
+    assert len(_cached_files(cache)) == 3
+
+
+def test_eviction_keeps_total_under_cap_with_odd_sizes(tmp_path):
+    cache = AudioFileCache(cache_dir=str(tmp_path), max_bytes=5000)
+    sizes = [1234, 777, 2999, 1, 4096, 1500]
+    for i, size in enumerate(sizes):
+        _put(cache, f"https://cdn/{i}.mp3", size)
+        total = sum(os.path.getsize(os.path.join(cache.cache_dir, name)) for name in _cached_files(cache))
+        assert total <= cache.max_bytes
+        # The file just stored always survives its own eviction pass
+        assert cache.get(f"https://cdn/{i}.mp3")
+
+    assert cache.get("https://cdn/0.mp3") is None
+    assert cache.get("https://cdn/5.mp3")
+
+
+def test_file_larger_than_cache_is_rejected(tmp_path):
+    cache = AudioFileCache(cache_dir=str(tmp_path), max_bytes=CHUNK)
+    _put(cache, "https://cdn/small.mp3")
+    temp_path = _put(cache, "https://cdn/big.mp3", CHUNK + 1)
+
+    assert cache.get("https://cdn/big.mp3") is None
+    assert not os.path.exists(temp_path)
+    assert cache.get("https://cdn/small.mp3")
+
+
+def test_instances_share_index_and_evict_each_others_files(tmp_path):
+    first = AudioFileCache(cache_dir=str(tmp_path), max_bytes=CHUNK * 2)
+    second = AudioFileCache(cache_dir=str(tmp_path), max_bytes=CHUNK * 2)
+
+    _put(first, "https://cdn/a.mp3")
+    _put(second, "https://cdn/b.mp3")
+    # Stored by the other instance after this one read the index
+    assert first.get("https://cdn/b.mp3")
+    _put(first, "https://cdn/c.mp3")
+
+    assert second.get("https://cdn/a.mp3") is None
+    assert second.get("https://cdn/b.mp3")
+    assert second.get("https://cdn/c.mp3")
+    assert len(_cached_files(first)) == 2
+
+
+def test_file_removed_on_disk_is_a_miss(tmp_path):
+    cache = AudioFileCache(cache_dir=str(tmp_path), max_bytes=CHUNK * 2)
+    _put(cache, "https://cdn/a.mp3")
+    os.unlink(cache.get("https://cdn/a.mp3"))
+
+    assert cache.get("https://cdn/a.mp3") is None
+
+
+def test_discard_removes_unfinished_download(tmp_path):
+    cache = AudioFileCache(cache_dir=str(tmp_path), max_bytes=CHUNK)
+    temp_path = cache.new_temp_file()
+
+    cache.discard(temp_path)
+    cache.discard(temp_path)
+
+    assert not os.path.exists(temp_path)
@@ -0,0 +1,172 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("livekit.rtc")
+
+from src.services import unified_audio_player as uap  # noqa: E402
+
+SAMPLES_PER_FRAME = 960
+FRAME_BYTES = SAMPLES_PER_FRAME * 2
+
+
+class _Decoder:
+    """Stands in for AudioStreamDecoder, yielding preset decoded chunks"""
+
+    def __init__(self, sample_rate, num_channels):
+        self.chunks = []
+
+    def push(self, data):
+        pass
+
+    def end_input(self):
+        pass
+
+    async def aclose(self):
+        pass
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(0)
+            yield SimpleNamespace(data=chunk)
+
+
+class _Response:
+    def __init__(self):
+        self.content = SimpleNamespace(iter_any=self._iter_any)
+        self.released = False
+
+    async def _iter_any(self):
+        return
+        yield
+
+    def release(self):
+        self.released = True
+
+
+@pytest.fixture(autouse=True)
+def fake_decoder(monkeypatch):
+    monkeypatch.setattr(uap, "AudioStreamDecoder", _Decoder, raising=False)
+
+
+def _data(frame) -> bytes:
+    return memoryview(frame.data).cast("B").tobytes()
+
+
+def _pcm(samples: int) -> bytes:
+    return np.arange(samples, dtype=np.int16).tobytes()
+
+
+def _split(data: bytes, sample_counts) -> list:
+    chunks, offset = [], 0
+    for count in sample_counts:
+        chunks.append(data[offset:offset + count * 2])
+        offset += count * 2
+    assert offset == len(data)
+    return chunks
+
+
+def _iterator(chunks=()):
+    iterator = uap.StreamingAudioIterator(_Response(), asyncio.Event(), "test")
+    iterator.decoder.chunks = list(chunks)
+    return iterator
+
+
+async def test_regroup_odd_sized_chunks_keeps_order():
+    sample_counts = [1, 959, 961, 3000, 7, 1920, 2, 13]
+    data = _pcm(sum(sample_counts))
+    iterator = _iterator()
+
+    frames = []
+    for chunk in _split(data, sample_counts):
+        frames.extend(iterator._regroup(memoryview(chunk)))
+
+    whole = len(data) // FRAME_BYTES
+    assert len(frames) == whole
+    assert all(len(_data(frame)) == FRAME_BYTES for frame in frames)
+    assert b"".join(_data(frame) for frame in frames) == data[:whole * FRAME_BYTES]
+    # The remainder waits in the frame buffer for the next chunk
+    assert iterator.staged == len(data) - whole * FRAME_BYTES
+    assert bytes(iterator.frame_buf[:iterator.staged]) == data[whole * FRAME_BYTES:]
+
+
+async def test_regroup_chunk_smaller_than_frame_completes_later():
+    data = _pcm(SAMPLES_PER_FRAME)
+    iterator = _iterator()
+
+    assert iterator._regroup(memoryview(data[:100])) == []
+    assert iterator._regroup(memoryview(data[100:1000])) == []
+    frames = iterator._regroup(memoryview(data[1000:]))
+
+    assert [_data(frame) for frame in frames] == [data]
+    assert iterator.staged == 0
+
+
+async def test_stream_pads_last_frame_and_ends():
+    sample_counts = [500, 1001, 960, 77]
+    data = _pcm(sum(sample_counts))
+    iterator = _iterator(_split(data, sample_counts))
+
+    frames = [frame async for frame in iterator]
+
+    assert len(frames) == -(-len(data) // FRAME_BYTES)
+    joined = b"".join(_data(frame) for frame in frames)
+    assert joined[:len(data)] == data
+    assert joined[len(data):] == bytes(len(joined) - len(data))
+    assert iterator.is_finished
+    assert iterator.response.released
+
+
+async def test_ring_wraps_around_under_backpressure():
+    frame_count = uap._FRAME_RING_SIZE * 2 + 17
+    data = _pcm(frame_count * SAMPLES_PER_FRAME)
+    iterator = _iterator([data[i:i + 4321 * 2] for i in range(0, len(data), 4321 * 2)])
+
+    iterator.start()
+    for _ in range(200):
+        await asyncio.sleep(0)
+    # The producer stops a full ring ahead of a consumer that is not reading
+    assert iterator.tail - iterator.head == uap._FRAME_RING_SIZE
+
+    frames = []
+    async for frame in iterator:
+        frames.append(frame)
+        assert iterator.tail - iterator.head <= uap._FRAME_RING_SIZE
+
+    assert len(frames) == frame_count
+    assert b"".join(_data(frame) for frame in frames) == data
+
+
+async def test_stream_stops_when_stop_event_set():
+    data = _pcm(SAMPLES_PER_FRAME * 10)
+    iterator = _iterator([data])
+
+    first = await iterator.__anext__()
+    iterator.stop_event.set()
+
+    assert _data(first) == data[:FRAME_BYTES]
+    with pytest.raises(StopAsyncIteration):
+        await iterator.__anext__()
+    assert iterator.response.released
+
+
+async def test_frame_iterator_pads_only_the_tail():
+    data = _pcm(SAMPLES_PER_FRAME * 3 + 5)
+    iterator = uap.AudioFrameIterator(data, 48000, SAMPLES_PER_FRAME, asyncio.Event())
+
+    frames = [frame async for frame in iterator]
+
+    assert len(frames) == 4
+    assert b"".join(_data(frame) for frame in frames[:3]) == data[:3 * FRAME_BYTES]
+    assert _data(frames[3]) == data[3 * FRAME_BYTES:] + bytes(FRAME_BYTES - 10)
+
+
+async def test_frame_iterator_exact_frames_have_no_padding_frame():
+    data = _pcm(SAMPLES_PER_FRAME * 2)
+    iterator = uap.AudioFrameIterator(data, 48000, SAMPLES_PER_FRAME, asyncio.Event())
+
+    frames = [frame async for frame in iterator]
+
+    assert [_data(frame) for frame in frames] == [data[:FRAME_BYTES], data[FRAME_BYTES:]]
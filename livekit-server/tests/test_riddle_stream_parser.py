@@ -0,0 +1,47 @@
+import json
+
+from src.services.riddle_generator_service import _RiddleStreamParser
+
+RIDDLES = [
+    {"riddle": "What has keys but no locks?", "answer": "piano"},
+    {"riddle": "Say \"hi\" to {me} and I {answer} back", "answer": "echo"},
+    {"riddle": "What ends with a }?", "answer": "brace \\ back"},
+]
+DOCUMENT = json.dumps({"riddles": RIDDLES}, indent=2)
+
+
+def _feed(parser, text, sizes):
+    riddles, offset, index = [], 0, 0
+    while offset < len(text):
+        size = sizes[index % len(sizes)]
+        riddles.extend(parser.feed(text[offset:offset + size]))
+        offset += size
+        index += 1
+    return riddles
+
+
+def test_whole_document_yields_riddles_in_order():
+    assert _RiddleStreamParser().feed(DOCUMENT) == RIDDLES
+
+
+def test_odd_sized_deltas_yield_riddles_in_order():
+    for sizes in ([1], [2, 5, 3], [7, 1, 13], [64]):
+        assert _feed(_RiddleStreamParser(), DOCUMENT, sizes) == RIDDLES
+
+
+def test_riddle_is_returned_by_the_delta_that_closes_it():
+    parser = _RiddleStreamParser()
+    close = DOCUMENT.index("}") + 1
+
+    assert parser.feed(DOCUMENT[:close - 1]) == []
+    assert parser.feed(DOCUMENT[close - 1:close]) == RIDDLES[:1]
+
+
+def test_truncated_stream_keeps_completed_riddles():
+    cut = DOCUMENT.index('"echo"')
+    assert _feed(_RiddleStreamParser(), DOCUMENT[:cut], [9]) == RIDDLES[:1]
+
+
+def test_malformed_object_is_skipped():
+    text = '{"riddles": [{"riddle": "a" "answer": "b"}, {"riddle": "c", "answer": "d"}]}'
+    assert _feed(_RiddleStreamParser(), text, [4]) == [{"riddle": "c", "answer": "d"}]